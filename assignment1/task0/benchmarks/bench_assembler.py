@@ -0,0 +1,64 @@
+"""Edit-run load time for a .txt source: via a JSON build vs. assembled directly.
+
+"build + json" is what running a text source used to take: build.py
+writes the JSON file, then the VM parses it. "assemble" reads the .txt
+source straight into ``{name: list[Op]}``. The program is the one from
+bench_bytecode.py.
+
+Usage: python benchmarks/bench_assembler.py [FUNCTIONS]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from xvm.assembler import assemble_file
+from xvm.build import parse_file_to_json
+from xvm.vm import VM
+
+from bench_bytecode import best, program
+
+
+def to_source(code):
+    lines = []
+    for name, ops in code.items():
+        lines.append(f"#{name}")
+        for op in ops:
+            if not op.args:
+                lines.append(op.opcode.value)
+            elif isinstance(op.args[0], str):
+                lines.append(f'{op.opcode.value} "{op.args[0]}"')
+            else:
+                lines.append(f"{op.opcode.value} {op.args[0]!r}")
+    return "\n".join(lines) + "\n"
+
+
+def build_and_parse(txt_path, json_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse_file_to_json(txt_path)
+    return VM().parse_code_from_json(json_path)
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    code = program(functions)
+    instructions = sum(len(ops) for ops in code.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        txt_path = os.path.join(directory, "program.txt")
+        json_path = os.path.join(directory, "program.json")
+        with open(txt_path, "w") as file:
+            file.write(to_source(code))
+        assert assemble_file(txt_path) == build_and_parse(txt_path, json_path) == code
+
+        json_time = best(lambda: build_and_parse(txt_path, json_path))
+        assemble_time = best(lambda: assemble_file(txt_path))
+
+    print(f"{functions + 1} functions, {instructions} instructions")
+    print(f"  {'build + json':14} {json_time * 1000:10.2f} ms")
+    print(f"  {'assemble':14} {assemble_time * 1000:10.2f} ms {json_time / assemble_time:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
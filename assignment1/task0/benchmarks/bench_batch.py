@@ -0,0 +1,49 @@
+"""One VM and run_code_from_json per input vs. run_batch.
+
+Runs fast_power (test_part8) over 4000 input vectors.
+
+Usage: python benchmarks/bench_batch.py
+"""
+import os
+import time
+from pathlib import Path
+
+from xvm.batch import run_batch
+from xvm.vm import VM
+
+JSON_PATH = Path(__file__).resolve().parent.parent / "tests" / "test_part8_code.json"
+INPUTS = [[base, exponent] for base in range(2, 42) for exponent in range(100)]
+
+
+def per_input_vm():
+    for inputs in INPUTS:
+        values = iter(inputs)
+        vm = VM(input_fn=lambda: next(values), print_fn=lambda _value: None)
+        vm.run_code_from_json(JSON_PATH)
+
+
+def batch(workers):
+    code = VM().parse_code_from_json(JSON_PATH)
+    for result in run_batch(code, INPUTS, workers=workers, chunksize=64):
+        assert result.ok
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main():
+    baseline = timed(per_input_vm)
+    print(f"{'VM + run_code_from_json per input':40} {baseline * 1000:8.1f} ms")
+    for workers in sorted({0, 2, os.cpu_count() or 1}):
+        elapsed = timed(lambda: batch(workers))
+        print(
+            f"{f'run_batch, workers={workers}':40} {elapsed * 1000:8.1f} ms   "
+            f"speedup {baseline / elapsed:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""File size and load time: bytecode JSON vs. the binary .xvmc format.
+
+The program is FUNCTIONS copies of the fibonacci function from the tests,
+each renamed and padded with arithmetic on numbered variables, plus an
+entrypoint. Load times are for parsing the file into ``{name: list[Op]}``;
+"xvmc, entrypoint only" opens the file and decodes one function.
+
+Usage: python benchmarks/bench_bytecode.py [FUNCTIONS]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from xvm.build import ops_to_json
+from xvm.bytecode import BytecodeFile, read_bytecode, write_bytecode
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.vm import VM, parse_string
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI  # noqa: E402
+
+FIBONACCI = parse_string(TEST2_FIBONACCI)
+
+
+def program(functions):
+    code = {"$entrypoint$": parse_string(TEST2_ENTRY)}
+    for index in range(functions):
+        padding = []
+        for step in range(50):
+            padding += [
+                Op(OpCode.LOAD_CONST, step * 0.5),
+                Op(OpCode.LOAD_VAR, f"v{step % 7}"),
+                Op(OpCode.ADD),
+                Op(OpCode.STORE_VAR, f"v{step % 7}"),
+            ]
+        code[f"f{index}"] = padding + [
+            Op(op.opcode, f"f{index}") if op.args == ("fibonacci",) else op for op in FIBONACCI
+        ]
+    return code
+
+
+def best(load, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def entrypoint_only(path):
+    with BytecodeFile(path) as bytecode:
+        return bytecode["$entrypoint$"]
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    code = program(functions)
+    instructions = sum(len(ops) for ops in code.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "program.json")
+        xvmc_path = os.path.join(directory, "program.xvmc")
+        with open(json_path, "w") as file:
+            json.dump(ops_to_json(code), file, indent=4)
+        write_bytecode(code, xvmc_path)
+        assert read_bytecode(xvmc_path) == VM().parse_code_from_json(json_path)
+
+        json_size = os.path.getsize(json_path)
+        xvmc_size = os.path.getsize(xvmc_path)
+        json_time = best(lambda: VM().parse_code_from_json(json_path))
+        xvmc_time = best(lambda: read_bytecode(xvmc_path))
+        lazy_time = best(lambda: entrypoint_only(xvmc_path))
+
+    print(f"{functions + 1} functions, {instructions} instructions")
+    print(f"  {'':24} {'size KiB':>10} {'load ms':>10} {'speedup':>8}")
+    print(f"  {'json':24} {json_size / 1024:10.1f} {json_time * 1000:10.2f}")
+    print(
+        f"  {'xvmc':24} {xvmc_size / 1024:10.1f} {xvmc_time * 1000:10.2f} "
+        f"{json_time / xvmc_time:7.1f}x"
+    )
+    print(f"  {'xvmc, entrypoint only':24} {'':10} {lazy_time * 1000:10.2f} {json_time / lazy_time:7.1f}x")
+    print(f"  size ratio {json_size / xvmc_size:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Cold vs. warm load through the compiled-code cache.
+
+Loads the generated program from bench_bytecode.py (JSON and .xvmc) into
+a VM: without a cache, with an empty cache (parse, verify, link, then
+write the entry) and with a warm one (read the entry back). Each run
+uses a fresh VM, as each xvm-start invocation does.
+
+Usage: python benchmarks/bench_cache.py [FUNCTIONS]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from xvm.build import ops_to_json
+from xvm.bytecode import write_bytecode
+from xvm.cache import CodeCache
+from xvm.vm import VM
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_bytecode import program  # noqa: E402
+
+
+def load(path, cache=None, optimize=False):
+    start = time.perf_counter()
+    VM(cache=cache, optimize=optimize).load_code_from_file(path)
+    return time.perf_counter() - start
+
+
+def best(measure, repeat=5):
+    return min(measure() for _ in range(repeat))
+
+
+def cold(path, directory, optimize):
+    cache = CodeCache(directory)
+    cache.clear()
+    return load(path, cache, optimize)
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    code = program(functions)
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "program.json")
+        xvmc_path = os.path.join(directory, "program.xvmc")
+        cache_dir = os.path.join(directory, "cache")
+        with open(json_path, "w") as file:
+            json.dump(ops_to_json(code), file, indent=4)
+        write_bytecode(code, xvmc_path)
+
+        print(f"{functions + 1} functions, {sum(len(ops) for ops in code.values())} instructions")
+        print(f"  {'':20} {'no cache ms':>12} {'cold ms':>10} {'warm ms':>10} {'speedup':>8}")
+        for label, path, optimize in [
+            ("json", json_path, False),
+            ("json, --optimize", json_path, True),
+            ("xvmc", xvmc_path, False),
+        ]:
+            uncached = best(lambda: load(path, optimize=optimize))
+            first = best(lambda: cold(path, cache_dir, optimize))
+            warm = best(lambda: load(path, CodeCache(cache_dir), optimize))
+            print(
+                f"  {label:20} {uncached * 1000:12.1f} {first * 1000:10.1f} "
+                f"{warm * 1000:10.1f} {uncached / warm:7.1f}x"
+            )
+        print(f"  cache entry size: {CodeCache(cache_dir).size() / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
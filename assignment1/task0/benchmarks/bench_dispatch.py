@@ -0,0 +1,54 @@
+"""Interpreter throughput on the fast_power program from tests/test_part8_code.json.
+
+Usage: python benchmarks/bench_dispatch.py [rounds]
+"""
+import sys
+import time
+from pathlib import Path
+
+from xvm.vm import VM
+
+CODE_PATH = Path(__file__).resolve().parent.parent / "tests" / "test_part8_code.json"
+INPUTS = [(2, 10), (3, 1000), (-2, 4097), (7, 513), (1, 100000)]
+
+
+def make_vm(base, exponent):
+    values = iter([base, exponent])
+    return VM(input_fn=lambda: next(values), print_fn=lambda _value: None)
+
+
+def count_ops():
+    total = 0
+    for base, exponent in INPUTS:
+        vm = make_vm(base, exponent)
+        vm.load_code_from_json(CODE_PATH)
+        while vm.pc < len(vm.code):
+            vm.step()
+            total += 1
+    return total
+
+
+def run_round(code):
+    for base, exponent in INPUTS:
+        make_vm(base, exponent).run_code(code)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    code = VM().parse_code_from_json(CODE_PATH)
+    ops_per_round = count_ops()
+
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            run_round(code)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"instructions per round: {ops_per_round}")
+    print(f"rounds: {rounds}, best time: {best:.3f}s")
+    print(f"throughput: {ops_per_round * rounds / best:,.0f} ops/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Call-frame memory and speed for deep XVM recursion.
+
+Usage: python benchmarks/bench_frames.py [depth]
+"""
+import sys
+import time
+import tracemalloc
+
+from xvm.frame import Frame
+from xvm.vm import VM, parse_string
+
+# countdown(n): keeps a few locals alive in every frame, then recurses.
+COUNTDOWN = """\
+STORE_VAR "n"
+LOAD_VAR "n"
+STORE_VAR "a"
+LOAD_VAR "n"
+STORE_VAR "b"
+LOAD_VAR "n"
+STORE_VAR "c"
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP done
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+LOAD_CONST "countdown"
+CALL
+LABEL done
+"""
+
+
+def make_code(depth):
+    return {
+        "countdown": parse_string(COUNTDOWN),
+        "$entrypoint$": parse_string(f'LOAD_CONST {depth}\nLOAD_CONST "countdown"\nCALL\n'),
+    }
+
+
+def peak_bytes(depth):
+    code = make_code(depth)
+    vm = VM()
+    tracemalloc.start()
+    vm.run_code(code)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def frame_size():
+    frame = Frame("f", 0, {}, {})
+    size = sys.getsizeof(frame)
+    if hasattr(frame, "__dict__"):
+        size += sys.getsizeof(frame.__dict__)
+    return size
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10_000))
+
+    print(f"Frame object size: {frame_size()} bytes")
+
+    small, large = peak_bytes(depth // 2), peak_bytes(depth)
+    print(f"peak traced memory at depth {depth}: {large / 1024:.1f} KiB")
+    print(f"memory per call level: {(large - small) / (depth - depth // 2):.0f} bytes")
+
+    code = make_code(depth)
+    best = float("inf")
+    for _ in range(5):
+        vm = VM()
+        start = time.perf_counter()
+        for _ in range(20):
+            vm.stack.clear()
+            vm.run_code(code)
+        best = min(best, time.perf_counter() - start)
+    print(f"20 runs at depth {depth}: {best * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Cost of VM hooks per event.
+
+For each program: the plain interpreter, a disabled hook, the
+instrumented loop with a hook for an event the program does not produce,
+and one no-op hook per event type. The cost per event is the time over
+the same hook filtered to no functions (so the loop does the same checks
+but never calls back) divided by the events delivered.
+
+Usage: python benchmarks/bench_hooks.py
+"""
+import gc
+import sys
+import time
+from pathlib import Path
+
+from xvm.enums.event import Event
+from xvm.vm import VM, parse_string
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+
+from test_part5 import TEST2 as SUM_LOOP  # noqa: E402
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI  # noqa: E402
+
+SUM = parse_string(SUM_LOOP)
+FIBONACCI = {
+    "fibonacci": parse_string(TEST2_FIBONACCI),
+    "$entrypoint$": parse_string(TEST2_ENTRY),
+}
+# Reads N numbers and prints each one.
+ECHO = parse_string("""\
+INPUT_NUMBER
+STORE_VAR "n"
+LABEL loop
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP done
+INPUT_NUMBER
+PRINT
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+STORE_VAR "n"
+JMP loop
+LABEL done
+""")
+
+# Programs, the size passed to INPUT_NUMBER, the events measured on them
+# and an event they (almost) never produce, for the instrumented baseline.
+PROGRAMS = [
+    ("sum loop", SUM, 20_000, [Event.INSTRUCTION], Event.CALL),
+    ("fibonacci", FIBONACCI, 22, [Event.CALL, Event.RETURN], Event.INPUT),
+    ("echo", ECHO, 20_000, [Event.INPUT, Event.OUTPUT], Event.CALL),
+]
+
+
+def run(code, n, event=None, functions=None, enabled=True):
+    events = 0
+
+    def hook(vm, function, pc, arg):
+        nonlocal events
+        events += 1
+
+    vm = VM(input_fn=lambda: n, print_fn=lambda _value: None)
+    if event is not None:
+        vm.add_hook(event, hook, functions).enabled = enabled
+    # As in timeit, keep garbage collection out of the measurement.
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        vm.run_code(code)
+        return time.perf_counter() - start, events
+    finally:
+        gc.enable()
+
+
+def best(*args, repeat=9, **kwargs):
+    return min(run(*args, **kwargs) for _ in range(repeat))
+
+
+def main():
+    # The first run of each loop in a process is slower while the
+    # interpreter specializes it; warm every configuration up first.
+    for _, code, n, events, quiet in PROGRAMS:
+        for event in [None, quiet, *events]:
+            run(code, n, event)
+            run(code, n, event, functions=())
+    for label, code, n, events, quiet in PROGRAMS:
+        plain = best(code, n)[0]
+        disabled = best(code, n, events[0], enabled=False)[0]
+        instrumented = best(code, n, quiet)[0]
+        print(label)
+        print(f"  {'no hooks':26} {plain * 1000:8.1f} ms")
+        print(f"  {'disabled hook':26} {disabled * 1000:8.1f} ms")
+        print(f"  {'instrumented, no events':26} {instrumented * 1000:8.1f} ms")
+        for event in events:
+            elapsed, count = best(code, n, event)
+            filtered = best(code, n, event, functions=())[0]
+            cost = (elapsed - filtered) / count * 1e9
+            print(
+                f"  {event.name + ' hook':26} {elapsed * 1000:8.1f} ms  "
+                f"{count:7d} events  {cost:6.0f} ns/event"
+            )
+
+
+if __name__ == "__main__":
+    main()
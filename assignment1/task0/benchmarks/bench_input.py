@@ -0,0 +1,66 @@
+"""input() per value vs. InputSource for a program reading many numbers.
+
+The program reads N and then N numbers and prints their sum. The numbers
+come from a temporary file; for the input() baseline stdin is redirected
+to it.
+
+Usage: python benchmarks/bench_input.py [N]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from xvm.sources import open_source
+from xvm.vm import VM
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+from test_sources import SUM_INPUTS  # noqa: E402
+
+
+def run(input_fn, jit):
+    output = []
+    start = time.perf_counter()
+    VM(input_fn=input_fn, print_fn=output.append, optimize=True, jit=jit).run_code(SUM_INPUTS)
+    return time.perf_counter() - start, output
+
+
+def builtin_input(path, jit):
+    stdin = sys.stdin
+    with open(path) as sys.stdin:
+        try:
+            return run(input, jit)
+        finally:
+            sys.stdin = stdin
+
+
+def source(path, jit, **options):
+    with open_source(path, **options) as input_fn:
+        return run(input_fn, jit)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    values = [value * 7 - 3 for value in range(n)]
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as file:
+        file.write("\n".join(map(str, [n, *values])) + "\n")
+        file.flush()
+
+        cases = [
+            ("InputSource, lines", lambda jit: source(file.name, jit)),
+            ("InputSource, mmap", lambda jit: source(file.name, jit, use_mmap=True)),
+        ]
+        for jit in (False, True):
+            print("jit" if jit else "interpreter")
+            baseline, expected = builtin_input(file.name, jit)
+            assert expected == [sum(values)]
+            print(f"  {'input() per value':30} {baseline * 1000:8.1f} ms")
+            for label, case in cases:
+                elapsed, output = case(jit)
+                assert output == expected
+                print(f"  {label:30} {elapsed * 1000:8.1f} ms   speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
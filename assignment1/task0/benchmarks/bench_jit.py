@@ -0,0 +1,61 @@
+"""Interpreter vs. JIT-compiled execution of the test programs.
+
+Usage: python benchmarks/bench_jit.py
+"""
+import sys
+import time
+from pathlib import Path
+
+from xvm.jit import compile_program
+from xvm.vm import VM, parse_string
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+
+from test_part5 import TEST2 as SUM_LOOP  # noqa: E402
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI  # noqa: E402
+
+
+def workloads():
+    fast_power = VM().parse_code_from_json(TESTS_DIR / "test_part8_code.json")
+    fibonacci = {
+        "fibonacci": parse_string(TEST2_FIBONACCI),
+        "$entrypoint$": parse_string(TEST2_ENTRY),
+    }
+    return [
+        ("sum 1..50000 (test_part5)", {"$entrypoint$": parse_string(SUM_LOOP)}, [50000], 3),
+        ("fibonacci(20) (test_part6)", fibonacci, [20], 3),
+        ("fast_power(1, 2**1000) (test_part8)", fast_power, [1, 2**1000], 20),
+    ]
+
+
+def best_time(code, inputs, repeat, jit):
+    best = float("inf")
+    vm = VM(print_fn=lambda _value: None, jit=jit)
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            values = iter(inputs)
+            vm.input_fn = lambda: next(values)
+            vm.stack = []
+            vm.variables = {}
+            vm.run_code(code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for name, code, inputs, repeat in workloads():
+        start = time.perf_counter()
+        compile_program(code)
+        compile_time = time.perf_counter() - start
+        interpreted = best_time(code, inputs, repeat, jit=False)
+        compiled = best_time(code, inputs, repeat, jit=True)
+        print(
+            f"{name:36} interpreted {interpreted * 1000:8.1f} ms   jit {compiled * 1000:8.1f} ms   "
+            f"speedup {interpreted / compiled:5.1f}x   (compile {compile_time * 1000:.2f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Eager vs. lazy loading of a large library that runs one function.
+
+The program is the generated library from bench_bytecode.py with an
+entrypoint that runs one of its functions, the fibonacci one. Times cover load and run
+in a fresh VM; peak memory is measured with tracemalloc in a separate
+run and counts what the load allocates, including the parsed JSON
+document for .json files.
+
+Usage: python benchmarks/bench_lazy.py [FUNCTIONS]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from xvm.build import ops_to_json
+from xvm.bytecode import write_bytecode
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.vm import VM
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_bytecode import FIBONACCI, program  # noqa: E402
+
+
+def renamed(ops):
+    return [Op(OpCode.LOAD_CONST, "f0") if op.args == ("fibonacci",) else op for op in ops]
+
+
+def library(functions):
+    code = program(functions)
+    # f0 is the plain fibonacci function; the entrypoint calls it.
+    code["f0"] = renamed(FIBONACCI)
+    code["$entrypoint$"] = renamed(code["$entrypoint$"])
+    return code
+
+
+def run(path, lazy):
+    output = []
+    vm = VM(input_fn=lambda: 12, print_fn=output.append)
+    vm.run_code_from_file(path, lazy=lazy)
+    assert output == [89]
+    return vm
+
+
+def best(path, lazy, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(path, lazy)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory(path, lazy):
+    tracemalloc.start()
+    try:
+        vm = run(path, lazy)
+        return tracemalloc.get_traced_memory()[1], len(vm._linked)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    code = library(functions)
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "library.json")
+        xvmc_path = os.path.join(directory, "library.xvmc")
+        with open(json_path, "w") as file:
+            json.dump(ops_to_json(code), file, indent=4)
+        write_bytecode(code, xvmc_path)
+
+        print(f"{functions + 1} functions, {sum(len(ops) for ops in code.values())} instructions")
+        print(f"  {'':14} {'ms':>10} {'peak MiB':>10} {'linked':>8}")
+        for label, path in [("json", json_path), ("xvmc", xvmc_path)]:
+            for lazy in (False, True):
+                elapsed = best(path, lazy)
+                peak, linked = peak_memory(path, lazy)
+                name = f"{label}, {'lazy' if lazy else 'eager'}"
+                print(f"  {name:14} {elapsed * 1000:10.2f} {peak / 2**20:10.2f} {linked:8d}")
+
+
+if __name__ == "__main__":
+    main()
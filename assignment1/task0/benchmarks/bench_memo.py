@@ -0,0 +1,55 @@
+"""Plain vs. memoized execution of recursive pure functions.
+
+Usage: python benchmarks/bench_memo.py
+"""
+import sys
+import time
+from pathlib import Path
+
+from xvm.vm import VM, parse_string
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI  # noqa: E402
+
+
+def workloads():
+    fast_power = VM().parse_code_from_json(TESTS_DIR / "test_part8_code.json")
+    fibonacci = {
+        "fibonacci": parse_string(TEST2_FIBONACCI),
+        "$entrypoint$": parse_string(TEST2_ENTRY),
+    }
+    return [
+        ("fibonacci(22) (test_part6)", fibonacci, [22], 1),
+        ("fast_power(3, 500) x50 (test_part8)", fast_power, [3, 500], 50),
+    ]
+
+
+def best_time(code, inputs, repeat, memo_size):
+    best = float("inf")
+    for _ in range(3):
+        vm = VM(print_fn=lambda _value: None, memo_size=memo_size)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            values = iter(inputs)
+            vm.input_fn = lambda: next(values)
+            vm.stack = []
+            vm.variables = {}
+            vm.run_code(code)
+        best = min(best, time.perf_counter() - start)
+    return best, vm.memo
+
+
+def main():
+    for name, code, inputs, repeat in workloads():
+        plain, _ = best_time(code, inputs, repeat, memo_size=0)
+        memoized, memo = best_time(code, inputs, repeat, memo_size=1024)
+        print(
+            f"{name:38} plain {plain * 1000:8.1f} ms   memoized {memoized * 1000:8.1f} ms   "
+            f"speedup {plain / memoized:6.1f}x   (hits {memo.hits}, misses {memo.misses})"
+        )
+
+
+if __name__ == "__main__":
+    main()
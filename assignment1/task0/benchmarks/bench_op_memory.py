@@ -0,0 +1,44 @@
+"""Memory used by Op instances for a large generated program.
+
+Usage: python benchmarks/bench_op_memory.py [instructions]
+"""
+import sys
+import time
+import tracemalloc
+
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+
+BLOCK = [
+    (OpCode.LOAD_VAR, "x"),
+    (OpCode.LOAD_CONST, 3),
+    (OpCode.MOD,),
+    (OpCode.LOAD_CONST, 0),
+    (OpCode.EQ,),
+    (OpCode.CJMP, "loop"),
+    (OpCode.STORE_VAR, "x"),
+    (OpCode.LABEL, "loop"),
+]
+
+
+def generate(count):
+    return [Op(*BLOCK[i % len(BLOCK)]) for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    ops = generate(count)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"instructions: {len(ops):,}")
+    print(f"memory: {current / 2**20:.1f} MiB ({current / count:.1f} bytes per Op)")
+    print(f"construction: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Per-value print vs. buffered output sinks for a PRINT-heavy program.
+
+The program prints 0..N-1; output goes to a temporary file in every case
+(stdout is redirected to it for the print baseline). The JIT runs show the
+output cost with most of the interpreter overhead gone.
+
+Usage: python benchmarks/bench_output.py [N]
+"""
+import contextlib
+import sys
+import tempfile
+import time
+
+from xvm.sinks import JsonLinesSink, OutputSink
+from xvm.vm import VM, parse_string
+
+PRINT_LOOP = parse_string("""\
+INPUT_NUMBER
+STORE_VAR "N"
+LOAD_CONST 0
+STORE_VAR "i"
+LABEL loop
+LOAD_VAR "N"
+LOAD_VAR "i"
+GE
+CJMP done
+LOAD_VAR "i"
+PRINT
+LOAD_CONST 1
+LOAD_VAR "i"
+ADD
+STORE_VAR "i"
+JMP loop
+LABEL done
+""")
+
+
+def run(n, make_print_fn, jit):
+    with tempfile.TemporaryFile("w+") as file:
+        start = time.perf_counter()
+        with make_print_fn(file) as print_fn:
+            VM(input_fn=lambda: n, print_fn=print_fn, optimize=True, jit=jit).run_code(PRINT_LOOP)
+        elapsed = time.perf_counter() - start
+        file.seek(0)
+        lines = sum(1 for _ in file)
+    assert lines == n
+    return elapsed
+
+
+@contextlib.contextmanager
+def builtin_print(file):
+    with contextlib.redirect_stdout(file):
+        yield print
+        file.flush()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cases = [
+        ("OutputSink, unbuffered", lambda file: OutputSink(file, buffer_size=0)),
+        ("OutputSink, 4 KiB", lambda file: OutputSink(file, buffer_size=4096)),
+        ("OutputSink, 64 KiB", lambda file: OutputSink(file)),
+        ("JsonLinesSink, 64 KiB", lambda file: JsonLinesSink(file)),
+    ]
+    for jit in (False, True):
+        print("jit" if jit else "interpreter")
+        baseline = run(n, builtin_print, jit)
+        print(f"  {'print per value':30} {baseline * 1000:8.1f} ms")
+        for label, make_sink in cases:
+            elapsed = run(n, make_sink, jit)
+            print(f"  {label:30} {elapsed * 1000:8.1f} ms   speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
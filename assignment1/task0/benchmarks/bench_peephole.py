@@ -0,0 +1,57 @@
+"""Plain vs. superinstruction-fused execution of the test programs.
+
+Usage: python benchmarks/bench_peephole.py
+"""
+import sys
+import time
+from pathlib import Path
+
+from xvm.peephole import SuperOp, fuse_functions
+from xvm.vm import VM, parse_string
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+
+from test_part5 import TEST2 as SUM_LOOP  # noqa: E402
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI  # noqa: E402
+
+
+def workloads():
+    fast_power = VM().parse_code_from_json(TESTS_DIR / "test_part8_code.json")
+    fibonacci = {
+        "fibonacci": parse_string(TEST2_FIBONACCI),
+        "$entrypoint$": parse_string(TEST2_ENTRY),
+    }
+    return [
+        ("sum 1..50000 (test_part5)", {"$entrypoint$": parse_string(SUM_LOOP)}, [50000], 3),
+        ("fibonacci(20) (test_part6)", fibonacci, [20], 3),
+        ("fast_power(1, 2**1000) (test_part8)", fast_power, [1, 2**1000], 20),
+    ]
+
+
+def best_time(code, inputs, repeat, optimize):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            values = iter(inputs)
+            vm = VM(input_fn=lambda: next(values), print_fn=lambda _value: None, optimize=optimize)
+            vm.run_code(code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for name, code, inputs, repeat in workloads():
+        fused = fuse_functions(code)
+        super_ops = sum(isinstance(op, SuperOp) for program in fused.values() for op in program)
+        plain = best_time(code, inputs, repeat, optimize=False)
+        optimized = best_time(code, inputs, repeat, optimize=True)
+        print(
+            f"{name:36} plain {plain * 1000:8.1f} ms   fused {optimized * 1000:8.1f} ms   "
+            f"speedup {plain / optimized:4.2f}x   ({super_ops} superinstructions)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Sequential run_code vs. the cooperative scheduler on many small programs.
+
+One long program (sum 1..200000) is queued first, followed by 1000 short
+ones. Run one at a time, every short program waits for the long one; the
+scheduler lets them finish first. Reports wall time, instruction
+throughput and the median time until a short program finishes.
+
+Usage: python benchmarks/bench_scheduler.py
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from xvm.scheduler import Scheduler
+from xvm.vm import VM, parse_string
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+
+from test_part5 import TEST2 as SUM_LOOP  # noqa: E402
+
+SUM = parse_string(SUM_LOOP)
+INPUTS = [200_000] + [10 + i % 90 for i in range(1000)]
+
+
+def sequential():
+    finish_times = []
+    start = time.perf_counter()
+    for n in INPUTS:
+        vm = VM(input_fn=lambda n=n: n, print_fn=lambda _value: None)
+        vm.run_code(SUM)
+        finish_times.append(time.perf_counter() - start)
+    return time.perf_counter() - start, None, finish_times[1:]
+
+
+def scheduled(slice_size):
+    finish_times = {}
+    scheduler = Scheduler(slice_size=slice_size)
+    start = time.perf_counter()
+    for index, n in enumerate(INPUTS):
+        scheduler.add(
+            SUM,
+            input_fn=lambda n=n: n,
+            print_fn=lambda _value, index=index: finish_times.__setitem__(
+                index, time.perf_counter() - start
+            ),
+        )
+    scheduler.run()
+    elapsed = time.perf_counter() - start
+    return elapsed, scheduler.stats, [finish_times[i] for i in range(1, len(INPUTS))]
+
+
+def main():
+    runs = [("sequential run_code", sequential)] + [
+        (f"scheduler, slice {size}", lambda size=size: scheduled(size)) for size in (100, 1000, 10000)
+    ]
+    for name, run in runs:
+        elapsed, stats, short_finish = run()
+        throughput = f"{stats.instructions_per_second / 1e6:5.2f} M instr/s" if stats else " " * 16
+        print(
+            f"{name:24} total {elapsed * 1000:8.1f} ms   {throughput}   "
+            f"median short-program finish {statistics.median(short_finish) * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
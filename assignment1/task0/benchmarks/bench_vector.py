@@ -0,0 +1,74 @@
+"""Scalar run_batch vs. the NumPy vector engine.
+
+Runs the sum loop of test_part5 (lanes loop a different number of times)
+and a straight-line polynomial over many input vectors.
+
+Usage: python benchmarks/bench_vector.py [LANES]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from xvm.batch import run_batch
+from xvm.vector import vectorize
+from xvm.vm import parse_string
+
+TESTS_DIR = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(TESTS_DIR))
+
+from test_part5 import TEST2 as SUM_LOOP  # noqa: E402
+
+# 3x^2 - 2x + 7, printed, then x / 4.
+POLYNOMIAL = parse_string("""\
+INPUT_NUMBER
+STORE_VAR "x"
+LOAD_CONST 7
+LOAD_VAR "x"
+LOAD_CONST 2
+MUL
+LOAD_VAR "x"
+LOAD_VAR "x"
+MUL
+LOAD_CONST 3
+MUL
+SUB
+ADD
+PRINT
+LOAD_CONST 4
+LOAD_VAR "x"
+DIV
+PRINT
+""")
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def main():
+    lanes = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = np.random.default_rng(0)
+    cases = [
+        ("sum loop, N in 0..99", parse_string(SUM_LOOP), rng.integers(0, 100, size=(lanes, 1))),
+        ("polynomial", POLYNOMIAL, rng.integers(-10**6, 10**6, size=(lanes, 1))),
+    ]
+    for label, code, inputs in cases:
+        vectors = inputs.tolist()
+        scalar_time, expected = timed(lambda: list(run_batch(code, vectors, workers=0)))
+        program = vectorize(code)
+        vector_time, results = timed(lambda: program.run(inputs))
+        assert [result.to_dict() for result in results] == [result.to_dict() for result in expected]
+        print(f"{label} ({lanes} lanes)")
+        print(f"  {'run_batch, workers=0':24} {scalar_time * 1000:8.1f} ms")
+        print(
+            f"  {'vectorize().run':24} {vector_time * 1000:8.1f} ms   "
+            f"speedup {scalar_time / vector_time:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # Keep xvm-start's compiled-code cache out of the user's home.
+    directory = tmp_path / "xvm-cache"
+    monkeypatch.setenv("XVM_CACHE_DIR", str(directory))
+    return directory
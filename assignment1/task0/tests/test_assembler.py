@@ -0,0 +1,111 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from xvm import start
+from xvm.assembler import AssembledCode, AssemblyError, assemble, assemble_file, parse_argument
+from xvm.build import parse_file_to_json, parse_line
+from xvm.cache import CodeCache
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.vm import VM, parse_string
+
+DIR = Path(__file__).parent.resolve()
+TXT_PATH = DIR / "test_part8_code.txt"
+JSON_PATH = DIR / "test_part8_code.json"
+
+
+def test_assembles_like_the_json_build():
+    code = assemble_file(TXT_PATH)
+    assert isinstance(code, AssembledCode)
+    assert code == VM().parse_code_from_json(JSON_PATH)
+    # "#fast_power" is line 1, its first instruction line 2.
+    assert code.line("fast_power", 0) == 2
+    assert code.line("fast_power", len(code["fast_power"])) is None
+    assert code.line("missing", 0) is None
+
+
+@pytest.mark.parametrize(
+    "text, value",
+    [
+        ('"a b"', "a b"),
+        ('"12"', "12"),
+        ('""', ""),
+        ("12", 12),
+        ("-3", -3),
+        ("1.5", 1.5),
+        (".5", 0.5),
+        ("2e3", 2000.0),
+        ("inf", "inf"),
+        ("fibonacci(n-1)", "fibonacci(n-1)"),
+    ],
+)
+def test_parsers_agree_on_arguments(text, value):
+    assert parse_argument(text) == value and type(parse_argument(text)) is type(value)
+    line = f"LOAD_CONST {text}"
+    op = Op(OpCode.LOAD_CONST, value)
+    assert parse_string(line) == [op]
+    assert assemble(f"#$entrypoint$\n{line}\n")["$entrypoint$"] == [op]
+    assert parse_line(line) == {"op": "LOAD_CONST", "arg": value}
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("#$entrypoint$\nNOT_AN_OPCODE\n", "line 2: Unknown opcode: 'NOT_AN_OPCODE'"),
+        ('#$entrypoint$\n\nLOAD_CONST "abc\n', "line 3: Unterminated string"),
+        ("#$entrypoint$\nLOAD_CONST a b\n", "line 2: Expected one argument"),
+        ("PRINT\n#$entrypoint$\n", "line 1: Instruction outside a function"),
+        ("#f\n#$entrypoint$\n#f\n", "line 3: Function 'f' is defined twice"),
+    ],
+)
+def test_errors_name_the_line(text, message):
+    with pytest.raises(AssemblyError, match=message):
+        assemble(text)
+
+
+def test_parse_string_errors_are_value_errors():
+    with pytest.raises(ValueError, match="Error parsing line: 'LOAD_CONST a b'"):
+        parse_string("LOAD_CONST 1\nLOAD_CONST a b\n")
+
+
+def test_runs_txt_directly_and_caches_it(cache_dir):
+    cache = CodeCache()
+    for _ in range(2):
+        inputs = iter([2, 10])
+        output = []
+        vm = VM(input_fn=lambda: next(inputs), print_fn=output.append, cache=cache)
+        vm.run_code_from_file(TXT_PATH)
+        assert output[-1] == 1024
+        assert vm.functions.line("fast_power", 0) == 2
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_cli_runs_txt_and_reports_source_lines(tmp_path, monkeypatch, capsys):
+    inputs = iter(["2", "10"])
+    monkeypatch.setattr("builtins.input", lambda *_: next(inputs))
+    monkeypatch.setattr(sys, "argv", ["xvm-start", str(TXT_PATH)])
+    start.main()
+    assert capsys.readouterr().out.splitlines()[-1] == "1024"
+
+    path = tmp_path / "bad.txt"
+    path.write_text('#$entrypoint$\n// subtract from a string\nLOAD_CONST "a"\nLOAD_CONST 1\nSUB\n')
+    monkeypatch.setattr(sys, "argv", ["xvm-start", str(path)])
+    with pytest.raises(SystemExit):
+        start.main()
+    assert f"({path}:5)" in capsys.readouterr().err
+
+    path.write_text("#$entrypoint$\nADD\n")
+    with pytest.raises(SystemExit):
+        start.main()
+    err = capsys.readouterr().err
+    assert "ADD needs 2 stack value(s)" in err and f"({path}:2)" in err
+
+
+def test_build_leaves_no_json_on_error(tmp_path):
+    path = tmp_path / "bad.txt"
+    path.write_text("#$entrypoint$\nLOAD_CONST 1\nNOT_AN_OPCODE\n")
+    with pytest.raises(AssemblyError, match="bad.txt:3"):
+        parse_file_to_json(str(path))
+    assert not (tmp_path / "bad.json").exists()
@@ -0,0 +1,94 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from xvm.verifier import VerifyError
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+
+DIR = Path(__file__).parent.resolve()
+FAST_POWER = VM().parse_code_from_json(DIR / "test_part8_code.json")
+SUM = parse_string(SUM_LOOP)
+
+
+async def serve_session(reader, writer):
+    # A stand-in for an XVM server: one program per connection, INPUT_*
+    # reads a line from the client and PRINT writes one back.
+    async def read_line():
+        return (await reader.readline()).decode()
+
+    async def write_line(value):
+        writer.write(f"{value}\n".encode())
+        await writer.drain()
+
+    vm = VM(input_fn=read_line, print_fn=write_line)
+    await vm.run_code_async(FAST_POWER, yield_every=10)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def client(port, inputs):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for value in inputs:
+        writer.write(f"{value}\n".encode())
+    await writer.drain()
+    output = (await reader.read()).decode().splitlines()
+    writer.close()
+    await writer.wait_closed()
+    return output
+
+
+def run_sync(code, inputs):
+    values = iter(inputs)
+    output = []
+    VM(input_fn=lambda: next(values), print_fn=output.append).run_code(code)
+    return [str(value) for value in output]
+
+
+def test_concurrent_sessions_over_streams():
+    sessions = [[2, 10], [-3, 5], [7, 0], [1, 2**100]]
+
+    async def main():
+        server = await asyncio.start_server(serve_session, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(*(client(port, inputs) for inputs in sessions))
+
+    outputs = asyncio.run(main())
+    assert outputs == [run_sync(FAST_POWER, inputs) for inputs in sessions]
+
+
+def test_plain_callbacks_match_run_code():
+    output = []
+    vm = VM(input_fn=lambda: 50, print_fn=output.append)
+    stack, variables = asyncio.run(vm.run_code_async(SUM))
+    assert (stack, variables) == VM(input_fn=lambda: 50, print_fn=lambda _value: None).run_code(SUM)
+    assert output == [1275]
+
+
+def test_long_program_yields_to_the_loop():
+    ticks = []
+
+    async def ticker(done):
+        while not done.is_set():
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main():
+        done = asyncio.Event()
+        task = asyncio.create_task(ticker(done))
+        vm = VM(input_fn=lambda: 2000, print_fn=lambda _value: None)
+        await vm.run_code_async(SUM, yield_every=100)
+        done.set()
+        await task
+
+    asyncio.run(main())
+    assert len(ticks) > 50
+
+
+def test_checked_mode_checks_io():
+    vm = VM(print_fn=lambda _value: None, checked=True)
+    with pytest.raises(VerifyError):
+        asyncio.run(vm.run_code_async(parse_string("PRINT\n")))
@@ -0,0 +1,87 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from xvm import start
+from xvm.batch import run_batch
+from xvm.verifier import VerifyError
+from xvm.vm import VM, parse_string
+
+DIR = Path(__file__).parent.resolve()
+JSON_PATH = DIR / "test_part8_code.json"
+FAST_POWER = VM().parse_code_from_json(JSON_PATH)
+INPUTS = [[base, exponent] for base in (-2, 1, 3) for exponent in range(12)]
+
+
+def expected(base, exponent):
+    return ["Enter base (x): ", "Enter exponent (n): ", "Result: ", base**exponent]
+
+
+def test_in_process_batch():
+    results = list(run_batch(FAST_POWER, INPUTS, workers=0))
+    assert [result.index for result in results] == list(range(len(INPUTS)))
+    for result, (base, exponent) in zip(results, INPUTS):
+        assert result.ok
+        assert result.output == expected(base, exponent)
+        assert result.variables == {"base": base, "exponent": exponent, "result": base**exponent}
+        assert result.stack == []
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_process_pool_matches_in_process(ordered):
+    in_process = [result.to_dict() for result in run_batch(FAST_POWER, INPUTS, workers=0)]
+    pooled = [
+        result.to_dict()
+        for result in run_batch(FAST_POWER, INPUTS, workers=2, ordered=ordered, chunksize=5)
+    ]
+    if not ordered:
+        pooled.sort(key=lambda result: result["index"])
+    assert pooled == in_process
+
+
+def test_errors_are_reported_per_input():
+    code = parse_string('INPUT_NUMBER\nSTORE_VAR "x"\nLOAD_VAR "x"\nLOAD_CONST 1\nDIV\nPRINT\n')
+    results = list(run_batch(code, [[2], [0], [], [4]], workers=2, chunksize=1))
+    assert [result.output for result in results] == [[0.5], [], [], [0.25]]
+    assert results[1].error == "ZeroDivisionError: division by zero"
+    assert results[2].error == "EOFError: input vector exhausted"
+    assert results[3].ok
+
+    # Raised by the call itself, before any input is read.
+    with pytest.raises(VerifyError):
+        run_batch(parse_string("ADD\n"), [[]], workers=2)
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_inputs_are_streamed(ordered):
+    read = []
+
+    def endless():
+        exponent = 0
+        while True:
+            read.append(exponent)
+            yield [2, exponent]
+            exponent += 1
+
+    results = run_batch(FAST_POWER, endless(), workers=2, ordered=ordered, chunksize=4)
+    first = [next(results) for _ in range(6)]
+    results.close()
+    if ordered:
+        assert [result.output[-1] for result in first] == [2**n for n in range(6)]
+    # Up to two chunks per worker in flight besides the finished ones
+    # being read, not the whole endless input.
+    assert len(read) <= 4 * (3 * 2 * 2)
+
+
+def test_cli_batch_mode(tmp_path, monkeypatch, capsys):
+    batch_path = tmp_path / "inputs.jsonl"
+    batch_path.write_text("[2, 10]\n\n[5, 3]\n")
+    monkeypatch.setattr(
+        sys, "argv", ["xvm-start", str(JSON_PATH), "--batch", str(batch_path), "--workers", "0"]
+    )
+    start.main()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["output"][-1] for line in lines] == [1024, 125]
+    assert [line["error"] for line in lines] == [None, None]
@@ -0,0 +1,127 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from xvm import start
+from xvm.build import convert_json_to_xvmc, parse_file_to_json
+from xvm.bytecode import HEADER, BytecodeError, BytecodeFile, encode, read_bytecode, write_bytecode
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.vm import VM, parse_string
+
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI
+
+DIR = Path(__file__).parent.resolve()
+JSON_PATH = DIR / "test_part8_code.json"
+FIBONACCI = {
+    "fibonacci": parse_string(TEST2_FIBONACCI),
+    "$entrypoint$": parse_string(TEST2_ENTRY),
+}
+
+
+def test_round_trip(tmp_path):
+    code = {
+        "$entrypoint$": [
+            Op(OpCode.LOAD_CONST, 1),
+            Op(OpCode.LOAD_CONST, 1.0),
+            Op(OpCode.LOAD_CONST, True),
+            Op(OpCode.LOAD_CONST, -2**63),
+            Op(OpCode.LOAD_CONST, 10**30),
+            Op(OpCode.LOAD_CONST, "héllo \"quoted\""),
+            Op(OpCode.LOAD_CONST, ""),
+            Op(OpCode.LOAD_CONST, 1),
+            Op(OpCode.ADD),
+        ],
+        "empty": [],
+    }
+    path = tmp_path / "prog.xvmc"
+    write_bytecode(code, path)
+    loaded = read_bytecode(path)
+    assert loaded == code
+    args = [op.args[0] for op in loaded["$entrypoint$"][:8]]
+    assert [type(arg) for arg in args] == [int, float, bool, int, int, str, str, int]
+    # Identical instructions decode to one shared Op.
+    assert loaded["$entrypoint$"][0] is loaded["$entrypoint$"][7]
+
+
+def test_functions_are_decoded_lazily(tmp_path):
+    path = tmp_path / "fib.xvmc"
+    write_bytecode(FIBONACCI, path)
+    with BytecodeFile(path) as bytecode:
+        assert list(bytecode) == ["fibonacci", "$entrypoint$"]
+        assert "fibonacci" in bytecode and "missing" not in bytecode
+        assert bytecode._decoded == {}
+        assert bytecode["$entrypoint$"] == FIBONACCI["$entrypoint$"]
+        assert list(bytecode._decoded) == ["$entrypoint$"]
+        assert bytecode["$entrypoint$"] is bytecode["$entrypoint$"]
+        with pytest.raises(KeyError):
+            bytecode["missing"]
+
+
+def test_smaller_than_json_and_runs_the_same(tmp_path):
+    code = VM().parse_code_from_json(JSON_PATH)
+    path = tmp_path / "fast_power.xvmc"
+    write_bytecode(code, path)
+    assert path.stat().st_size < JSON_PATH.stat().st_size / 2
+
+    outputs = []
+    for code_path in (JSON_PATH, path):
+        inputs = iter([2, 10])
+        output = []
+        VM(input_fn=lambda: next(inputs), print_fn=output.append).run_code_from_file(code_path)
+        outputs.append(output)
+    assert outputs[0] == outputs[1] and outputs[0][-1] == 1024
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"", "empty file"),
+        (b"{\"$entrypoint$\": []}", "not an .xvmc file"),
+        (encode(FIBONACCI)[:HEADER.size + 10], "truncated"),
+        (b"XVMC\x09\x00" + encode(FIBONACCI)[6:], "version 9"),
+        (encode({"$entrypoint$": [Op(OpCode.ADD)]}).replace(b"ADD", b"XYZ"), "XYZ"),
+    ],
+)
+def test_bad_files(tmp_path, data, message):
+    path = tmp_path / "bad.xvmc"
+    path.write_bytes(data)
+    with pytest.raises(BytecodeError, match=message):
+        read_bytecode(path)
+
+
+def test_unsupported_constants():
+    with pytest.raises(BytecodeError, match="list"):
+        encode({"$entrypoint$": [Op(OpCode.LOAD_CONST, [1])]})
+    with pytest.raises(BytecodeError, match="more than one argument"):
+        encode({"$entrypoint$": [Op(OpCode.LOAD_CONST, 1, 2)]})
+
+
+def test_build_binary(tmp_path):
+    source = tmp_path / "prog.txt"
+    source.write_text('#$entrypoint$\nLOAD_CONST 2\nLOAD_CONST "x y"\nPRINT\nPRINT\n')
+    parse_file_to_json(str(source), binary=True)
+    assert read_bytecode(tmp_path / "prog.xvmc") == {
+        "$entrypoint$": [Op(OpCode.LOAD_CONST, 2), Op(OpCode.LOAD_CONST, "x y"), Op(OpCode.PRINT), Op(OpCode.PRINT)]
+    }
+
+    json_path = tmp_path / "fast_power.json"
+    json_path.write_text(JSON_PATH.read_text())
+    convert_json_to_xvmc(str(json_path))
+    assert read_bytecode(tmp_path / "fast_power.xvmc") == VM().parse_code_from_json(JSON_PATH)
+
+
+def test_cli_runs_xvmc(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "fast_power.xvmc"
+    write_bytecode(VM().parse_code_from_json(JSON_PATH), path)
+    inputs = iter(["2", "10"])
+    monkeypatch.setattr("builtins.input", lambda *_: next(inputs))
+    monkeypatch.setattr(sys, "argv", ["xvm-start", str(path)])
+    start.main()
+    assert capsys.readouterr().out.splitlines()[-1] == "1024"
+
+    path.write_bytes(b"XVMC")
+    with pytest.raises(SystemExit):
+        start.main()
+    assert "not an .xvmc file" in capsys.readouterr().err
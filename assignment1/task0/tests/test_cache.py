@@ -0,0 +1,177 @@
+import io
+import os
+import pickle
+import sys
+import threading
+from pathlib import Path
+
+from xvm import start
+from xvm.bytecode import write_bytecode
+from xvm.cache import FORMAT, HASH_CHUNK_SIZE, SUFFIX, CodeCache
+from xvm.peephole import SuperOp
+from xvm.vm import VM
+
+DIR = Path(__file__).parent.resolve()
+JSON_PATH = DIR / "test_part8_code.json"
+
+
+def run(path, cache, inputs=(2, 10), **options):
+    values = iter(inputs)
+    output = []
+    vm = VM(input_fn=lambda: next(values), print_fn=output.append, cache=cache, **options)
+    vm.run_code_from_file(path)
+    return vm, output
+
+
+def test_warm_load_skips_parsing_and_linking(tmp_path, monkeypatch):
+    cache = CodeCache(tmp_path / "cache")
+    _, cold = run(JSON_PATH, cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(cache.entries()) == 1
+
+    def fail(*args):
+        raise AssertionError("parsed or linked on a warm load")
+
+    monkeypatch.setattr("xvm.json_stream.iter_functions", fail)
+    monkeypatch.setattr("xvm.vm.read_json_code", fail)
+    monkeypatch.setattr(VM, "_link_function", fail)
+    vm, warm = run(JSON_PATH, cache)
+    assert warm == cold and warm[-1] == 1024
+    assert cache.hits == 1
+    # The cached linked functions belong to the cached source functions.
+    assert all(vm._linked[name].ops is ops for name, ops in vm.functions.items())
+
+
+def test_key_covers_content_and_options(tmp_path):
+    cache = CodeCache(tmp_path / "cache")
+    copy = tmp_path / "copy.json"
+    copy.write_bytes(JSON_PATH.read_bytes())
+    run(JSON_PATH, cache)
+    run(copy, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    vm, output = run(copy, cache, optimize=True)
+    assert cache.misses == 2 and output[-1] == 1024
+    # Superinstructions survive the round trip through the cache.
+    vm, output = run(copy, cache, optimize=True)
+    assert cache.hits == 2 and output[-1] == 1024
+    assert any(isinstance(op, SuperOp) for linked in vm._linked.values() for op in linked.program)
+
+    copy.write_bytes(JSON_PATH.read_bytes().replace(b"\n", b"\n "))
+    run(copy, cache)
+    assert cache.misses == 3
+
+    xvmc = tmp_path / "fast_power.xvmc"
+    write_bytecode(VM().parse_code_from_json(JSON_PATH), xvmc)
+    assert run(xvmc, cache)[1][-1] == 1024
+    assert run(xvmc, cache)[1][-1] == 1024
+    assert (cache.hits, cache.misses) == (3, 4)
+
+
+def test_key_covers_the_cache_format(tmp_path, monkeypatch):
+    cache = CodeCache(tmp_path / "cache")
+    run(JSON_PATH, cache)
+    monkeypatch.setattr("xvm.cache.FORMAT", FORMAT + 1)
+    assert run(JSON_PATH, cache)[1][-1] == 1024
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_key_hashes_the_file_in_chunks(tmp_path, monkeypatch):
+    reads = []
+
+    class File(io.BufferedReader):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    monkeypatch.setattr("xvm.cache.open", lambda path, mode: File(io.FileIO(path, mode)), raising=False)
+    path = tmp_path / "big.json"
+    path.write_bytes(JSON_PATH.read_bytes() + b" " * (3 * HASH_CHUNK_SIZE))
+    key = CodeCache(tmp_path / "cache").key(path)
+    assert len(reads) > 3 and all(0 < size <= HASH_CHUNK_SIZE for size in reads)
+
+    monkeypatch.undo()
+    copy = tmp_path / "copy.json"
+    copy.write_bytes(path.read_bytes())
+    assert CodeCache(tmp_path / "cache").key(copy) == key != CodeCache(tmp_path / "cache").key(JSON_PATH)
+
+
+def test_non_empty_stack_bypasses_the_cache(tmp_path):
+    cache = CodeCache(tmp_path / "cache")
+    vm = VM(cache=cache)
+    vm.stack = [1]
+    vm.load_code_from_json(JSON_PATH)
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_corrupt_entries_are_rebuilt(tmp_path):
+    cache = CodeCache(tmp_path / "cache")
+    run(JSON_PATH, cache)
+    [(_, _, path)] = cache.entries()
+    Path(path).write_bytes(b"not a pickle")
+    assert run(JSON_PATH, cache)[1][-1] == 1024
+    assert cache.misses == 2
+    with open(path, "rb") as file:
+        assert pickle.load(file)[0].keys() == {"$entrypoint$", "fast_power"}
+
+
+def test_lru_eviction(tmp_path):
+    cache = CodeCache(tmp_path / "cache")
+    for index in range(3):
+        cache.put(f"{index}", b"x" * 1000)
+        os.utime(cache.path(f"{index}"), ns=(index * 10**9, index * 10**9))
+    entry_size = cache.size() // 3
+
+    # A hit makes an entry the most recently used.
+    assert cache.get("0") == b"x" * 1000
+    cache.max_size = 3 * entry_size
+    cache.put("3", b"x" * 1000)
+    assert sorted(Path(path).name for _, _, path in cache.entries()) == [
+        name + SUFFIX for name in ("0", "2", "3")
+    ]
+    assert cache.size() <= cache.max_size
+
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_concurrent_writers_never_leave_partial_entries(tmp_path):
+    cache = CodeCache(tmp_path / "cache")
+    entry = list(range(100_000))
+    errors = []
+
+    def writer():
+        for _ in range(20):
+            cache.put("shared", entry)
+
+    def reader():
+        for _ in range(200):
+            value = CodeCache(cache.directory).get("shared")
+            if value is not None and value != entry:
+                errors.append(value)
+
+    threads = [threading.Thread(target=writer) for _ in range(3)] + [threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(cache.directory) == ["shared" + SUFFIX]
+
+
+def test_unwritable_cache_directory(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = CodeCache(blocker / "cache")
+    assert run(JSON_PATH, cache)[1][-1] == 1024
+    assert cache.entries() == []
+
+
+def test_cli_cache_and_no_cache(cache_dir, monkeypatch, capsys):
+    for argv, entries in ([str(JSON_PATH), "--no-cache"], 0), ([str(JSON_PATH)], 1), ([str(JSON_PATH)], 1):
+        inputs = iter(["2", "10"])
+        monkeypatch.setattr("builtins.input", lambda *_: next(inputs))
+        monkeypatch.setattr(sys, "argv", ["xvm-start", *argv])
+        start.main()
+        assert capsys.readouterr().out.splitlines()[-1] == "1024"
+        assert len(CodeCache(cache_dir).entries()) == entries
@@ -0,0 +1,58 @@
+import xvm.vm
+from xvm.frame import Frame
+from xvm.vm import VM, parse_string
+
+COUNTDOWN = """\
+STORE_VAR "n"
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP done
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+LOAD_CONST "countdown"
+CALL
+# Not a tail call, so every level keeps its frame.
+LOAD_CONST 0
+STORE_VAR "n"
+LABEL done
+"""
+
+ENTRY = """\
+LOAD_CONST 7
+STORE_VAR "keep"
+LOAD_CONST 50
+LOAD_CONST "countdown"
+CALL
+"""
+
+
+def test_frame_has_no_instance_dict():
+    frame = Frame("f", 3)
+    assert not hasattr(frame, "__dict__")
+    assert frame.slots == []
+
+
+def test_frames_are_pooled(monkeypatch):
+    created = []
+
+    class CountingFrame(Frame):
+        __slots__ = ()
+
+        def __init__(self, *args):
+            created.append(self)
+            super().__init__(*args)
+
+    monkeypatch.setattr(xvm.vm, "Frame", CountingFrame)
+    code = {"countdown": parse_string(COUNTDOWN), "$entrypoint$": parse_string(ENTRY)}
+
+    vm = VM()
+    _, variables = vm.run_code(code)
+    assert len(created) == 51
+    assert variables == {"keep": 7}
+
+    _, variables = vm.run_code(code)
+    assert len(created) == 51
+    assert variables == {"keep": 7}
+    assert vm.call_stack == []
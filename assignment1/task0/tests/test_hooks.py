@@ -0,0 +1,110 @@
+from pathlib import Path
+
+from xvm.enums.event import Event
+from xvm.enums.op_code import OpCode
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+from test_tail_calls import COUNTDOWN, entry
+
+DIR = Path(__file__).parent.resolve()
+FAST_POWER = VM().parse_code_from_json(DIR / "test_part8_code.json")
+
+
+def feed(*values):
+    inputs = iter(values)
+    return lambda: next(inputs)
+
+
+def recorder(events):
+    def record(vm, function, pc, arg):
+        events.append((function, pc, arg))
+
+    return record
+
+
+def test_instruction_events_cover_the_program():
+    code = parse_string(SUM_LOOP)
+    for optimize in (False, True):
+        seen = []
+        vm = VM(input_fn=feed(3), print_fn=lambda _value: None, optimize=optimize)
+        vm.add_hook(Event.INSTRUCTION, recorder(seen))
+        _, variables = vm.run_code(code)
+        assert variables == {"N": 3, "s": 6, "i": 4}
+
+        counted = VM(input_fn=feed(3), print_fn=lambda _value: None)
+        counted.load_code(code)
+        # Superinstructions are reported as the instructions they stand for.
+        assert len(seen) == counted.run_for(10**6)
+        assert seen[0] == ("$entrypoint$", 0, code[0])
+        assert {op.opcode for _, _, op in seen} <= set(OpCode)
+
+
+def test_call_return_and_io_events():
+    events = []
+    vm = VM(input_fn=feed(2, 3), print_fn=lambda _value: None)
+    for event in (Event.CALL, Event.RETURN, Event.INPUT, Event.OUTPUT):
+        vm.add_hook(event, lambda vm, function, pc, arg, event=event: events.append((event, function, arg)))
+    vm.run_code(FAST_POWER)
+
+    calls = [item for item in events if item[0] == Event.CALL]
+    returns = [item for item in events if item[0] == Event.RETURN]
+    assert calls == [(Event.CALL, "fast_power", "$entrypoint$")] + [(Event.CALL, "fast_power", "fast_power")] * 2
+    assert returns == [(Event.RETURN, "fast_power", "fast_power")] * 2 + [(Event.RETURN, "fast_power", "$entrypoint$")]
+    assert [item for item in events if item[0] == Event.INPUT] == [
+        (Event.INPUT, "$entrypoint$", 2),
+        (Event.INPUT, "$entrypoint$", 3),
+    ]
+    assert events[0] == (Event.OUTPUT, "$entrypoint$", "Enter base (x): ")
+    assert events[-1] == (Event.OUTPUT, "$entrypoint$", 8)
+
+
+def test_falling_off_the_end_and_tail_calls_return():
+    events = []
+    vm = VM()
+    vm.add_hook(Event.CALL, recorder(events))
+    vm.add_hook(Event.RETURN, recorder(events))
+    code = {"countdown": parse_string(COUNTDOWN), "$entrypoint$": entry("countdown", 3)}
+    vm.run_code(code)
+    # countdown calls itself in tail position: four calls, one return.
+    assert [arg for _, _, arg in events] == ["$entrypoint$"] + ["countdown"] * 3 + ["$entrypoint$"]
+
+    falls_off = {"f": parse_string("LOAD_CONST 1\n"), "$entrypoint$": entry("f", 0)}
+    events.clear()
+    vm = VM()
+    vm.add_hook(Event.RETURN, recorder(events))
+    vm.run_code(falls_off)
+    assert events == [("f", 1, "$entrypoint$")]
+
+
+def test_function_filter_and_enabling():
+    seen = []
+    vm = VM(input_fn=feed(2, 3, 2, 3), print_fn=lambda _value: None)
+    hook = vm.add_hook(Event.INSTRUCTION, recorder(seen), functions=["fast_power"])
+    vm.run_code(FAST_POWER)
+    assert seen and {function for function, _, _ in seen} == {"fast_power"}
+
+    seen.clear()
+    hook.enabled = False
+    assert not vm._active_hooks
+    vm.run_code(FAST_POWER)
+    assert seen == []
+
+    hook.enabled = True
+    vm.remove_hook(hook)
+    assert not vm._active_hooks
+
+
+def test_hooks_with_run_for_and_jit():
+    seen = []
+    vm = VM(input_fn=feed(5), print_fn=lambda _value: None, jit=True)
+    vm.add_hook(Event.OUTPUT, recorder(seen))
+    vm.run_code(parse_string(SUM_LOOP))
+    assert [arg for _, _, arg in seen] == [15]
+
+    vm = VM(input_fn=feed(5), print_fn=lambda _value: None)
+    vm.load_code(parse_string(SUM_LOOP))
+    vm.add_hook(Event.OUTPUT, recorder(seen))
+    while not vm.finished:
+        vm.run_for(7)
+    assert [arg for _, _, arg in seen] == [15, 15]
@@ -0,0 +1,165 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from xvm import start
+from xvm.jit import JitError, compile_program
+from xvm.vm import VM, parse_string
+
+from test_tail_calls import COUNTDOWN as TAIL_COUNTDOWN
+from test_part5 import TEST1 as COMPARE, TEST2 as SUM_LOOP
+from test_part6 import TEST1_ENTRY, TEST1_FOO, TEST2_ENTRY, TEST2_FIBONACCI
+
+DIR = Path(__file__).parent.resolve()
+
+
+def run(code, inputs, jit):
+    values = iter(inputs)
+    output = []
+    vm = VM(input_fn=lambda: next(values), print_fn=output.append, jit=jit)
+    stack, variables = vm.run_code(code)
+    return stack, variables, output
+
+
+@pytest.fixture
+def compiled_runs(monkeypatch):
+    runs = []
+    run_compiled = VM._run_compiled
+
+    def spy(vm):
+        ran = run_compiled(vm)
+        runs.append(ran)
+        return ran
+
+    monkeypatch.setattr(VM, "_run_compiled", spy)
+    return runs
+
+
+PROGRAMS = [
+    ({"$entrypoint$": parse_string(COMPARE)}, [3, 5]),
+    ({"$entrypoint$": parse_string(COMPARE)}, [3, 3]),
+    ({"$entrypoint$": parse_string(SUM_LOOP)}, [100]),
+    ({"$entrypoint$": parse_string(SUM_LOOP)}, [0]),
+    ({"foo": parse_string(TEST1_FOO), "$entrypoint$": parse_string(TEST1_ENTRY)}, [2, 5]),
+    (
+        {"fibonacci": parse_string(TEST2_FIBONACCI), "$entrypoint$": parse_string(TEST2_ENTRY)},
+        [15],
+    ),
+    (VM().parse_code_from_json(DIR / "test_part8_code.json"), [-2, 7]),
+    (VM().parse_code_from_json(DIR / "test_part8_code.json"), [1, 2**1000]),
+]
+
+
+@pytest.mark.parametrize("code, inputs", PROGRAMS)
+def test_jit_matches_interpreter(code, inputs):
+    assert run(code, inputs, jit=True) == run(code, inputs, jit=False)
+
+
+def test_stack_values_and_store_order():
+    code = parse_string("""\
+LOAD_CONST 1
+STORE_VAR "x"
+LOAD_VAR "x"
+LOAD_CONST 5
+STORE_VAR "x"
+LOAD_VAR "x"
+ADD
+LOAD_CONST 2.5
+LOAD_CONST "left"
+""")
+    stack, variables, _ = run(code, [], jit=True)
+    assert stack == [6, 2.5, "left"]
+    assert variables == {"x": 5}
+
+
+def test_preloaded_variables_are_kept():
+    vm = VM(print_fn=lambda _value: None, jit=True)
+    vm.variables = {"x": 4, "untouched": "yes"}
+    _, variables = vm.run_code(parse_string('LOAD_VAR "x"\nLOAD_VAR "x"\nMUL\nSTORE_VAR "y"\n'))
+    assert variables == {"x": 4, "untouched": "yes", "y": 16}
+
+
+def test_deep_recursion_falls_back_to_interpreter(compiled_runs):
+    code = {
+        "countdown": parse_string(TAIL_COUNTDOWN),
+        "$entrypoint$": parse_string(
+            'INPUT_NUMBER\nPRINT\nINPUT_NUMBER\nLOAD_CONST "countdown"\nCALL\nPRINT\n'
+        ),
+    }
+    recursion_limit = sys.getrecursionlimit()
+    # The inputs read and the values printed before the JIT gave up are
+    # not read or printed again.
+    assert run(code, [7, 200000], jit=True) == run(code, [7, 200000], jit=False) == ([], {}, [7, 0])
+    assert compiled_runs == [True]
+    assert sys.getrecursionlimit() == recursion_limit
+
+
+def test_entrypoint_can_be_called():
+    code = {
+        "$entrypoint$": parse_string("""\
+INPUT_NUMBER
+STORE_VAR "x"
+LOAD_VAR "x"
+PRINT
+LOAD_CONST 0
+LOAD_VAR "x"
+EQ
+CJMP done
+LOAD_CONST "$entrypoint$"
+CALL
+LABEL done
+"""),
+    }
+    assert run(code, [2, 1, 0], jit=True) == run(code, [2, 1, 0], jit=False)
+    assert run(code, [2, 1, 0], jit=True)[2] == [2, 1, 0]
+
+
+def test_runtime_errors_match_interpreter():
+    missing_variable = parse_string('LOAD_VAR "nope"\nPRINT\n')
+    missing_function = parse_string('LOAD_CONST "nope"\nCALL\n')
+    # Each fails first on the LOAD_VAR of an unset variable.
+    before_type_error = parse_string('LOAD_VAR "a"\nLOAD_CONST "x"\nLOAD_CONST 1\nADD\nADD\nPRINT\n')
+    before_other_variable = parse_string('LOAD_VAR "a"\nLOAD_VAR "b"\nADD\nPRINT\n')
+    before_division = parse_string('LOAD_VAR "a"\nLOAD_CONST 0\nLOAD_CONST 1\nDIV\nSTORE_VAR "x"\n')
+    for code in (missing_variable, missing_function, before_type_error, before_other_variable, before_division):
+        with pytest.raises(NameError) as interpreted:
+            run(code, [], jit=False)
+        with pytest.raises(NameError) as compiled:
+            run(code, [], jit=True)
+        assert str(compiled.value) == str(interpreted.value)
+
+
+def test_breakpoint_falls_back_to_interpreter():
+    code = parse_string('LOAD_CONST 1\nBREAKPOINT\nLOAD_CONST 2\n')
+    with pytest.raises(JitError):
+        compile_program({"$entrypoint$": code})
+
+    vm = VM(jit=True)
+    stack, _ = vm.run_code(code)
+    assert stack == [1]
+    assert vm.is_breakpoint_hit()
+
+
+def test_file_entry_points_use_the_jit(compiled_runs, monkeypatch, capsys):
+    inputs = iter([2, 10])
+    output = []
+    vm = VM(input_fn=lambda: next(inputs), print_fn=output.append, jit=True)
+    vm.run_code_from_file(DIR / "test_part8_code.json")
+    assert output[-1] == 1024
+    assert compiled_runs == [True]
+
+    inputs = iter(["2", "10"])
+    monkeypatch.setattr("builtins.input", lambda *_: next(inputs))
+    monkeypatch.setattr(sys, "argv", ["xvm-start", str(DIR / "test_part8_code.json"), "--jit"])
+    start.main()
+    assert capsys.readouterr().out.splitlines()[-1] == "1024"
+    assert compiled_runs == [True, True]
+
+
+def test_resuming_after_a_breakpoint_interprets(compiled_runs):
+    vm = VM(jit=True)
+    vm.run_code(parse_string("LOAD_CONST 1\nBREAKPOINT\nLOAD_CONST 2\n"))
+    stack, _ = vm.run_loaded_code()
+    assert stack == [1, 2]
+    assert compiled_runs == [False]
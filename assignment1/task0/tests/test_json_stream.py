@@ -0,0 +1,155 @@
+import io
+import json
+import os
+import tracemalloc
+
+import pytest
+
+from xvm.build import json_to_ops, write_json_stream
+from xvm.json_stream import iter_function_texts, iter_functions, read_code, read_code_lazily
+from xvm.vm import VM
+
+# Size of the generated program in test_bounded_memory; set XVM_STREAM_TEST_MB
+# to a few hundred to check a really large file.
+STREAM_TEST_MB = float(os.environ.get("XVM_STREAM_TEST_MB", "4"))
+
+PROGRAM = {
+    "$entrypoint$": [
+        {"op": "LOAD_CONST", "arg": "] }, {\"op\": \"PRINT\"} ["},
+        {"op": "PRINT"},
+        {"op": "LOAD_CONST", "arg": 12345678901234567890},
+        {"op": "LOAD_CONST", "arg": -1.5e-7},
+        {"op": "LOAD_CONST", "arg": 1},
+        {"op": "LOAD_CONST", "arg": 1.0},
+        {"op": "LOAD_CONST", "arg": True},
+        {"op": "LOAD_CONST", "arg": "héllo\n☃"},
+        {"op": "LABEL", "arg": "end"},
+    ],
+    "empty": [],
+    "f": [{"op": "ADD"}] * 50,
+}
+
+
+def expected(program):
+    return json_to_ops(program)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 64 * 1024])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_matches_json_load(chunk_size, indent):
+    text = json.dumps(PROGRAM, indent=indent)
+    code = dict(iter_functions(io.StringIO(text), chunk_size))
+    assert code == expected(PROGRAM)
+    assert list(code) == list(PROGRAM)
+    args = [op.args[0] for op in code["$entrypoint$"][4:7]]
+    assert [type(arg) for arg in args] == [int, float, bool]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64 * 1024])
+def test_function_texts(chunk_size, tmp_path):
+    program = dict(PROGRAM, nested=[{"op": "LOAD_CONST", "arg": [1, ["[", "\\"]]}])
+    for indent in (None, 4):
+        text = json.dumps(program, indent=indent)
+        texts = dict(iter_function_texts(io.StringIO(text), chunk_size))
+        assert {name: json.loads(body) for name, body in texts.items()} == program
+
+    path = tmp_path / "program.json"
+    path.write_text(json.dumps(PROGRAM))
+    code = read_code_lazily(path, chunk_size)
+    assert code.decoded == []
+    assert code["f"] == expected(PROGRAM)["f"]
+    assert code.decoded == ["f"]
+
+
+def test_writer_matches_json_dump(tmp_path):
+    stream = io.StringIO()
+    write_json_stream(PROGRAM.items(), stream)
+    assert stream.getvalue() == json.dumps(PROGRAM, indent=4)
+
+    stream = io.StringIO()
+    write_json_stream(iter([]), stream)
+    assert stream.getvalue() == "{}"
+
+    path = tmp_path / "program.json"
+    with open(path, "w") as file:
+        write_json_stream(((name, iter(ops)) for name, ops in PROGRAM.items()), file)
+    assert read_code(path) == VM().parse_code_from_json(path) == expected(PROGRAM)
+
+
+def test_functions_are_yielded_as_they_are_read():
+    text = json.dumps({f"f{index}": [{"op": "ADD"}] * 100 for index in range(100)})
+    file = io.StringIO(text)
+    functions = iter_functions(file, chunk_size=256)
+    name, ops = next(functions)
+    assert name == "f0" and len(ops) == 100
+    assert file.tell() < len(text) / 10
+
+
+@pytest.mark.parametrize(
+    "text, inside_a_list",
+    [
+        ("", False),
+        ("[]", False),
+        ('{"f": [{"op": "ADD"}]', False),
+        ('{"f": [{"op": "ADD"} {"op": "ADD"}]}', True),
+        ('{"f": [{"op": "ADD"},]}', True),
+        ('{"f": {"op": "ADD"}}', False),
+        ('{"f" [{"op": "ADD"}]}', False),
+        ('{f: []}', False),
+        ('{"f": []} {}', False),
+        ('{"f": [{"op": "LOAD_CONST", "arg": "unterminated]}', False),
+    ],
+)
+def test_malformed_json(text, inside_a_list):
+    for chunk_size in (3, 64 * 1024):
+        with pytest.raises(json.JSONDecodeError):
+            dict(iter_functions(io.StringIO(text), chunk_size))
+        texts = iter_function_texts(io.StringIO(text), chunk_size)
+        if inside_a_list:
+            # Instruction lists are only checked when they are decoded.
+            [(_, body)] = texts
+            with pytest.raises(json.JSONDecodeError):
+                json.loads(body)
+        else:
+            with pytest.raises(json.JSONDecodeError):
+                dict(texts)
+
+
+def generated_functions(megabytes):
+    """Functions of 1000 instructions each, about ``megabytes`` of JSON in all."""
+    size = 0
+    index = 0
+    while size < megabytes * 2**20:
+        ops = []
+        for step in range(250):
+            ops += [
+                {"op": "LOAD_CONST", "arg": index * 1000 + step},
+                {"op": "LOAD_VAR", "arg": f"v{step % 10}"},
+                {"op": "ADD"},
+                {"op": "STORE_VAR", "arg": f"v{step % 10}"},
+            ]
+        # About 60 characters per instruction with indent=4.
+        size += 60 * len(ops)
+        yield f"f{index}", ops
+        index += 1
+
+
+def test_bounded_memory(tmp_path):
+    path = tmp_path / "large.json"
+    with open(path, "w") as file:
+        write_json_stream(generated_functions(STREAM_TEST_MB), file)
+    file_size = path.stat().st_size
+
+    tracemalloc.start()
+    try:
+        code = read_code(path)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(code) == sum(1 for _ in generated_functions(STREAM_TEST_MB))
+    assert code["f1"][0].args == (1000,)
+    # Beyond the Ops it returns, parsing only ever holds about one chunk of
+    # text and one batch of decoded instructions, however big the file is.
+    assert peak - retained < 3 * 2**20
+    assert retained < file_size
@@ -0,0 +1,104 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from xvm import start
+from xvm.build import json_to_ops, ops_to_json
+from xvm.bytecode import BytecodeFile, write_bytecode
+from xvm.lazy import LazyCode
+from xvm.verifier import VerifyError
+from xvm.vm import VM, parse_string
+
+from test_tail_calls import COUNTDOWN, entry
+
+DIR = Path(__file__).parent.resolve()
+JSON_PATH = DIR / "test_part8_code.json"
+
+# One function is called; the others would fail to decode or verify.
+LIBRARY = {
+    "$entrypoint$": ops_to_json({"$entrypoint$": entry("countdown", 3)})["$entrypoint$"],
+    "countdown": ops_to_json({"countdown": parse_string(COUNTDOWN)})["countdown"],
+    "unknown_opcode": [{"op": "NOT_AN_OPCODE"}],
+    "bad_label": [{"op": "JMP", "arg": "nowhere"}],
+}
+
+
+@pytest.fixture(params=["json", "xvmc"])
+def library(request, tmp_path):
+    path = tmp_path / "library.json"
+    path.write_text(json.dumps(LIBRARY))
+    if request.param == "xvmc":
+        code = dict(LIBRARY)
+        del code["unknown_opcode"]
+        xvmc = tmp_path / "library.xvmc"
+        write_bytecode(json_to_ops(code), xvmc)
+        return xvmc
+    return path
+
+
+def test_only_called_functions_are_decoded(library):
+    vm = VM()
+    code = vm.load_code_from_file(library, lazy=True)
+    assert isinstance(code, (LazyCode, BytecodeFile))
+    assert list(code._decoded) == ["$entrypoint$"]
+    assert list(vm._linked) == ["$entrypoint$"]
+
+    vm.run_loaded_code()
+    assert vm.variables == {"result": 0}
+    assert sorted(code._decoded) == ["$entrypoint$", "countdown"]
+    assert sorted(vm._linked) == ["$entrypoint$", "countdown"]
+
+
+def test_eager_loading_rejects_the_library(library):
+    with pytest.raises((ValueError, VerifyError)):
+        VM().load_code_from_file(library)
+
+
+def test_errors_surface_on_first_call(tmp_path):
+    program = dict(LIBRARY)
+    path = tmp_path / "library.json"
+    for callee, error, message in [
+        ("missing", NameError, "Function 'missing' is not defined"),
+        ("unknown_opcode", ValueError, "NOT_AN_OPCODE"),
+        ("bad_label", VerifyError, "Label 'nowhere' is not defined"),
+    ]:
+        program["$entrypoint$"] = ops_to_json({"e": entry(callee, 1)})["e"]
+        path.write_text(json.dumps(program))
+        vm = VM()
+        vm.load_code_from_json(path, lazy=True)
+        with pytest.raises(error, match=message):
+            vm.run_loaded_code()
+
+
+def test_entrypoint_is_still_checked(tmp_path):
+    path = tmp_path / "underflow.json"
+    path.write_text(json.dumps({"$entrypoint$": [{"op": "ADD"}], "f": [{"op": "NOPE"}]}))
+    with pytest.raises(VerifyError, match="ADD needs 2"):
+        VM().load_code_from_json(path, lazy=True)
+
+
+def test_lazy_matches_eager_for_fast_power():
+    outputs = []
+    for lazy in (False, True):
+        for options in ({}, {"optimize": True}, {"jit": True}):
+            inputs = iter([3, 5])
+            output = []
+            vm = VM(input_fn=lambda: next(inputs), print_fn=output.append, **options)
+            vm.run_code_from_json(JSON_PATH, lazy=lazy)
+            outputs.append(output)
+    assert all(output == outputs[0] for output in outputs) and outputs[0][-1] == 243
+
+
+def test_cli_lazy(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "library.json"
+    path.write_text(json.dumps(LIBRARY))
+    monkeypatch.setattr(sys, "argv", ["xvm-start", str(path), "--lazy"])
+    start.main()
+    assert capsys.readouterr().err == ""
+
+    monkeypatch.setattr(sys, "argv", ["xvm-start", str(path)])
+    with pytest.raises(SystemExit):
+        start.main()
+    assert "NOT_AN_OPCODE" in capsys.readouterr().err
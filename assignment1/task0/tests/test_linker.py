@@ -0,0 +1,97 @@
+import pytest
+
+from xvm.enums.op_code import OpCode
+from xvm.linker import link_function
+from xvm.verifier import VerifyError
+from xvm.vm import VM, parse_string
+
+LOOP = """\
+LOAD_CONST 0
+STORE_VAR "i"
+LABEL loop
+LOAD_VAR "i"
+LOAD_CONST 1
+ADD
+STORE_VAR "i"
+LOAD_CONST 5
+LOAD_VAR "i"
+LT
+CJMP loop
+JMP done
+LOAD_CONST "unreachable"
+PRINT
+LABEL done
+"""
+
+
+def test_jumps_resolved_to_label_pcs():
+    linked = link_function("$entrypoint$", parse_string(LOOP)).program
+    assert linked[10].opcode == OpCode.CJMP
+    assert linked[10].args == (2,)
+    assert linked[11].args == (14,)
+    assert linked[2].opcode == OpCode.LABEL
+
+
+def test_linked_program_runs():
+    out = []
+    vm = VM(print_fn=out.append)
+    stack, variables = vm.run_code(parse_string(LOOP))
+    assert variables["i"] == 5
+    assert out == []
+    assert len(stack) == 0
+
+
+def test_undefined_label_reported_at_load():
+    out = []
+    vm = VM(print_fn=out.append)
+    code = parse_string('LOAD_CONST "before"\nPRINT\nJMP nowhere\n')
+    with pytest.raises(VerifyError, match="nowhere"):
+        vm.run_code(code)
+    assert out == []
+
+
+COUNTDOWN = """\
+STORE_VAR "n"
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP done
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+LOAD_CONST "countdown"
+CALL
+LABEL done
+"""
+
+
+def test_functions_linked_once_per_load(monkeypatch):
+    import xvm.vm
+
+    calls = []
+
+    def counting_link(name, ops):
+        calls.append(name)
+        return link_function(name, ops)
+
+    monkeypatch.setattr(xvm.vm, "link_function", counting_link)
+    code = {
+        "countdown": parse_string(COUNTDOWN),
+        "$entrypoint$": parse_string('LOAD_CONST 20\nLOAD_CONST "countdown"\nCALL\n'),
+    }
+    vm = VM()
+    vm.run_code(code)
+    assert sorted(calls) == ["$entrypoint$", "countdown"]
+
+
+def test_frames_share_label_table():
+    code = {
+        "countdown": parse_string(COUNTDOWN.replace("LABEL done", "LABEL done\nBREAKPOINT")),
+        "$entrypoint$": parse_string('LOAD_CONST 3\nLOAD_CONST "countdown"\nCALL\n'),
+    }
+    vm = VM()
+    vm.run_code(code)
+    assert len(vm.call_stack) == 4
+    tables = [frame.labels for frame in vm.call_stack[1:]] + [vm.labels]
+    assert all(table is vm.labels for table in tables)
+
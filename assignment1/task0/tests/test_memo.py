@@ -0,0 +1,147 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from xvm.build import ops_to_json
+from xvm.memo import MemoCache
+from xvm.purity import analyze, stack_signature
+from xvm.vm import VM, parse_string
+
+from test_part6 import TEST1_FOO, TEST2_ENTRY, TEST2_FIBONACCI
+from test_tail_calls import IS_EVEN, IS_ODD
+
+DIR = Path(__file__).parent.resolve()
+
+FIBONACCI = {
+    "fibonacci": parse_string(TEST2_FIBONACCI),
+    "$entrypoint$": parse_string(TEST2_ENTRY),
+}
+
+
+def test_signatures():
+    fast_power = VM().parse_code_from_json(DIR / "test_part8_code.json")
+    assert analyze(fast_power) == {"fast_power": (2, 1)}
+    assert analyze(FIBONACCI) == {"fibonacci": (1, 1)}
+    assert analyze({
+        "foo": parse_string(TEST1_FOO),
+        "is_even": parse_string(IS_EVEN),
+        "is_odd": parse_string(IS_ODD),
+    }) == {"foo": (2, 1), "is_even": (1, 1), "is_odd": (1, 1)}
+
+
+def test_impure_and_unanalyzable_functions_stay_uncached():
+    functions = {
+        "prints": parse_string('STORE_VAR "x"\nLOAD_VAR "x"\nPRINT\n'),
+        "calls_prints": parse_string('LOAD_CONST 1\nLOAD_CONST "prints"\nCALL\n'),
+        "dynamic_call": parse_string('LOAD_CONST "f"\nSTORE_VAR "g"\nLOAD_VAR "g"\nCALL\n'),
+        # Returns one value on one path and two on the other.
+        "uneven": parse_string(
+            'LOAD_CONST 0\nEQ\nCJMP two\nLOAD_CONST 1\nRET\nLABEL two\nLOAD_CONST 1\nLOAD_CONST 2\nRET\n'
+        ),
+        # Pushes one more value per iteration.
+        "growing": parse_string("LABEL loop\nLOAD_CONST 1\nJMP loop\n"),
+        "pure": parse_string("LOAD_CONST 0\nEQ\n"),
+    }
+    assert analyze(functions) == {"pure": (1, 1)}
+    assert stack_signature(functions["uneven"], {}) is None
+
+
+def run_fibonacci(n, memo_size):
+    output = []
+    vm = VM(input_fn=lambda: n, print_fn=output.append, memo_size=memo_size)
+    stack, variables = vm.run_code(FIBONACCI)
+    return vm, stack, variables, output
+
+
+def test_memoized_results_match():
+    plain = run_fibonacci(20, 0)
+    memoized = run_fibonacci(20, 64)
+    assert memoized[1:] == plain[1:]
+    assert plain[0].memo is None
+
+    memo = memoized[0].memo
+    assert memo.misses == 20
+    assert memo.hits == 17
+    assert len(memo) == 20
+
+
+def test_memo_is_bounded_and_kept_across_runs():
+    vm = run_fibonacci(25, 4)[0]
+    assert len(vm.memo) == 4
+    hits = vm.memo.hits
+
+    vm.stack = []
+    vm.run_code(FIBONACCI)
+    assert vm.memo.hits > hits
+
+
+def test_keys_distinguish_value_types():
+    code = {
+        "double": parse_string('STORE_VAR "x"\nLOAD_VAR "x"\nLOAD_VAR "x"\nADD\n'),
+        "$entrypoint$": parse_string(
+            'LOAD_CONST 2\nLOAD_CONST "double"\nCALL\nLOAD_CONST 2.0\nLOAD_CONST "double"\nCALL\n'
+        ),
+    }
+    vm = VM(memo_size=8)
+    stack, _ = vm.run_code(code)
+    assert stack == [4, 4.0]
+    assert [type(value) for value in stack] == [int, float]
+    assert vm.memo.hits == 0
+
+
+def test_keys_distinguish_zero_signs():
+    code = {
+        "negate": parse_string('STORE_VAR "x"\nLOAD_VAR "x"\nNEG\n'),
+        "$entrypoint$": parse_string(
+            'LOAD_CONST -0.0\nLOAD_CONST "negate"\nCALL\nLOAD_CONST 0.0\nLOAD_CONST "negate"\nCALL\n'
+        ),
+    }
+    stack, _ = VM(memo_size=8).run_code(code)
+    assert repr(stack) == repr(VM().run_code(code)[0]) == "[0.0, -0.0]"
+
+
+def test_lazy_programs_are_analyzed_on_first_call(tmp_path):
+    program = ops_to_json({
+        **FIBONACCI,
+        "$entrypoint$": parse_string(TEST2_ENTRY + 'LOAD_CONST "guarded"\nCALL\nPRINT\n'),
+        # Calls a function that fails to verify, but only on a path not taken.
+        "guarded": parse_string(
+            'LOAD_CONST 0\nCJMP bad\nLOAD_CONST 1\nRET\nLABEL bad\nLOAD_CONST "bad_label"\nCALL\n'
+        ),
+    })
+    program["bad_label"] = [{"op": "JMP", "arg": "nowhere"}]
+    program["unknown_opcode"] = [{"op": "NOT_AN_OPCODE"}]
+    path = tmp_path / "fibonacci.json"
+    path.write_text(json.dumps(program))
+
+    output = []
+    vm = VM(input_fn=lambda: 20, print_fn=output.append, memo_size=64)
+    code = vm.load_code_from_json(path, lazy=True)
+    assert code.decoded == ["$entrypoint$"]
+    vm.run_loaded_code()
+    assert output == [run_fibonacci(20, 0)[3][0], 1]
+    assert sorted(code.decoded) == ["$entrypoint$", "bad_label", "fibonacci", "guarded"]
+    assert vm._memo_signatures == {"fibonacci": (1, 1)}
+    assert (vm.memo.misses, vm.memo.hits) == (20, 17)
+
+    # The same mapping keeps the memo; a new one starts over.
+    vm.stack = []
+    vm.run_code(code)
+    assert vm.memo.hits == 18
+    vm.load_code_from_json(path, lazy=True)
+    assert len(vm.memo) == 0
+
+
+def test_lru_eviction():
+    memo = MemoCache(maxsize=2)
+    memo.put("a", (1,))
+    memo.put("b", (2,))
+    assert memo.get("a") == (1,)
+    memo.put("c", (3,))
+    assert memo.get("b") is None
+    assert memo.get("a") == (1,)
+    assert memo.info() == {"hits": 2, "misses": 1, "size": 2, "maxsize": 2}
+
+    with pytest.raises(ValueError):
+        MemoCache(maxsize=0)
@@ -0,0 +1,40 @@
+import pickle
+
+import pytest
+
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+
+
+def test_constructor_api():
+    op = Op(OpCode.LOAD_CONST, 3)
+    assert op.opcode == OpCode.LOAD_CONST
+    assert op.args == (3,)
+    assert Op(OpCode.ADD).args == ()
+
+
+def test_opcode_ids_are_dense():
+    assert [opcode.id for opcode in OpCode] == list(range(len(OpCode)))
+    assert Op(OpCode.RET).opcode_id == OpCode.RET.id
+
+
+def test_op_is_compact_and_immutable():
+    op = Op(OpCode.STORE_VAR, "x")
+    assert not hasattr(op, "__dict__")
+    with pytest.raises(AttributeError):
+        op.args = ("y",)
+    with pytest.raises(AttributeError):
+        op.opcode = OpCode.LOAD_VAR
+
+
+def test_equality_hash_and_pickle():
+    op = Op(OpCode.LOAD_CONST, "hello")
+    assert op == Op(OpCode.LOAD_CONST, "hello")
+    assert op != Op(OpCode.LOAD_CONST, "world")
+    assert len({op, Op(OpCode.LOAD_CONST, "hello")}) == 1
+    assert pickle.loads(pickle.dumps(op)) == op
+
+
+def test_unknown_opcode():
+    with pytest.raises(ValueError):
+        Op("LOAD_CONST", 1)
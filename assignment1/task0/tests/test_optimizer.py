@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from xvm.build import parse_file_to_json
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.optimizer import eliminate_dead_code, fold_constants, optimize
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI
+
+DIR = Path(__file__).parent.resolve()
+
+
+def test_fold_uses_vm_operand_order():
+    ops = parse_string("LOAD_CONST 10\nLOAD_CONST 3\nSUB\nLOAD_CONST 2\nDIV\n")
+    # SUB and DIV pop arg1 (the top) first: (3 - 10), then 2 / (3 - 10).
+    assert fold_constants(ops) == [Op(OpCode.LOAD_CONST, 2 / (3 - 10))]
+    assert VM().run_code(ops)[0] == [2 / (3 - 10)]
+
+
+def test_fold_chains_and_unary():
+    ops = parse_string("LOAD_CONST 4.0\nSQRT\nNEG\nLOAD_CONST 1\nLOAD_CONST 2\nADD\nMUL\n")
+    assert fold_constants(ops) == [Op(OpCode.LOAD_CONST, -6.0)]
+
+
+def test_runtime_errors_are_not_folded():
+    ops = parse_string("LOAD_CONST 0\nLOAD_CONST 1\nDIV\n")
+    assert fold_constants(ops) == ops
+    ops = parse_string('LOAD_CONST "a"\nLOAD_CONST 1\nADD\n')
+    assert fold_constants(ops) == ops
+
+
+def test_constant_condition_and_dead_code():
+    ops = parse_string("""\
+LOAD_CONST 1
+LOAD_CONST 1
+EQ
+CJMP yes
+LOAD_CONST "no"
+PRINT
+LABEL yes
+LOAD_CONST "yes"
+PRINT
+RET
+LOAD_CONST "after ret"
+PRINT
+LABEL unused
+""")
+    optimized = eliminate_dead_code(fold_constants(ops))
+    assert optimized == parse_string('LOAD_CONST "yes"\nPRINT\nRET\n')
+
+
+def test_loops_survive_dead_code_elimination():
+    ops = parse_string(SUM_LOOP)
+    optimized = eliminate_dead_code(ops)
+    assert [op for op in optimized if op.opcode == OpCode.LABEL] == [
+        Op(OpCode.LABEL, "for_condition"),
+        Op(OpCode.LABEL, "after_for"),
+    ]
+
+
+def run(code, inputs):
+    out = []
+    values = iter(inputs)
+    vm = VM(input_fn=lambda: next(values), print_fn=out.append)
+    stack, variables = vm.run_code(code)
+    return stack, variables, out
+
+
+@pytest.mark.parametrize(
+    "code, inputs",
+    [
+        ({"$entrypoint$": parse_string(SUM_LOOP)}, [100]),
+        (
+            {"fibonacci": parse_string(TEST2_FIBONACCI), "$entrypoint$": parse_string(TEST2_ENTRY)},
+            [11],
+        ),
+        (VM().parse_code_from_json(DIR / "test_part8_code.json"), [-2, 31]),
+    ],
+)
+def test_optimized_programs_behave_the_same(code, inputs):
+    optimized, report = optimize(code)
+    assert run(optimized, inputs) == run(code, inputs)
+    assert all(after <= before for before, after in report.values())
+
+
+def test_fibonacci_report():
+    code = {"fibonacci": parse_string(TEST2_FIBONACCI), "$entrypoint$": parse_string(TEST2_ENTRY)}
+    _, report = optimize(code)
+    # Unused labels and the unreachable trailing RET block are removed.
+    assert report["fibonacci"] == (37, 32)
+    assert report["$entrypoint$"] == (8, 8)
+
+
+def test_build_optimize(tmp_path):
+    source = tmp_path / "prog.txt"
+    source.write_text('#$entrypoint$\nLOAD_CONST 2\nLOAD_CONST 3\nMUL\nPRINT\nRET\nLOAD_CONST 1\n')
+    parse_file_to_json(str(source), optimize=True)
+    data = json.loads((tmp_path / "prog.json").read_text())
+    assert data == {"$entrypoint$": [{"op": "LOAD_CONST", "arg": 6}, {"op": "PRINT"}, {"op": "RET"}]}
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+
+from xvm.enums.super_op_code import SuperOpCode
+from xvm.linker import link_function
+from xvm.peephole import SuperOp, fuse, unfuse
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+from test_part6 import TEST2_ENTRY, TEST2_FIBONACCI
+
+DIR = Path(__file__).parent.resolve()
+
+SEQUENCES = """\
+LOAD_CONST 10
+STORE_VAR "x"
+LOAD_VAR "x"
+LOAD_CONST 3
+MOD
+LOAD_CONST 0
+EQ
+CJMP zero
+LOAD_VAR "x"
+LOAD_CONST 4
+SUB
+STORE_VAR "y"
+LOAD_VAR "y"
+LABEL zero
+"""
+
+
+def run(code, inputs, optimize):
+    out = []
+    values = iter(inputs)
+    vm = VM(input_fn=lambda: next(values), print_fn=out.append, optimize=optimize)
+    stack, variables = vm.run_code(code)
+    return stack, variables, out
+
+
+def test_fused_program_keeps_pcs():
+    program = link_function("f", parse_string(SEQUENCES)).program
+    fused = fuse(program)
+    assert len(fused) == len(program)
+    assert unfuse(fused) == program
+    assert fused[2].opcode == SuperOpCode.LOAD_VAR_LOAD_CONST_BINARY
+    assert fused[5].opcode == SuperOpCode.LOAD_CONST_COMPARE_CJMP
+    assert fused[8].opcode == SuperOpCode.LOAD_VAR_LOAD_CONST_BINARY
+    assert fused[11].opcode == SuperOpCode.STORE_VAR_LOAD_VAR
+    assert fused[3] is program[3]
+
+
+def test_fused_operand_order():
+    plain = run(parse_string(SEQUENCES), [], optimize=False)
+    fused = run(parse_string(SEQUENCES), [], optimize=True)
+    assert plain == fused
+    assert fused[1]["y"] == 4 - 10
+
+
+@pytest.mark.parametrize(
+    "code, inputs",
+    [
+        ({"$entrypoint$": parse_string(SUM_LOOP)}, [100]),
+        (
+            {"fibonacci": parse_string(TEST2_FIBONACCI), "$entrypoint$": parse_string(TEST2_ENTRY)},
+            [11],
+        ),
+        (VM().parse_code_from_json(DIR / "test_part8_code.json"), [-2, 31]),
+    ],
+)
+def test_optimized_vm_matches_plain(code, inputs):
+    assert run(code, inputs, optimize=False) == run(code, inputs, optimize=True)
+
+
+def test_step_shows_original_instructions():
+    code = parse_string(SEQUENCES)
+    plain, fused = VM(), VM(optimize=True)
+    plain.run_code(code)
+    fused.run_code(code)
+    assert any(isinstance(op, SuperOp) for op in fused._program)
+
+    for vm in (plain, fused):
+        vm.stack, vm.variables, vm.pc = [], {}, 0
+
+    while plain.pc < len(plain.code):
+        assert fused.step() == plain.step()
+        assert fused.pc == plain.pc
+    assert fused.variables == plain.variables
@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+from xvm import start
+from xvm.profiler import Profile
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+from test_part7 import assert_output_in_order, run_debugger_commands
+from test_tail_calls import COUNTDOWN, entry
+
+DIR = Path(__file__).parent.resolve()
+JSON_PATH = DIR / "test_part8_code.json"
+FAST_POWER = VM().parse_code_from_json(JSON_PATH)
+
+
+def feed(*values):
+    inputs = iter(values)
+    return lambda: next(inputs)
+
+
+def test_counts_match_the_program():
+    vm = VM(input_fn=feed(3), print_fn=lambda _value: None)
+    profile = vm.run_profiled(parse_string(SUM_LOOP))
+    assert vm.variables == {"N": 3, "s": 6, "i": 4}
+
+    counted = VM(input_fn=feed(3), print_fn=lambda _value: None)
+    counted.load_code(parse_string(SUM_LOOP))
+    assert profile.total_instructions == counted.run_for(10**6)
+    assert profile.by_opcode["INPUT_NUMBER"][0] == 1
+    assert profile.by_opcode["CJMP"][0] == 4
+    assert profile.instructions[("$entrypoint$", 0)][0] == 1
+    assert list(profile.by_function) == ["$entrypoint$"]
+    assert profile.calls == {}
+    assert profile.max_depth == 0
+    assert profile.elapsed >= sum(elapsed for _, elapsed in profile.instructions.values())
+
+
+def test_calls_and_depth():
+    output = []
+    vm = VM(input_fn=feed(2, 10), print_fn=output.append)
+    profile = vm.run_profiled(FAST_POWER)
+    assert output[-1] == 1024
+    # fast_power(10) -> 5 -> 2 -> 1 -> 0
+    assert profile.calls == {"fast_power": 5}
+    assert profile.max_depth == 5
+    assert set(profile.by_function) == {"$entrypoint$", "fast_power"}
+    assert profile.by_opcode["CALL"][0] == 5
+    assert sum(count for count, _ in profile.by_function.values()) == profile.total_instructions
+
+    hottest = profile.hottest(3)
+    assert len(hottest) == 3
+    assert hottest[0][4] >= hottest[1][4] >= hottest[2][4]
+
+
+def test_tail_calls_count_as_calls_but_not_depth():
+    code = {"countdown": parse_string(COUNTDOWN), "$entrypoint$": entry("countdown", 3)}
+    profile = VM().run_profiled(code)
+    assert profile.calls == {"countdown": 4}
+    assert profile.max_depth == 1
+
+
+def test_profiles_add_up_and_match_run_code():
+    code = parse_string(SUM_LOOP)
+    profile = Profile()
+    for optimize in (False, True):
+        vm = VM(input_fn=feed(50), print_fn=lambda _value: None, optimize=optimize)
+        result = vm.run_profiled(code, profile=profile)
+        assert result is profile
+        assert vm.variables == VM(input_fn=feed(50), print_fn=lambda _value: None).run_code(code)[1]
+    # Superinstructions show up under their own names.
+    assert any(name not in {"INPUT_NUMBER", "STORE_VAR"} and "_" in name for name in profile.by_opcode)
+
+
+def test_report():
+    vm = VM(input_fn=feed(2, 3), print_fn=lambda _value: None)
+    report = vm.run_profiled(FAST_POWER).report(limit=2)
+    assert "calls, max call depth 3" in report
+    assert_output_in_order(report, ["opcode", "CALL", "function", "fast_power", "instruction"])
+    assert len(report.split("\n\n")[-1].splitlines()) == 3
+
+
+def test_cli_profile(monkeypatch, capsys):
+    monkeypatch.setattr("builtins.input", feed("2", "10"))
+    monkeypatch.setattr(sys, "argv", ["xvm-start", str(JSON_PATH), "--profile"])
+    start.main()
+    captured = capsys.readouterr()
+    assert captured.out.splitlines()[-1] == "1024"
+    assert "max call depth 5" in captured.err
+
+
+def test_debugger_profile_command():
+    # The program's INPUT_NUMBERs read the lines after the profile command.
+    output = run_debugger_commands([f"load {JSON_PATH}", "step", "profile 3", "2", "10", "exit"])
+    assert_output_in_order(output, ["Loaded code", "Executed: LOAD_CONST", "calls, max call depth 5", "fast_power"])
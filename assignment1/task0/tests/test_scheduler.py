@@ -0,0 +1,78 @@
+import pytest
+
+from xvm.scheduler import BUDGET_EXCEEDED, DONE, FAILED, Scheduler
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+
+SUM = parse_string(SUM_LOOP)
+FOREVER = parse_string("LABEL loop\nJMP loop\n")
+
+
+def add_sum(scheduler, n, finished, **options):
+    task_id = f"sum({n})"
+    return scheduler.add(
+        SUM,
+        input_fn=lambda: n,
+        print_fn=lambda value: finished.append((task_id, value)),
+        task_id=task_id,
+        **options,
+    )
+
+
+def test_run_for_resumes():
+    vm = VM(input_fn=lambda: 3, print_fn=lambda _value: None)
+    vm.load_code(SUM)
+    assert vm.run_for(4) == 4
+    assert vm.pc == 4
+    assert not vm.finished
+
+    while not vm.finished:
+        vm.run_for(5)
+    assert vm.variables == {"N": 3, "s": 6, "i": 4}
+
+
+def test_short_programs_are_not_held_up():
+    finished = []
+    scheduler = Scheduler(slice_size=100)
+    for n in (2000, 10, 300):
+        add_sum(scheduler, n, finished)
+
+    tasks = scheduler.run()
+    assert finished == [("sum(10)", 55), ("sum(300)", 45150), ("sum(2000)", 2001000)]
+    assert [task.status for task in tasks] == [DONE] * 3
+    assert tasks[1].result == ([], {"N": 10, "s": 55, "i": 11})
+
+    stats = scheduler.stats
+    assert stats.done == 3
+    assert stats.instructions == sum(task.executed for task in tasks)
+    assert stats.slices == sum(task.slices for task in tasks)
+    assert stats.instructions_per_second > 0
+
+
+def test_slices_are_fair():
+    scheduler = Scheduler(slice_size=50)
+    tasks = [add_sum(scheduler, n, []) for n in (1000, 1000, 5000)]
+    for _ in range(10):
+        scheduler.step()
+    assert [task.executed for task in tasks] == [500, 500, 500]
+
+
+def test_budgets_and_failures_are_isolated():
+    finished = []
+    scheduler = Scheduler(slice_size=64)
+    forever = scheduler.add(FOREVER, budget=1000)
+    broken = scheduler.add(parse_string("LOAD_CONST 0\nLOAD_CONST 1\nDIV\n"))
+    ok = add_sum(scheduler, 100, finished, optimize=True)
+    scheduler.run()
+
+    assert (forever.status, forever.executed) == (BUDGET_EXCEEDED, 1000)
+    assert broken.status == FAILED
+    assert isinstance(broken.error, ZeroDivisionError)
+    assert ok.status == DONE
+    assert finished == [("sum(100)", 5050)]
+    stats = scheduler.stats
+    assert (stats.done, stats.failed, stats.budget_exceeded) == (1, 1, 1)
+
+    with pytest.raises(ValueError):
+        Scheduler(slice_size=0)
@@ -0,0 +1,110 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from xvm import start
+from xvm.sinks import JsonLinesSink, OutputSink
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+
+DIR = Path(__file__).parent.resolve()
+JSON_PATH = DIR / "test_part8_code.json"
+
+
+class CountingFile(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_text_sink_matches_print(capsys):
+    code = parse_string('LOAD_CONST 1.5\nPRINT\nLOAD_CONST "a"\nPRINT\nLOAD_CONST 2\nPRINT\n')
+    VM(print_fn=print).run_code(code)
+    expected = capsys.readouterr().out
+
+    file = io.StringIO()
+    with OutputSink(file) as sink:
+        VM(print_fn=sink).run_code(code)
+    assert file.getvalue() == expected == "1.5\na\n2\n"
+
+
+def test_writes_when_buffer_fills():
+    file = CountingFile()
+    sink = OutputSink(file, buffer_size=10)
+    for value in range(100, 110):
+        sink(value)
+    assert file.writes == 3
+    assert file.getvalue() == "".join(f"{value}\n" for value in range(100, 109))
+
+    sink.close()
+    assert file.getvalue().split() == [str(value) for value in range(100, 110)]
+
+    unbuffered = CountingFile()
+    sink = OutputSink(unbuffered, buffer_size=0)
+    sink(1)
+    sink(2)
+    assert unbuffered.writes == 2
+
+
+def test_output_is_written_before_input():
+    file = io.StringIO()
+    seen = []
+    sink = OutputSink(file)
+
+    def read():
+        seen.append(file.getvalue())
+        return 3
+
+    VM(input_fn=sink.flushing(read), print_fn=sink).run_code(
+        parse_string('LOAD_CONST "prompt"\nPRINT\nINPUT_NUMBER\nPRINT\n')
+    )
+    assert seen == ["prompt\n"]
+    assert file.getvalue() == "prompt\n"
+    sink.close()
+    assert file.getvalue() == "prompt\n3\n"
+
+
+def test_json_lines_keep_types():
+    file = io.StringIO()
+    with JsonLinesSink(file) as sink:
+        for value in (1, "1", 2.5, "two\nlines"):
+            sink(value)
+    assert [json.loads(line) for line in file.getvalue().splitlines()] == [1, "1", 2.5, "two\nlines"]
+
+
+def test_output_is_written_on_error():
+    file = io.StringIO()
+    with pytest.raises(ZeroDivisionError):
+        with OutputSink(file) as sink:
+            VM(print_fn=sink).run_code(
+                parse_string("LOAD_CONST 7\nPRINT\nLOAD_CONST 0\nLOAD_CONST 1\nDIV\n")
+            )
+    assert file.getvalue() == "7\n"
+
+
+def test_cli_output_file(tmp_path, monkeypatch):
+    output_path = tmp_path / "out.jsonl"
+    inputs = iter(["2", "10"])
+    monkeypatch.setattr("builtins.input", lambda: next(inputs))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["xvm-start", str(JSON_PATH), "--output", str(output_path), "--output-format", "jsonl"],
+    )
+    start.main()
+    assert json.loads(output_path.read_text().splitlines()[-1]) == 1024
+
+
+def test_sum_loop_output():
+    file = io.StringIO()
+    with OutputSink(file, buffer_size=4) as sink:
+        VM(input_fn=lambda: 100, print_fn=sink).run_code(parse_string(SUM_LOOP))
+    assert file.getvalue() == "5050\n"
@@ -0,0 +1,91 @@
+import pickle
+
+import pytest
+
+from xvm.frame import UNSET
+from xvm.linker import link_function
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.vm import VM, parse_string
+
+from test_part6 import TEST1_ENTRY, TEST1_FOO
+
+SWAP = """\
+LOAD_CONST 1
+STORE_VAR "a"
+LOAD_CONST 2
+STORE_VAR "b"
+LOAD_VAR "b"
+LOAD_VAR "a"
+STORE_VAR "b"
+STORE_VAR "a"
+"""
+
+
+def test_variables_are_linked_to_slots():
+    linked = link_function("$entrypoint$", parse_string(SWAP))
+    assert linked.slot_names == ("a", "b")
+    assert dict(linked.slots) == {"a": 0, "b": 1}
+    assert linked.program[1] == Op(OpCode.STORE_VAR, 0)
+    assert linked.program[4] == Op(OpCode.LOAD_VAR, 1)
+    assert linked.ops[4] == Op(OpCode.LOAD_VAR, "b")
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_variables_mapping(optimize):
+    vm = VM(optimize=optimize)
+    _, variables = vm.run_code(parse_string(SWAP))
+    assert variables == {"a": 2, "b": 1}
+    assert vm.variables == {"a": 2, "b": 1}
+
+    with pytest.raises(NameError, match="Variable 'missing' not found."):
+        VM(optimize=optimize).run_code(parse_string('LOAD_CONST 1\nSTORE_VAR "x"\nLOAD_VAR "missing"\n'))
+
+
+def test_unused_variables_are_kept(tmp_path):
+    vm = VM()
+    vm.variables = {"a": 10, "unused": "kept"}
+    _, variables = vm.run_code(parse_string('LOAD_VAR "a"\nSTORE_VAR "b"\n'))
+    assert variables == {"a": 10, "unused": "kept", "b": 10}
+
+    vm.dump_memory(tmp_path / "memory.pkl")
+    restored = VM()
+    restored.load_memory(tmp_path / "memory.pkl")
+    assert restored.variables == variables
+
+
+def test_changes_to_variables_are_written_back():
+    vm = VM()
+    vm.load_code(parse_string('LOAD_VAR "a"\nLOAD_VAR "b"\nADD\nSTORE_VAR "c"\n'))
+    vm.variables["a"] = 5
+    vm.variables.update(b=2, extra="kept")
+    stack, variables = vm.run_loaded_code()
+    assert variables == {"a": 5, "b": 2, "c": 7, "extra": "kept"}
+
+    del vm.variables["a"]
+    assert vm.variables.pop("extra") == "kept"
+    assert vm.variables == {"b": 2, "c": 7}
+    # Snapshots pickle and copy as plain dicts.
+    assert type(pickle.loads(pickle.dumps(variables))) is dict
+    assert type(variables.copy()) is dict
+
+
+def test_breakpoint_in_callee_sees_its_frame():
+    foo = parse_string(TEST1_FOO.replace('STORE_VAR "a"\n', 'STORE_VAR "a"\nBREAKPOINT\n', 1))
+    values = iter([2, 5])
+    vm = VM(input_fn=lambda: next(values), print_fn=lambda _value: None)
+    _, variables = vm.run_code({"foo": foo, "$entrypoint$": parse_string(TEST1_ENTRY)})
+    assert vm.current_function == "foo"
+    assert variables == {"a": 2, "b": 5}
+    assert vm.call_stack[0].slots == [2, 5, UNSET]
+
+    # Ops run from the debugger may use names the function never mentions.
+    vm.run_op(Op(OpCode.LOAD_CONST, 3))
+    vm.run_op(Op(OpCode.STORE_VAR, "scratch"))
+    vm.run_op(Op(OpCode.LOAD_VAR, "scratch"))
+    assert vm.stack[-1] == 3
+    assert vm.variables == {"a": 2, "b": 5, "scratch": 3}
+
+    vm.clear_breakpoint()
+    _, variables = vm.run_loaded_code()
+    assert variables == {"a": 2, "b": 5, "c": 21}
@@ -0,0 +1,104 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from xvm import start
+from xvm.sources import InputSource, open_source
+from xvm.vm import VM, parse_string
+
+from test_part5 import TEST2 as SUM_LOOP
+
+DIR = Path(__file__).parent.resolve()
+JSON_PATH = DIR / "test_part8_code.json"
+
+# Reads N numbers and prints their sum.
+SUM_INPUTS = parse_string("""\
+INPUT_NUMBER
+STORE_VAR "n"
+LOAD_CONST 0
+STORE_VAR "total"
+LABEL loop
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP done
+INPUT_NUMBER
+LOAD_VAR "total"
+ADD
+STORE_VAR "total"
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+STORE_VAR "n"
+JMP loop
+LABEL done
+LOAD_VAR "total"
+PRINT
+""")
+
+
+def read_all(source, count, number=True):
+    return [source.read_number() if number else source() for _ in range(count)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+def test_tokens_across_chunk_boundaries(chunk_size):
+    data = b"12\n-7\n3.5\n1e3\nhello world\r\n\n0042\nlast"
+    source = InputSource(io.BytesIO(data), chunk_size=chunk_size)
+    assert read_all(source, 4) == [12, -7, 3.5, 1000.0]
+    assert read_all(source, 4, number=False) == ["hello world", "", "0042", "last"]
+    with pytest.raises(EOFError):
+        source()
+
+    words = InputSource(io.BytesIO(b" 10 20\n\t30  hello\n4.5 "), "whitespace", chunk_size)
+    assert read_all(words, 3) == [10, 20, 30]
+    assert words() == "hello"
+    assert words.read_number() == 4.5
+    with pytest.raises(EOFError):
+        words.read_number()
+
+
+def test_numbers_parse_like_input_number():
+    source = InputSource(io.BytesIO(b"7\n 8 \n1.0\nabc\n"))
+    assert read_all(source, 3) == [7, 8, 1.0]
+    with pytest.raises(ValueError, match="'abc' is not a valid number"):
+        source.read_number()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_vm_reads_numbers_from_file(tmp_path, use_mmap):
+    values = list(range(-500, 1500))
+    path = tmp_path / "numbers.txt"
+    path.write_text("\n".join(map(str, [len(values), *values])) + "\n")
+
+    for jit in (False, True):
+        output = []
+        with open_source(path, chunk_size=256, use_mmap=use_mmap) as source:
+            VM(input_fn=source, print_fn=output.append, jit=jit).run_code(SUM_INPUTS)
+        assert output == [sum(values)]
+
+
+def test_empty_file_with_mmap(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    with open_source(path, use_mmap=True) as source:
+        with pytest.raises(EOFError):
+            VM(input_fn=source).run_code(parse_string(SUM_LOOP))
+
+
+def test_cli_input_file(tmp_path, monkeypatch, capsys):
+    input_path = tmp_path / "inputs.txt"
+    input_path.write_text("3 4")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "xvm-start", str(JSON_PATH), "--input", str(input_path),
+            "--input-split", "whitespace", "--output-format", "jsonl",
+        ],
+    )
+    start.main()
+    assert json.loads(capsys.readouterr().out.splitlines()[-1]) == 81
@@ -0,0 +1,129 @@
+import json
+
+from xvm.build import ops_to_json
+from xvm.linker import find_tail_calls
+from xvm.vm import VM, parse_string
+
+from test_part7 import assert_output_in_order, run_debugger_commands
+
+# countdown(n): if n == 0 return n; return countdown(n - 1)
+COUNTDOWN = """\
+STORE_VAR "n"
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP done
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+LOAD_CONST "countdown"
+CALL
+RET
+LABEL done
+LOAD_VAR "n"
+"""
+
+IS_EVEN = """\
+STORE_VAR "n"
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP yes
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+LOAD_CONST "is_odd"
+CALL
+RET
+LABEL yes
+LOAD_CONST 1
+"""
+
+IS_ODD = """\
+STORE_VAR "n"
+LOAD_CONST 0
+LOAD_VAR "n"
+EQ
+CJMP no
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+LOAD_CONST "is_even"
+CALL
+RET
+LABEL no
+LOAD_CONST 0
+"""
+
+
+def entry(function_name, argument):
+    return parse_string(f'LOAD_CONST {argument}\nLOAD_CONST "{function_name}"\nCALL\nSTORE_VAR "result"\n')
+
+
+def test_tail_positions():
+    assert find_tail_calls(parse_string(COUNTDOWN)) == {9}
+    assert find_tail_calls(parse_string(IS_EVEN)) == {9}
+    # The entrypoint's call is followed by STORE_VAR.
+    assert find_tail_calls(entry("countdown", 3)) == frozenset()
+
+
+def write_json(tmp_path, code):
+    code_path = tmp_path / "code.json"
+    code_path.write_text(json.dumps(ops_to_json(code)))
+    return code_path
+
+
+def test_tail_recursion_runs_in_one_frame(tmp_path):
+    code = {"countdown": parse_string(COUNTDOWN), "$entrypoint$": entry("countdown", 30)}
+    vm = VM()
+    vm.load_code_from_json(write_json(tmp_path, code))
+    depths = []
+    while vm.pc < len(vm.code):
+        vm.step()
+        depths.append(len(vm.call_stack))
+    assert max(depths) == 1
+    assert vm.call_stack == []
+
+    code["$entrypoint$"] = entry("countdown", 100_000)
+    _, variables = VM().run_code(code)
+    assert variables == {"result": 0}
+
+
+def test_mutual_tail_recursion():
+    code = {"is_even": parse_string(IS_EVEN), "is_odd": parse_string(IS_ODD)}
+    for optimize in (False, True):
+        for n, expected in ((0, 1), (7, 0), (50_000, 1)):
+            code["$entrypoint$"] = entry("is_even", n)
+            stack, variables = VM(optimize=optimize).run_code(code)
+            assert variables == {"result": expected}
+            assert stack == []
+
+
+def test_debugger_frame_shows_elided_frames(tmp_path):
+    countdown = parse_string(COUNTDOWN + "BREAKPOINT\nRET\n")
+    code = {"countdown": countdown, "$entrypoint$": entry("countdown", 3)}
+    code_path = write_json(tmp_path, code)
+
+    output = run_debugger_commands([f"load {code_path}", "run", "frame", "exit"])
+    assert_output_in_order(output, [
+        "Hit breakpoint at PC 14",
+        "Current frame: countdown",
+        "  n: 0",
+        "Tail calls elided 3 frame(s) below the current one.",
+        "Call stack depth: 1",
+        "  #0: $entrypoint$ (return to PC 2)",
+    ])
+
+
+def test_next_over_tail_call_returns_to_the_caller(tmp_path):
+    code = {"countdown": parse_string(COUNTDOWN), "$entrypoint$": entry("countdown", 3)}
+    vm = VM()
+    vm.load_code_from_json(write_json(tmp_path, code))
+    while not (vm.current_function == "countdown" and vm.pc == 9):
+        vm.step()
+
+    # The tail call replaces countdown's frame, so stepping over it ends
+    # where countdown itself would have returned.
+    vm.next()
+    assert (vm.current_function, vm.pc, vm.call_stack) == ("$entrypoint$", 3, [])
+    assert vm.stack == [0]
@@ -0,0 +1,226 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from xvm.batch import run_batch
+from xvm.vector import VectorError, vectorize
+from xvm.vm import parse_string
+
+from test_part5 import TEST1 as COMPARE, TEST2 as SUM_LOOP
+from test_sources import SUM_INPUTS
+
+
+def scalar(code, inputs):
+    return [result.to_dict() for result in run_batch(code, inputs, workers=0)]
+
+
+def vectorized(code, inputs):
+    return [result.to_dict() for result in vectorize(code).run(inputs)]
+
+
+ARITHMETIC = parse_string("""\
+INPUT_NUMBER
+STORE_VAR "a"
+INPUT_NUMBER
+STORE_VAR "b"
+LOAD_VAR "b"
+LOAD_VAR "a"
+ADD
+PRINT
+LOAD_VAR "b"
+LOAD_VAR "a"
+SUB
+PRINT
+LOAD_VAR "b"
+LOAD_VAR "a"
+MUL
+PRINT
+LOAD_VAR "b"
+LOAD_VAR "a"
+DIV
+PRINT
+LOAD_VAR "b"
+LOAD_VAR "a"
+MOD
+PRINT
+LOAD_VAR "a"
+NEG
+PRINT
+LOAD_VAR "a"
+EXP
+PRINT
+LOAD_VAR "a"
+SQRT
+PRINT
+LOAD_VAR "b"
+LOAD_VAR "a"
+LE
+LOAD_VAR "b"
+LOAD_VAR "a"
+EQ
+""")
+
+# Lanes take the loop a different number of times.
+COLLATZ = parse_string("""\
+INPUT_NUMBER
+STORE_VAR "n"
+LOAD_CONST 0
+STORE_VAR "steps"
+LABEL loop
+LOAD_CONST 1
+LOAD_VAR "n"
+EQ
+CJMP done
+LOAD_CONST 2
+LOAD_VAR "n"
+MOD
+CJMP odd
+LOAD_CONST 2
+LOAD_VAR "n"
+DIV
+STORE_VAR "n"
+JMP next
+LABEL odd
+LOAD_CONST 1
+LOAD_VAR "n"
+LOAD_CONST 3
+MUL
+ADD
+STORE_VAR "n"
+LABEL next
+LOAD_VAR "steps"
+LOAD_CONST 1
+ADD
+STORE_VAR "steps"
+JMP loop
+LABEL done
+LOAD_VAR "steps"
+PRINT
+""")
+
+
+@pytest.mark.parametrize(
+    "code, inputs",
+    [
+        (parse_string(COMPARE), [[3, 5], [3, 3], [2.5, 2.5], [-1, 1.0], [0, -0.0]]),
+        (parse_string(SUM_LOOP), [[n] for n in range(-3, 60)]),
+        (SUM_INPUTS, [[3, 1, 2, 3], [0], [2, 1.5, -4], [4, 1, 2, 3, 4]]),
+        (COLLATZ, [[n] for n in range(1, 80)]),
+        (
+            ARITHMETIC,
+            [[7, 3], [-7, 3], [7, -3.5], [2.5, 0.5], [1e308, 10], [0.25, 1e-300], [709, 2], [0, 4]],
+        ),
+    ],
+)
+def test_matches_scalar_vm(code, inputs):
+    assert vectorized(code, inputs) == scalar(code, inputs)
+
+
+# Integer results that numpy would leave as -0.0 before SQRT and DIV.
+NEGATIVE_ZERO = parse_string("""\
+INPUT_NUMBER
+STORE_VAR "y"
+LOAD_VAR "y"
+LOAD_CONST 1
+MOD
+SQRT
+PRINT
+LOAD_CONST 0
+NEG
+SQRT
+PRINT
+LOAD_CONST 1
+LOAD_CONST 0
+LOAD_VAR "y"
+MUL
+DIV
+PRINT
+""")
+
+
+def test_no_negative_zero_from_integers():
+    inputs = [[1], [-1], [3], [-3]]
+    # 0.0 == -0.0, so compare the printed text.
+    assert repr(vectorized(NEGATIVE_ZERO, inputs)) == repr(scalar(NEGATIVE_ZERO, inputs))
+
+
+def test_failing_and_inexact_lanes_use_the_scalar_vm():
+    big = 2**52
+    inputs = [
+        [1, 0],          # division by zero
+        [-4, 1],         # math domain error in SQRT
+        [710, 1],        # EXP overflows
+        [big, big],      # the sum needs more than 53 bits
+        [2**60, 1],      # input too large for float64 lanes
+        ["x", 1],        # not a number
+        [5],             # runs out of input
+        [5, 2],
+    ]
+    program = vectorize(ARITHMETIC)
+    results = [result.to_dict() for result in program.run(inputs)]
+    assert results == scalar(ARITHMETIC, inputs)
+    assert program.deferred == [0, 1, 2, 3, 4, 5, 6]
+    assert results[3]["output"][0] == 2 * big
+    assert results[0]["error"] == "ZeroDivisionError: division by zero"
+
+
+def test_numpy_array_inputs():
+    inputs = np.arange(1, 2001).reshape(-1, 1)
+    program = vectorize(COLLATZ)
+    results = program.run(inputs)
+    assert program.deferred == []
+    assert [result.to_dict() for result in results] == scalar(COLLATZ, inputs.tolist())
+
+    floats = vectorize(ARITHMETIC).run(np.array([[2.0, 3.0]]))
+    assert floats[0].output[:3] == [5.0, -1.0, 6.0]
+    assert floats[0].output[6] == math.exp(2.0)
+
+
+def test_string_variables_and_comparisons():
+    code = parse_string("""\
+INPUT_NUMBER
+LOAD_CONST 0
+GT
+CJMP negative
+LOAD_CONST "b"
+STORE_VAR "s"
+JMP compare
+LABEL negative
+LOAD_CONST "a"
+STORE_VAR "s"
+LABEL compare
+LOAD_CONST "ab"
+LOAD_VAR "s"
+LT
+LOAD_VAR "s"
+LOAD_CONST "a"
+EQ
+LOAD_VAR "s"
+""")
+    inputs = [[-1], [1], [0]]
+    assert vectorized(code, inputs) == scalar(code, inputs)
+
+
+@pytest.mark.parametrize(
+    "source, reason",
+    [
+        ('LOAD_CONST "f"\nCALL\n', "calls are not supported"),
+        ("INPUT_STRING\n", "only take numbers"),
+        ("BREAKPOINT\n", "breakpoint"),
+        ("LOAD_CONST 9007199254740993\n", "too large"),
+    ],
+)
+def test_unsupported_programs_are_rejected(source, reason):
+    with pytest.raises(VectorError, match=reason):
+        vectorize({"$entrypoint$": parse_string(source), "f": []})
+
+
+def test_large_batch():
+    inputs = np.random.default_rng(0).integers(-1000, 1000, size=(20000, 2))
+    results = vectorize(ARITHMETIC).run(inputs)
+    sample = list(range(0, 20000, 997))
+    assert [results[index].to_dict()["output"] for index in sample] == [
+        scalar(ARITHMETIC, [inputs[index].tolist()])[0]["output"] for index in sample
+    ]
@@ -0,0 +1,136 @@
+import pytest
+
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.verifier import VerifyError, verify
+from xvm.vm import VM, parse_string
+
+FOO = """\
+STORE_VAR "b"
+STORE_VAR "a"
+LOAD_VAR "a"
+LOAD_VAR "b"
+ADD
+RET
+"""
+
+
+def test_arity_error_reports_function_and_pc():
+    code = {"$entrypoint$": [Op(OpCode.LOAD_CONST, 1), Op(OpCode.ADD, 2)]}
+    with pytest.raises(VerifyError) as info:
+        verify(code)
+    assert info.value.function_name == "$entrypoint$"
+    assert info.value.pc == 1
+    assert "ADD expects 0 argument(s), got 1" in str(info.value)
+
+
+def test_argument_type_error():
+    code = {"$entrypoint$": [Op(OpCode.LOAD_VAR, 3)]}
+    with pytest.raises(VerifyError, match="LOAD_VAR"):
+        verify(code)
+
+
+def test_undefined_label_in_callee():
+    code = {
+        "foo": parse_string("JMP missing\n"),
+        "$entrypoint$": parse_string('LOAD_CONST "foo"\nCALL\n'),
+    }
+    with pytest.raises(VerifyError) as info:
+        verify(code)
+    assert info.value.function_name == "foo"
+    assert info.value.pc == 0
+
+
+def test_stack_underflow_in_entrypoint():
+    code = {"$entrypoint$": parse_string("LOAD_CONST 1\nADD\n")}
+    with pytest.raises(VerifyError, match="ADD needs 2"):
+        verify(code)
+    verify(code, stack_depth=1)
+
+
+def test_underflow_on_every_branch():
+    code = parse_string("""\
+INPUT_NUMBER
+CJMP skip
+INPUT_NUMBER
+STORE_VAR "x"
+LABEL skip
+PRINT
+""")
+    with pytest.raises(VerifyError) as info:
+        verify({"$entrypoint$": code})
+    assert info.value.pc == 5
+
+
+def test_underflow_on_one_branch_is_left_to_run_time():
+    code = parse_string("""\
+INPUT_NUMBER
+CJMP skip
+LOAD_CONST 1
+LABEL skip
+PRINT
+""")
+    verify({"$entrypoint$": code})
+    with pytest.raises(VerifyError) as info:
+        VM(input_fn=lambda: 1, checked=True).run_code(code)
+    assert info.value.pc == 4
+
+
+def test_loop_pops_values_pushed_before_it():
+    code = parse_string("""\
+LOAD_CONST 1
+LOAD_CONST 2
+LOAD_CONST 3
+LOAD_CONST 3
+STORE_VAR "n"
+LABEL loop
+PRINT
+LOAD_CONST 1
+LOAD_VAR "n"
+SUB
+STORE_VAR "n"
+LOAD_CONST 0
+LOAD_VAR "n"
+GT
+CJMP loop
+""")
+    output = []
+    VM(print_fn=output.append).run_code(code)
+    assert output == [3, 2, 1]
+
+
+def test_call_without_enough_arguments():
+    code = {
+        "foo": parse_string(FOO),
+        "$entrypoint$": parse_string('LOAD_CONST 1\nLOAD_CONST "foo"\nCALL\n'),
+    }
+    with pytest.raises(VerifyError, match="call to 'foo' needs 2"):
+        VM().run_code(code)
+
+
+def test_verified_code_runs_unchecked_and_checked():
+    code = {
+        "foo": parse_string(FOO),
+        "$entrypoint$": parse_string('LOAD_CONST 1\nLOAD_CONST 2\nLOAD_CONST "foo"\nCALL\n'),
+    }
+    assert VM().run_code(code)[0] == [3]
+    assert VM(checked=True).run_code(code)[0] == [3]
+
+
+def test_checked_mode_validates_each_instruction():
+    # The callee's stack effect is unknown statically, so only the checked
+    # slow path can report the underflow with its location.
+    code = {
+        "noop": parse_string("RET\n"),
+        "$entrypoint$": parse_string('LOAD_CONST "noop"\nCALL\nLOAD_CONST 1\nADD\n'),
+    }
+    with pytest.raises(IndexError):
+        VM().run_code(code)
+    with pytest.raises(VerifyError) as info:
+        VM(checked=True).run_code(code)
+    assert info.value.pc == 3
+
+
+def test_run_op_rejects_malformed_op():
+    with pytest.raises(VerifyError):
+        VM().run_op(Op(OpCode.PRINT, "extra"))
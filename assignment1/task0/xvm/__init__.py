@@ -0,0 +1 @@
+__version__ = "2025.0.0"
@@ -0,0 +1,161 @@
+"""Assembler for XVM text sources.
+
+A source file holds one or more functions, each starting with a
+``#name`` line followed by one instruction per line::
+
+    #$entrypoint$
+    // Comments start with two slashes.
+    LOAD_CONST "hello, world"
+    PRINT
+
+An instruction is an opcode and at most one argument. A quoted argument
+is a string and may contain spaces; otherwise it is an int (``-12``), a
+float (``1.5``, ``.5``, ``2e3``) or, failing both, a bare word such as
+a label name. parse_string in xvm.parser reads single-function text
+with the same rules.
+
+``assemble`` builds the program straight into ``{name: list[Op]}``, with
+the source line of every instruction, so a text file can be run without
+going through build.py and a JSON file first.
+"""
+import os
+import re
+
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+
+EXTENSION = ".txt"
+SHARED_OPS_LIMIT = 4096
+
+_OPCODES = {opcode.value: opcode for opcode in OpCode}
+_INT = re.compile(r"[+-]?[0-9]+")
+_FLOAT = re.compile(r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+
+
+class AssemblyError(ValueError):
+    def __init__(self, message, line_number=None, path=None):
+        where = ""
+        if line_number is not None:
+            where = f"line {line_number}: "
+            if path is not None:
+                where = f"{os.fspath(path)}:{line_number}: "
+        super().__init__(where + message)
+        self.line_number = line_number
+        self.path = path
+
+
+class AssembledCode(dict):
+    """``{name: list[Op]}`` that also knows where each instruction came from.
+
+    ``lines[name][pc]`` is the source line of ``self[name][pc]``.
+    """
+
+    def __init__(self, functions=(), lines=None):
+        super().__init__(functions)
+        self.lines = lines if lines is not None else {}
+
+    def line(self, function_name, pc):
+        """The source line of an instruction, or None if it is not known."""
+        lines = self.lines.get(function_name)
+        if lines is None or not 0 <= pc < len(lines):
+            return None
+        return lines[pc]
+
+
+def is_text_source(path):
+    return os.fspath(path).endswith(EXTENSION)
+
+
+def parse_argument(text: str):
+    if text.startswith('"'):
+        if len(text) < 2 or not text.endswith('"'):
+            raise ValueError(f"Unterminated string: {text}")
+        return text[1:-1]
+    if _INT.fullmatch(text):
+        return int(text)
+    if _FLOAT.fullmatch(text):
+        return float(text)
+    if len(text.split()) > 1:
+        raise ValueError(f"Expected one argument, got: {text}")
+    return text
+
+
+def parse_opcode(opcode_str: str) -> OpCode:
+    opcode = _OPCODES.get(opcode_str)
+    if opcode is None:
+        raise ValueError(f"Unknown opcode: '{opcode_str}'")
+    return opcode
+
+
+def parse_instruction(line: str) -> Op:
+    """The Op for one stripped, non-empty instruction line."""
+    parts = line.split(None, 1)
+    opcode = parse_opcode(parts[0])
+    if len(parts) == 1:
+        return Op(opcode)
+    return Op(opcode, parse_argument(parts[1]))
+
+
+def iter_sections(lines, path=None):
+    """Yield ``(name, list[Op], line numbers)`` for each ``#name`` section of a source.
+
+    Only one function is held at a time. Raises AssemblyError for a bad
+    line, an instruction before the first section or a repeated name.
+    """
+    shared = {}
+    seen = set()
+    name = None
+    ops = numbers = None
+
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("//"):
+            continue
+
+        if line.startswith("#"):
+            if name is not None:
+                yield name, ops, numbers
+            name = line[1:].strip()
+            if name in seen:
+                raise AssemblyError(f"Function '{name}' is defined twice", line_number, path)
+            seen.add(name)
+            ops, numbers = [], []
+            continue
+
+        if name is None:
+            raise AssemblyError(
+                "Instruction outside a function; start one with a '#name' line", line_number, path
+            )
+        # Ops are immutable, so repeated lines share one Op.
+        op = shared.get(line)
+        if op is None:
+            try:
+                op = parse_instruction(line)
+            except ValueError as e:
+                raise AssemblyError(str(e), line_number, path) from None
+            if len(shared) >= SHARED_OPS_LIMIT:
+                shared.clear()
+            shared[line] = op
+        ops.append(op)
+        numbers.append(line_number)
+
+    if name is not None:
+        yield name, ops, numbers
+
+
+def assemble_lines(lines, path=None) -> AssembledCode:
+    code = AssembledCode()
+    for name, ops, numbers in iter_sections(lines, path):
+        code[name] = ops
+        code.lines[name] = numbers
+    return code
+
+
+def assemble(text: str, path=None) -> AssembledCode:
+    """Assemble the text of a source file; ``path`` is only used in error messages."""
+    return assemble_lines(text.splitlines(), path)
+
+
+def assemble_file(path) -> AssembledCode:
+    with open(path, "r") as file:
+        return assemble_lines(file, path)
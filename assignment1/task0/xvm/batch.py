@@ -0,0 +1,151 @@
+"""Run one program over many input vectors in a process pool.
+
+The program is parsed once in the calling process and shipped to each
+worker once, through the pool initializer. Every worker loads it into a
+single VM and reruns that VM for each input vector it is given.
+"""
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from xvm.vm import VM
+
+_worker_vm = None
+
+
+class BatchResult:
+    """The outcome of running the program on one input vector.
+
+    ``output`` holds the printed values. ``error`` is None on success, or
+    ``"ExceptionType: message"`` (exceptions do not always pickle, so only
+    their text crosses the process boundary).
+    """
+
+    def __init__(self, index, inputs, output, stack, variables, error=None):
+        self.index = index
+        self.inputs = inputs
+        self.output = output
+        self.stack = stack
+        self.variables = variables
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "output": self.output,
+            "stack": self.stack,
+            "variables": self.variables,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"BatchResult(index={self.index}, output={self.output!r}, error={self.error!r})"
+
+
+def _read_from(inputs):
+    values = iter(inputs)
+
+    def input_fn():
+        try:
+            return next(values)
+        except StopIteration:
+            raise EOFError("input vector exhausted") from None
+
+    return input_fn
+
+
+def _init_worker(code, vm_options):
+    global _worker_vm
+    _worker_vm = VM(**vm_options)
+    _worker_vm.load_code(code)
+
+
+def run_one(vm, index, inputs):
+    """Rerun the program loaded in ``vm`` on one input vector; returns a BatchResult."""
+    output = []
+    vm.restart()
+    vm.input_fn = _read_from(inputs)
+    vm.print_fn = output.append
+    try:
+        stack, variables = vm.run_loaded_code()
+    except Exception as error:
+        message = f"{type(error).__name__}: {error}"
+        return BatchResult(index, inputs, output, vm.stack, vm.variables, message)
+    return BatchResult(index, inputs, output, stack, variables)
+
+
+def _run_chunk(chunk):
+    return [run_one(_worker_vm, index, inputs) for index, inputs in chunk]
+
+
+def _chunks(inputs, chunksize):
+    chunk = []
+    for item in enumerate(inputs):
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(code, inputs, workers=None, ordered=True, chunksize=16, **vm_options):
+    """Run ``code`` once per input vector and return an iterator of BatchResults.
+
+    ``code`` is a list of ops or a function dict (parse JSON files once
+    with ``VM().parse_code_from_json``); ``inputs`` is an iterable of input
+    vectors fed to INPUT_* in order. Results come back in input order, or
+    as they complete with ``ordered=False``. ``workers`` defaults to the CPU
+    count; ``workers=0`` runs everything in this process. ``vm_options``
+    are passed to VM (``optimize``, ``memo_size``, ...).
+
+    ``inputs`` is read as results are consumed, with at most two chunks
+    per worker in flight, so it may be a large or endless generator. Bad
+    code raises here, before any input is read.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    vm = VM(**vm_options)
+    vm.load_code(code)
+
+    if workers == 0:
+        return (run_one(vm, index, vector) for index, vector in enumerate(inputs))
+    return _run_in_pool(code, inputs, workers or os.cpu_count(), ordered, chunksize, vm_options)
+
+
+def _run_in_pool(code, inputs, workers, ordered, chunksize, vm_options):
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(code, vm_options),
+    ) as executor:
+        chunks = _chunks(inputs, chunksize)
+
+        def submit(count):
+            return [executor.submit(_run_chunk, chunk) for chunk in islice(chunks, count)]
+
+        if ordered:
+            pending = deque(submit(2 * workers))
+        else:
+            pending = set(submit(2 * workers))
+        try:
+            while pending:
+                if ordered:
+                    results = pending.popleft().result()
+                    pending.extend(submit(1))
+                    yield from results
+                else:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.update(submit(len(done)))
+                    for future in done:
+                        yield from future.result()
+        finally:
+            # Stopped early: do not run chunks nobody will read.
+            for future in pending:
+                future.cancel()
@@ -1,67 +1,171 @@
+import argparse
 import os
 import json
 import sys
 
+from xvm.assembler import AssemblyError, iter_sections, parse_instruction
+from xvm.bytecode import EXTENSION, write_bytecode
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+from xvm.optimizer import format_report, optimize
+from xvm.verifier import verify
+
+def op_to_json(op):
+    if op.args:
+        return {"op": op.opcode.value, "arg": op.args[0]}
+    return {"op": op.opcode.value}
+
 def parse_line(line):
     line = line.strip()
     if not line or line.startswith("//"):
         return None
+    return op_to_json(parse_instruction(line))
 
-    parts = line.split(maxsplit=1)
-    op = parts[0]
-    if len(parts) == 2:
-        arg = parts[1].strip()
-        if arg.startswith('"') and arg.endswith('"'):
-            arg = arg[1:-1]
-        else:
-            try:
-                arg = int(arg)
-            except ValueError:
-                try:
-                    arg = float(arg)
-                except ValueError:
-                    pass
-        return {"op": op, "arg": arg}
-    else:
-        return {"op": op}
-
-def parse_file_to_json(txt_file_path):
+def json_to_ops(funcs):
+    code = {}
+    for func_name, op_objs in funcs.items():
+        ops = []
+        for op_obj in op_objs:
+            if op_obj.get("arg") is not None:
+                ops.append(Op(OpCode(op_obj["op"]), op_obj["arg"]))
+            else:
+                ops.append(Op(OpCode(op_obj["op"])))
+        code[func_name] = ops
+    return code
+
+def ops_to_json(code):
     funcs = {}
-    current_name = None
-    current_ops = []
+    for func_name, ops in code.items():
+        funcs[func_name] = [op_to_json(op) for op in ops]
+    return funcs
 
-    with open(txt_file_path, "r") as f:
-        for line in f:
-            line = line.rstrip("\n")
-            if line.startswith("#"):
-                if current_name is not None:
-                    funcs[current_name] = current_ops
-                func_name = line[1:].strip()
-                current_name = func_name
-                current_ops = []
+def optimize_json(funcs):
+    code = json_to_ops(funcs)
+    verify(code)
+    code, report = optimize(code)
+    return ops_to_json(code), report
+
+def write_xvmc(funcs, xvmc_file_path):
+    """Write JSON-style functions as a binary .xvmc file."""
+    code = json_to_ops(funcs)
+    verify(code)
+    write_bytecode(code, xvmc_file_path)
+
+def iter_text_functions(lines, path=None):
+    """Yield ``(name, op dicts)`` for each ``#name`` section of a text source."""
+    for func_name, ops, _ in iter_sections(lines, path):
+        yield func_name, [op_to_json(op) for op in ops]
+
+def _encode_value(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return _encode(value)
+    # Nested values are laid out like json.dump(..., indent=4) does.
+    return json.dumps(value, indent=4).replace("\n", "\n            ")
+
+_encode = json.JSONEncoder().encode
+
+def write_json_stream(funcs, f):
+    """Write ``(name, op dicts)`` pairs as bytecode JSON, one instruction at a time.
+
+    The output is the same as ``json.dump(dict(funcs), f, indent=4)``, but
+    ``funcs`` and each function's instructions may be generators, so the
+    program never has to be in memory as a whole. Pairs that repeat a name
+    are all written; loading keeps the last one.
+    """
+    write = f.write
+    write("{")
+    first_func = True
+    for func_name, op_objs in funcs:
+        write(("\n    " if first_func else ",\n    ") + _encode(func_name) + ": [")
+        first_func = False
+        first_op = True
+        for op_obj in op_objs:
+            if op_obj:
+                fields = ",".join(
+                    f"\n            {_encode(key)}: {_encode_value(value)}"
+                    for key, value in op_obj.items()
+                )
+                body = "{" + fields + "\n        }"
             else:
-                op_obj = parse_line(line)
-                if op_obj:
-                    current_ops.append(op_obj)
-        if current_name is not None:
-            funcs[current_name] = current_ops
+                body = "{}"
+            write(("\n        " if first_op else ",\n        ") + body)
+            first_op = False
+        write("]" if first_op else "\n    ]")
+    write("}" if first_func else "\n}")
 
+def parse_file_to_json(txt_file_path, optimize=False, binary=False):
     json_file_path = os.path.splitext(txt_file_path)[0] + ".json"
+    if not optimize and not binary:
+        # Nothing needs the whole program: stream it function by function.
+        try:
+            with open(txt_file_path, "r") as src, open(json_file_path, "w") as f:
+                write_json_stream(iter_text_functions(src, txt_file_path), f)
+        except AssemblyError:
+            # Do not leave half a program behind.
+            os.remove(json_file_path)
+            raise
+        print(f"Saved JSON to {json_file_path}")
+        return
+
+    with open(txt_file_path, "r") as f:
+        funcs = dict(iter_text_functions(f, txt_file_path))
+
+    if optimize:
+        funcs, report = optimize_json(funcs)
+        print(format_report(report))
+
+    if binary:
+        xvmc_file_path = os.path.splitext(txt_file_path)[0] + EXTENSION
+        write_xvmc(funcs, xvmc_file_path)
+        print(f"Saved bytecode to {xvmc_file_path}")
+        return
+
     with open(json_file_path, "w") as f:
-        json.dump(funcs, f, indent=4)
+        write_json_stream(funcs.items(), f)
     print(f"Saved JSON to {json_file_path}")
 
+def convert_json_to_xvmc(json_file_path, optimize=False):
+    with open(json_file_path, "r") as f:
+        funcs = json.load(f)
+    if optimize:
+        funcs, report = optimize_json(funcs)
+        print(format_report(report))
+    xvmc_file_path = os.path.splitext(json_file_path)[0] + EXTENSION
+    write_xvmc(funcs, xvmc_file_path)
+    print(f"Saved bytecode to {xvmc_file_path}")
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python build.py <path_to_txt_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Build XVM bytecode JSON from a text source.")
+    parser.add_argument(
+        "txt_file_path",
+        help="Path to the XVM text source, or a bytecode JSON file to convert to .xvmc."
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Fold constants and remove dead code, printing the size reduction per function."
+    )
+    parser.add_argument(
+        "--binary",
+        action="store_true",
+        help="Write compact binary bytecode (.xvmc) instead of JSON."
+    )
+    args = parser.parse_args()
 
-    txt_file_path = sys.argv[1]
+    txt_file_path = args.txt_file_path
     if not os.path.isfile(txt_file_path):
         print(f"File not found: {txt_file_path}")
         sys.exit(1)
 
-    parse_file_to_json(txt_file_path)
+    if txt_file_path.endswith(".json"):
+        convert_json_to_xvmc(txt_file_path, optimize=args.optimize)
+        return
+
+    try:
+        parse_file_to_json(txt_file_path, optimize=args.optimize, binary=args.binary)
+    except AssemblyError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""The compact binary bytecode format (.xvmc).
+
+Layout, all integers little-endian:
+
+    header        HEADER
+    opcode table  opcode_count x u32: pool index of the opcode's name
+    functions     function_count x FUNCTION: name index, first record, record count
+    constants     constant_count x CONSTANT: tag, offset and length in the data
+    records       record_count x INSTRUCTION: opcode table index, argument index
+    data          constant payloads
+
+Constants (opcode names, function names and instruction arguments) are
+interned, so every distinct value is stored once. Instructions are fixed
+8-byte records, which lets a BytecodeFile find any function's code
+without reading the rest of the file and decode it only when asked for.
+Opcodes are stored by name, so reordering OpCode does not invalidate
+existing files.
+"""
+import mmap
+import struct
+from collections.abc import Mapping
+
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+
+MAGIC = b"XVMC"
+VERSION = 1
+EXTENSION = ".xvmc"
+
+# magic, version, flags, opcode count, function count, constant count, record count
+HEADER = struct.Struct("<4sHHIIII")
+OPCODE = struct.Struct("<I")
+FUNCTION = struct.Struct("<III")
+CONSTANT = struct.Struct("<BxxxII")
+INSTRUCTION = struct.Struct("<II")
+
+NO_ARG = 0xFFFFFFFF
+
+# Constant tags.
+INT, BIG_INT, FLOAT, STRING, TRUE, FALSE = range(6)
+INT64 = struct.Struct("<q")
+FLOAT64 = struct.Struct("<d")
+
+
+class BytecodeError(ValueError):
+    pass
+
+
+def _constant_payload(value):
+    if value is True:
+        return TRUE, b""
+    if value is False:
+        return FALSE, b""
+    if isinstance(value, int):
+        if -2**63 <= value < 2**63:
+            return INT, INT64.pack(value)
+        return BIG_INT, str(value).encode("ascii")
+    if isinstance(value, float):
+        return FLOAT, FLOAT64.pack(value)
+    return STRING, value.encode("utf-8")
+
+
+def encode(code: dict[str, list[Op]]) -> bytes:
+    constants = {}
+    payloads = []
+
+    def intern(value):
+        if not isinstance(value, (int, float, str)):
+            raise BytecodeError(f"Cannot store a {type(value).__name__} constant: {value!r}")
+        # 1, 1.0 and True are equal but distinct constants.
+        key = (type(value), value)
+        index = constants.get(key)
+        if index is None:
+            index = constants[key] = len(payloads)
+            payloads.append(_constant_payload(value))
+        return index
+
+    opcodes = {}
+    functions = []
+    records = []
+    for name, ops in code.items():
+        first = len(records)
+        for position, op in enumerate(ops):
+            if len(op.args) > 1:
+                raise BytecodeError(f"{name}:{position}: {op.opcode.name} has more than one argument")
+            opcode = opcodes.get(op.opcode)
+            if opcode is None:
+                opcode = opcodes[op.opcode] = len(opcodes)
+            arg = intern(op.args[0]) if op.args else NO_ARG
+            records.append(INSTRUCTION.pack(opcode, arg))
+        functions.append(FUNCTION.pack(intern(name), first, len(records) - first))
+    opcode_names = [OPCODE.pack(intern(opcode.value)) for opcode in opcodes]
+
+    table = []
+    data = bytearray()
+    for tag, payload in payloads:
+        table.append(CONSTANT.pack(tag, len(data), len(payload)))
+        data += payload
+
+    header = HEADER.pack(MAGIC, VERSION, 0, len(opcode_names), len(functions), len(table), len(records))
+    return b"".join([header, *opcode_names, *functions, *table, *records, data])
+
+
+def write_bytecode(code: dict[str, list[Op]], path):
+    with open(path, "wb") as file:
+        file.write(encode(code))
+
+
+def is_bytecode(path) -> bool:
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class BytecodeFile(Mapping):
+    """A memory-mapped .xvmc file, as a read-only ``{name: list[Op]}`` mapping.
+
+    Only the header and the tables are read when the file is opened; a
+    function's instructions are decoded the first time it is looked up.
+    Identical instructions share one (immutable) Op.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise BytecodeError(f"{path}: empty file") from None
+        self._values = {}
+        self._ops = {}
+        self._decoded = {}
+        try:
+            self._read_tables()
+        except BytecodeError:
+            self.close()
+            raise
+
+    def _read_tables(self):
+        data = self._map
+        if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+            raise BytecodeError(f"{self.path}: not an {EXTENSION} file")
+        _, version, _, opcode_count, function_count, constant_count, record_count = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise BytecodeError(f"{self.path}: unsupported {EXTENSION} version {version}")
+
+        tables = HEADER.size
+        functions = tables + opcode_count * OPCODE.size
+        constants = functions + function_count * FUNCTION.size
+        self._records = constants + constant_count * CONSTANT.size
+        self._data = self._records + record_count * INSTRUCTION.size
+        if len(data) < self._data:
+            raise BytecodeError(f"{self.path}: truncated file")
+
+        opcode_names = [index for index, in OPCODE.iter_unpack(data[tables:functions])]
+        functions = FUNCTION.iter_unpack(data[functions:constants])
+        self._constants = list(CONSTANT.iter_unpack(data[constants:self._records]))
+
+        try:
+            self._opcodes = [OpCode(self._constant(index)) for index in opcode_names]
+        except ValueError as e:
+            raise BytecodeError(f"{self.path}: {e}") from None
+        self._functions = {}
+        for name, first, count in functions:
+            if first + count > record_count:
+                raise BytecodeError(f"{self.path}: function records out of range")
+            self._functions[self._constant(name)] = (first, count)
+
+    def _constant(self, index):
+        try:
+            return self._values[index]
+        except KeyError:
+            pass
+        try:
+            tag, offset, length = self._constants[index]
+        except IndexError:
+            raise BytecodeError(f"{self.path}: constant {index} out of range") from None
+        start = self._data + offset
+        payload = self._map[start:start + length]
+        if len(payload) != length:
+            raise BytecodeError(f"{self.path}: constant {index} out of range")
+        if tag == INT:
+            value = INT64.unpack(payload)[0]
+        elif tag == FLOAT:
+            value = FLOAT64.unpack(payload)[0]
+        elif tag == STRING:
+            value = payload.decode("utf-8")
+        elif tag == BIG_INT:
+            value = int(payload)
+        elif tag == TRUE or tag == FALSE:
+            value = tag == TRUE
+        else:
+            raise BytecodeError(f"{self.path}: unknown constant tag {tag}")
+        self._values[index] = value
+        return value
+
+    def _op(self, record):
+        opcode, arg = record
+        try:
+            opcode = self._opcodes[opcode]
+        except IndexError:
+            raise BytecodeError(f"{self.path}: opcode {opcode} out of range") from None
+        op = Op(opcode) if arg == NO_ARG else Op(opcode, self._constant(arg))
+        self._ops[record] = op
+        return op
+
+    def __getitem__(self, name):
+        ops = self._decoded.get(name)
+        if ops is None:
+            first, count = self._functions[name]
+            start = self._records + first * INSTRUCTION.size
+            cached = self._ops.get
+            make = self._op
+            ops = [
+                cached(record) or make(record)
+                for record in INSTRUCTION.iter_unpack(self._map[start:start + count * INSTRUCTION.size])
+            ]
+            self._decoded[name] = ops
+        return ops
+
+    def __iter__(self):
+        return iter(self._functions)
+
+    def __len__(self):
+        return len(self._functions)
+
+    def __contains__(self, name):
+        return name in self._functions
+
+    def load(self) -> dict[str, list[Op]]:
+        """Decode every function."""
+        return {name: self[name] for name in self._functions}
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_bytecode(path) -> dict[str, list[Op]]:
+    with BytecodeFile(path) as bytecode:
+        return bytecode.load()
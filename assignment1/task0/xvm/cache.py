@@ -0,0 +1,134 @@
+"""On-disk cache of loaded programs, in the spirit of ``__pycache__``.
+
+An entry holds what the VM builds when it loads a code file: the parsed
+functions and their verified, linked (and, with ``optimize``, fused)
+programs. Entries are keyed by a hash of the file's bytes, the xvm
+version, the cache format, the Python version and the optimize flag, so
+a changed file or a new release simply misses. The file is hashed in
+chunks, so computing the key never holds it in memory as a whole.
+
+Entries are written to a temporary file and renamed into place, so a
+runner never sees a half-written entry, even with several runners
+filling the cache at once. When the directory grows past ``max_size``
+bytes the least recently used entries are removed; a hit refreshes the
+entry's modification time. The cache is best effort: any error reading
+or writing it is treated as a miss.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+from xvm import __version__
+
+SUFFIX = ".xvmcache"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+HASH_CHUNK_SIZE = 64 * 1024
+# Entries pickle Op, SuperOp and the linker's functions. Bump this whenever
+# one of them changes shape, so old entries miss instead of loading wrong.
+FORMAT = 1
+
+
+def default_directory():
+    directory = os.environ.get("XVM_CACHE_DIR")
+    if directory:
+        return directory
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "xvm")
+
+
+class CodeCache:
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory if directory is not None else default_directory()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path, optimize=False) -> str:
+        """The key of a file's contents, read ``HASH_CHUNK_SIZE`` bytes at a time."""
+        digest = hashlib.sha256()
+        digest.update(f"xvm {__version__} format {FORMAT} "
+                      f"python {sys.version_info[0]}.{sys.version_info[1]} "
+                      f"optimize={bool(optimize)}\0".encode())
+        with open(path, "rb") as file:
+            while chunk := file.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                entry = pickle.load(file)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # A corrupt or incompatible entry: drop it and rebuild.
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.path(key))
+        except Exception:
+            self._remove(temporary)
+            return
+        self.evict()
+
+    def entries(self):
+        """``(mtime, size, path)`` of every entry, least recently used first."""
+        entries = []
+        try:
+            scan = os.scandir(self.directory)
+        except OSError:
+            return entries
+        with scan:
+            for entry in scan:
+                if not entry.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -56,16 +56,16 @@ class Debugger(cmd.Cmd):
             print(f"Error executing operation: {e}")
     
     def do_load(self, line):
-        """Load code from a file. Usage: load <file_path>"""
+        """Load code from a JSON, .xvmc or .txt source file. Usage: load <file_path>"""
         if not line.strip():
             print("Usage: load <file_path>")
             return
         try:
-            self.vm.load_code_from_json(line.strip())
+            self.vm.load_code_from_file(line.strip())
             print(f"Loaded code from {line.strip()}")
             print(f"Program counter reset to 0, {len(self.vm.code)} instructions loaded.")
-        except Exception:
-            print("Error loading code")
+        except Exception as e:
+            print(f"Error loading code: {e}")
 
     def do_step(self, _arg):
         """Execute one instruction from loaded code. Usage: step"""
@@ -106,6 +106,27 @@ class Debugger(cmd.Cmd):
             print(f"Error during execution: {e}")
             print(f"PC: {self.vm.pc}, Function: {self.vm.current_function}")
 
+    def do_profile(self, arg):
+        """Run the remaining code, counting and timing every instruction. Usage: profile [rows]"""
+        if not self.vm.code:
+            print("No code loaded. Use 'load <file>' first.")
+            return
+        if arg and not arg.isdigit():
+            print("Usage: profile [rows] where rows is a positive integer.")
+            return
+
+        self.vm.clear_breakpoint()
+        try:
+            profile = self.vm.run_profiled(self.vm.code, load_code=False)
+        except Exception as e:
+            print(f"Error during execution: {e}")
+            print(f"PC: {self.vm.pc}, Function: {self.vm.current_function}")
+            return
+
+        if self.vm.is_breakpoint_hit():
+            print(f"Hit breakpoint at PC {self.vm.pc}")
+        print(profile.report(int(arg) if arg else 10))
+
     def do_list(self, _arg):
         """List up to 5 instructions before and after the current one. Usage: list"""
         if not self.vm.code:
@@ -159,12 +180,16 @@ class Debugger(cmd.Cmd):
             print("Variables:")
             for variable, value in frame_vars.items():
                 print(f"  {variable}: {value}")
-        
+
+        if self.vm.elided_frames:
+            print(f"Tail calls elided {self.vm.elided_frames} frame(s) below the current one.")
+
         if self.vm.call_stack:
             print(f"\nCall stack depth: {len(self.vm.call_stack)}")
             print("Call stack:")
             for i, frame in enumerate(reversed(self.vm.call_stack)):
-                print(f"  #{i}: {frame.function_name} (return to PC {frame.return_pc})")
+                elided = f" [+{frame.elided_frames} elided by tail calls]" if frame.elided_frames else ""
+                print(f"  #{i}: {frame.function_name} (return to PC {frame.return_pc}){elided}")
 
     # --- Default (catch-all) ---
     def default(self, line):
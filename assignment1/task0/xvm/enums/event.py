@@ -0,0 +1,26 @@
+from enum import Enum
+
+
+class Event(Enum):
+    """Events a VM hook can be registered for (see VM.add_hook).
+
+    Every hook is called as ``callback(vm, function, pc, arg)``:
+
+    INSTRUCTION  before an instruction runs; ``arg`` is the instruction.
+    CALL         after CALL entered ``function``; ``pc`` is the CALL in the
+                 caller and ``arg`` the caller's name. Memoized calls do
+                 not enter the function and are not reported.
+    RETURN       after ``function`` returned (RET or falling off its end)
+                 from ``pc``; ``arg`` is the function returned to.
+                 A call in tail position hands its frame to the callee
+                 and gets no RETURN of its own: the callee returns
+                 straight to the caller's caller, reported once.
+    INPUT        after INPUT_* read ``arg``.
+    OUTPUT       before PRINT prints ``arg``.
+    """
+
+    INSTRUCTION = 'INSTRUCTION'
+    CALL = 'CALL'
+    RETURN = 'RETURN'
+    INPUT = 'INPUT'
+    OUTPUT = 'OUTPUT'
@@ -33,3 +33,7 @@ class OpCode(Enum):
 
     CALL = 'CALL'
     RET = 'RET'
+
+    def __init__(self, value):
+        # Dense small-int id in declaration order, used to index dispatch tables.
+        self.id = len(self.__class__._member_names_)
@@ -0,0 +1,24 @@
+from enum import Enum
+
+from xvm.enums.op_code import OpCode
+
+
+class SuperOpCode(Enum):
+    LOAD_VAR_LOAD_VAR = 'LOAD_VAR_LOAD_VAR'
+    LOAD_VAR_LOAD_CONST = 'LOAD_VAR_LOAD_CONST'
+    LOAD_CONST_LOAD_VAR = 'LOAD_CONST_LOAD_VAR'
+
+    LOAD_VAR_LOAD_VAR_BINARY = 'LOAD_VAR_LOAD_VAR_BINARY'
+    LOAD_VAR_LOAD_CONST_BINARY = 'LOAD_VAR_LOAD_CONST_BINARY'
+    LOAD_CONST_LOAD_VAR_BINARY = 'LOAD_CONST_LOAD_VAR_BINARY'
+    BINARY_STORE_VAR = 'BINARY_STORE_VAR'
+
+    LOAD_CONST_COMPARE_CJMP = 'LOAD_CONST_COMPARE_CJMP'
+    COMPARE_CJMP = 'COMPARE_CJMP'
+
+    LOAD_CONST_STORE_VAR = 'LOAD_CONST_STORE_VAR'
+    STORE_VAR_LOAD_VAR = 'STORE_VAR_LOAD_VAR'
+
+    def __init__(self, value):
+        # Ids continue after OpCode so both share one dispatch table.
+        self.id = len(OpCode) + len(self.__class__._member_names_)
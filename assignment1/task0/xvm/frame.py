@@ -1,6 +1,32 @@
+# Marks a variable slot that has not been assigned yet.
+UNSET = object()
+
+
 class Frame:
-    def __init__(self, function_name, return_pc, variables=None, labels=None):
+    __slots__ = (
+        "function_name",
+        "return_pc",
+        "slots",
+        "extras",
+        "labels",
+        "elided_frames",
+        "memo_key",
+    )
+
+    def __init__(
+        self, function_name, return_pc, slots=None, labels=None, extras=None, elided_frames=0
+    ):
+        self.reset(function_name, return_pc, slots, labels, extras, elided_frames)
+
+    def reset(
+        self, function_name, return_pc, slots=None, labels=None, extras=None, elided_frames=0
+    ):
         self.function_name = function_name
         self.return_pc = return_pc
-        self.variables = variables if variables is not None else {}
-        self.labels =  labels if labels is not None else {}
\ No newline at end of file
+        self.slots = slots if slots is not None else []
+        self.extras = extras
+        self.labels = labels if labels is not None else {}
+        # Frames this activation replaced through tail calls.
+        self.elided_frames = elided_frames
+        # Set when the call's results should be stored in the VM's memo cache.
+        self.memo_key = None
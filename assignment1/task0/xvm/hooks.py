@@ -0,0 +1,33 @@
+class Hook:
+    """A callback registered on a VM for one Event.
+
+    ``functions`` limits the hook to events about those functions (the
+    callee for CALL, the returning function for RETURN); None means all.
+    Setting ``enabled`` turns the hook off and on without removing it.
+    Tail calls are reported as CALLs but return only once (see Event).
+    """
+
+    __slots__ = ("event", "callback", "functions", "_enabled", "_on_change")
+
+    def __init__(self, event, callback, functions=None, on_change=None):
+        self.event = event
+        self.callback = callback
+        self.functions = None if functions is None else frozenset(functions)
+        self._enabled = True
+        self._on_change = on_change
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._enabled = enabled
+        if self._on_change is not None:
+            self._on_change()
+
+    def wants(self, function):
+        return self.functions is None or function in self.functions
+
+    def __repr__(self):
+        return f"Hook(event={self.event.name}, enabled={self._enabled}, functions={self.functions})"
@@ -0,0 +1,396 @@
+"""Compile XVM programs to Python functions.
+
+Each XVM function becomes one Python function in a generated module:
+variables are Python locals, labels are the states of a small block state
+machine and CALL is a direct Python call sharing the value stack. Inside a
+block, stack values are kept as Python expressions and only pushed to the
+real stack at block boundaries and calls, so ``LOAD_VAR a, LOAD_CONST 1,
+ADD, STORE_VAR a`` compiles to ``a = (1 + a)``.
+
+Programs that cannot be compiled (BREAKPOINT needs to pause mid-function)
+raise JitError; the VM runs those with the interpreter. So do runs whose
+calls nest deeper than Python's recursion limit (see JitRecursionError).
+"""
+import math
+import re
+
+from xvm.enums.op_code import OpCode
+from xvm.linker import find_labels
+from xvm.op import Op
+from xvm.operators import COMPARISON_OPCODES, check_string, number_reader
+from xvm.verifier import ENTRYPOINT_KEY
+
+_BINARY = {
+    OpCode.ADD: "+",
+    OpCode.SUB: "-",
+    OpCode.MUL: "*",
+    OpCode.DIV: "/",
+    OpCode.MOD: "%",
+    OpCode.EQ: "==",
+    OpCode.NEQ: "!=",
+    OpCode.GT: ">",
+    OpCode.LT: "<",
+    OpCode.GE: ">=",
+    OpCode.LE: "<=",
+}
+
+_UNARY = {
+    OpCode.EXP: "_exp({})",
+    OpCode.SQRT: "_sqrt({})",
+    OpCode.NEG: "(-{})",
+}
+
+_BLOCK_ENDS = (OpCode.JMP, OpCode.CJMP, OpCode.RET)
+
+_UNBOUND_LOCAL = re.compile(r"'(v\d+_\w*)'")
+
+_NO_CONSTANT = object()
+
+_POP = "pop()"
+
+
+class JitError(Exception):
+    """The program uses something the JIT cannot compile."""
+
+
+class JitRecursionError(JitError):
+    """Compiled XVM calls nested deeper than Python's recursion limit.
+
+    The interpreter has no such limit and elides tail calls, so the VM
+    reruns the program there. ``inputs`` are the values read and
+    ``printed`` the number of values printed until then, so the rerun can
+    replay the one and skip the other.
+    """
+
+    def __init__(self, inputs, printed):
+        super().__init__("XVM calls nested too deeply for the JIT")
+        self.inputs = inputs
+        self.printed = printed
+
+
+class _InputRecorder:
+    def __init__(self, input_fn):
+        self._input_fn = input_fn
+        self._read_number = number_reader(input_fn)
+        self.values = []
+
+    def __call__(self):
+        value = self._input_fn()
+        self.values.append(value)
+        return value
+
+    def read_number(self):
+        value = self._read_number()
+        self.values.append(value)
+        return value
+
+
+class _Value:
+    """A stack value held as a Python expression during code generation.
+
+    ``condition`` is the bare comparison for values produced by EQ/LT/...,
+    ``constant`` the Python value for LOAD_CONST and ``settled`` tells
+    whether evaluating the expression can neither fail nor change
+    (constants and temporaries).
+    """
+
+    __slots__ = ("expr", "condition", "constant", "settled")
+
+    def __init__(self, expr, condition=None, constant=_NO_CONSTANT, settled=False):
+        self.expr = expr
+        self.condition = condition
+        self.constant = constant
+        self.settled = settled
+
+
+def _collect(variables, frame_locals, names):
+    result = dict(variables)
+    for local, name in names:
+        if local in frame_locals:
+            result[name] = frame_locals[local]
+    return result
+
+
+class _FunctionCompiler:
+    def __init__(self, program, name, ops, function_id, is_entrypoint=False):
+        self.program = program
+        self.name = name
+        self.ops = ops
+        self.function_id = function_id
+        self.is_entrypoint = is_entrypoint
+        self.lines = []
+        self.indent = 1
+        self.values = []
+        self.popped = False
+        self.temps = 0
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+
+    def compile(self):
+        params = "stack, variables" if self.is_entrypoint else "stack"
+        self.emit(f"def {self.function_id}({params}):")
+        self.indent += 1
+        self.emit("push = stack.append")
+        self.emit("pop = stack.pop")
+        if self.is_entrypoint:
+            names = dict.fromkeys(
+                op.args[0] for op in self.ops if op.opcode in (OpCode.LOAD_VAR, OpCode.STORE_VAR)
+            )
+            for name in names:
+                self.emit(f"if {name!r} in variables: {self.program.local(name)} = variables[{name!r}]")
+
+        blocks = self._blocks()
+        if len(blocks) == 1 and not self.program.labels[self.name]:
+            self._compile_block(*blocks[0], None)
+        else:
+            self.block_ids = {start: index for index, (start, _) in enumerate(blocks)}
+            self.emit("block = 0")
+            self.emit("while True:")
+            self.indent += 1
+            for index, (start, end) in enumerate(blocks):
+                self.emit(f"if block == {index}:")
+                self.indent += 1
+                next_block = index + 1 if index + 1 < len(blocks) else None
+                self._compile_block(start, end, next_block)
+                self.indent -= 1
+            self.indent -= 1
+        self.indent -= 1
+        return self.lines
+
+    def _blocks(self):
+        leaders = {0}
+        for pc, op in enumerate(self.ops):
+            if op.opcode == OpCode.LABEL:
+                leaders.add(pc)
+            elif op.opcode in _BLOCK_ENDS:
+                leaders.add(pc + 1)
+        starts = sorted(pc for pc in leaders if pc < len(self.ops)) or [0]
+        return list(zip(starts, starts[1:] + [len(self.ops)]))
+
+    def _compile_block(self, start, end, next_block):
+        self.values = []
+        self.popped = False
+        for pc in range(start, end):
+            op = self.ops[pc]
+            if op.opcode == OpCode.BREAKPOINT:
+                raise JitError(f"Function '{self.name}', PC {pc}: BREAKPOINT cannot be compiled")
+            self._compile_op(op)
+            if op.opcode in (OpCode.JMP, OpCode.RET):
+                return
+
+        self._flush()
+        if next_block is None:
+            self._return()
+        else:
+            self.emit(f"block = {next_block}")
+
+    def _compile_op(self, op: Op):
+        opcode = op.opcode
+
+        if opcode == OpCode.LOAD_CONST:
+            value = op.args[0]
+            self._push(_Value(self.program.literal(value), constant=value, settled=True))
+        elif opcode == OpCode.LOAD_VAR:
+            self._push(_Value(self.program.local(op.args[0])))
+        elif opcode == OpCode.STORE_VAR:
+            local = self.program.local(op.args[0])
+            value = self._pop()
+            self._settle()
+            self.emit(f"{local} = {value.expr}")
+            self.popped = False
+        elif opcode == OpCode.INPUT_STRING:
+            self._settle()
+            self._push_temp("_input_string(input_fn())")
+        elif opcode == OpCode.INPUT_NUMBER:
+            self._settle()
+            self._push_temp("read_number()")
+        elif opcode == OpCode.PRINT:
+            value = self._pop()
+            self._settle()
+            self.emit(f"print_fn({value.expr})")
+            self.popped = False
+        elif opcode in _BINARY:
+            arg1 = self._pop()
+            arg2 = self._pop()
+            if not arg1.settled and not arg2.settled and arg1.expr != _POP:
+                # Python evaluates arg1 first, but arg2's instructions ran first.
+                self._settle()
+                arg2 = self._temp(arg2.expr)
+            expr = f"{arg1.expr} {_BINARY[opcode]} {arg2.expr}"
+            if opcode in COMPARISON_OPCODES:
+                self._result(_Value(f"(1 if {expr} else 0)", condition=expr))
+            else:
+                self._result(_Value(f"({expr})"))
+        elif opcode in _UNARY:
+            arg1 = self._pop()
+            self._result(_Value(_UNARY[opcode].format(arg1.expr)))
+        elif opcode == OpCode.LABEL:
+            pass
+        elif opcode == OpCode.JMP:
+            self._flush()
+            self._jump(op.args[0])
+        elif opcode == OpCode.CJMP:
+            condition = self._pop()
+            self._flush()
+            self.emit(f"if {condition.condition or condition.expr + ' == 1'}:")
+            self.indent += 1
+            self._jump(op.args[0])
+            self.indent -= 1
+        elif opcode == OpCode.CALL:
+            function_name = self._pop()
+            self._flush()
+            function_id = self.program.function_ids.get(function_name.constant)
+            if function_id is not None:
+                self.emit(f"{function_id}(stack)")
+            else:
+                self.emit(f"_call({function_name.expr})(stack)")
+            self.popped = False
+        elif opcode == OpCode.RET:
+            self._flush()
+            self._return()
+        else:
+            raise JitError(f"Function '{self.name}': {opcode.name} cannot be compiled")
+
+    def _jump(self, label):
+        self.emit(f"block = {self.block_ids[self.program.labels[self.name][label]]}")
+        self.emit("continue")
+
+    def _return(self):
+        if self.is_entrypoint:
+            self.emit("return _collect(variables, locals(), _names)")
+        else:
+            self.emit("return")
+
+    def _push(self, value):
+        self.values.append(value)
+
+    def _pop(self):
+        if self.values:
+            return self.values.pop()
+        # The value is on the real stack: whatever consumes it must be
+        # evaluated right away, see _result.
+        self.popped = True
+        return _Value(_POP)
+
+    def _result(self, value):
+        if self.popped:
+            self._push_temp(value.expr)
+            self.popped = False
+        else:
+            self._push(value)
+
+    def _temp(self, expr):
+        temp = f"t{self.temps}"
+        self.temps += 1
+        self.emit(f"{temp} = {expr}")
+        return _Value(temp, settled=True)
+
+    def _push_temp(self, expr):
+        self._push(self._temp(expr))
+
+    def _settle(self):
+        # Evaluate pending expressions, oldest first, before anything else
+        # is evaluated, so errors such as a missing variable surface in
+        # program order.
+        for index, value in enumerate(self.values):
+            if not value.settled:
+                self.values[index] = self._temp(value.expr)
+
+    def _flush(self):
+        for value in self.values:
+            self.emit(f"push({value.expr})")
+        self.values = []
+        self.popped = False
+
+
+class CompiledProgram:
+    """A compiled program; ``run`` has the same contract as VM.run_code."""
+
+    def __init__(self, functions: dict[str, list[Op]]):
+        if ENTRYPOINT_KEY not in functions:
+            raise JitError(f"Program has no '{ENTRYPOINT_KEY}' function")
+
+        self.function_ids = {name: f"f{index}" for index, name in enumerate(functions)}
+        self.labels = {name: find_labels(ops) for name, ops in functions.items()}
+        self._locals = {}
+        self._constants = []
+
+        lines = ["def _build(input_fn, print_fn):"]
+        lines.append("    read_number = _number_reader(input_fn)")
+        lines.append("    def _call(name):")
+        lines.append("        try:")
+        lines.append("            return functions[name]")
+        lines.append("        except (KeyError, TypeError):")
+        lines.append("            raise NameError(f\"Function '{name}' is not defined\") from None")
+        for name, ops in functions.items():
+            lines.extend(_FunctionCompiler(self, name, ops, self.function_ids[name]).compile())
+        # The run starts in "main", which takes and returns the variables;
+        # a CALL of the entrypoint gets a fresh frame like any other call.
+        lines.extend(
+            _FunctionCompiler(
+                self, ENTRYPOINT_KEY, functions[ENTRYPOINT_KEY], "main", is_entrypoint=True
+            ).compile()
+        )
+        table = ", ".join(f"{name!r}: {id_}" for name, id_ in self.function_ids.items())
+        lines.append(f"    functions = {{{table}}}")
+        lines.append("    return main")
+        self.source = "\n".join(lines) + "\n"
+
+        self.names = {local: name for name, local in self._locals.items()}
+        namespace = {
+            "_exp": math.exp,
+            "_sqrt": math.sqrt,
+            "_number_reader": number_reader,
+            "_input_string": check_string,
+            "_collect": _collect,
+            "_names": tuple(self.names.items()),
+            "_K": tuple(self._constants),
+        }
+        exec(compile(self.source, "<xvm-jit>", "exec"), namespace)
+        self._build = namespace["_build"]
+
+    def local(self, name):
+        local = self._locals.get(name)
+        if local is None:
+            local = f"v{len(self._locals)}_{re.sub(r'[^0-9A-Za-z_]', '_', name)[:32]}"
+            self._locals[name] = local
+        return local
+
+    def literal(self, value):
+        if isinstance(value, (int, str)) or (isinstance(value, float) and math.isfinite(value)):
+            return repr(value)
+        self._constants.append(value)
+        return f"_K[{len(self._constants) - 1}]"
+
+    def run(self, stack, variables, input_fn=input, print_fn=print):
+        """Run the program on ``stack``; returns the entrypoint's variables.
+
+        Raises JitRecursionError if the calls nest too deeply.
+        """
+        recorder = _InputRecorder(input_fn)
+        printed = 0
+
+        def print_counted(value):
+            nonlocal printed
+            print_fn(value)
+            printed += 1
+
+        entrypoint = self._build(recorder, print_counted)
+        try:
+            return entrypoint(stack, variables)
+        except RecursionError:
+            raise JitRecursionError(recorder.values, printed) from None
+        except NameError as error:
+            # Reading an unassigned XVM variable is an unbound (or, if the
+            # function never assigns it, undefined) Python name.
+            match = _UNBOUND_LOCAL.search(str(error))
+            name = self.names.get(match.group(1)) if match else None
+            if name is None:
+                raise
+            raise NameError(f"Variable '{name}' not found.") from None
+
+
+def compile_program(functions: dict[str, list[Op]]) -> CompiledProgram:
+    """Compile a verified program; raises JitError if it cannot be compiled."""
+    return CompiledProgram(functions)
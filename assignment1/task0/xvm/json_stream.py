@@ -0,0 +1,252 @@
+"""Incremental reader for bytecode JSON files.
+
+``json.load`` builds the whole document as dicts and lists before the
+first Op exists, which roughly doubles peak memory for big programs.
+``iter_functions`` instead reads the file in chunks and decodes one
+instruction object at a time with ``JSONDecoder.raw_decode``, yielding
+each function's Ops as soon as its list ends. Besides the Ops, only the
+current chunk is held. The writer counterpart is build.write_json_stream.
+"""
+import json
+import re
+from functools import partial
+
+from xvm.enums.op_code import OpCode
+from xvm.lazy import LazyCode
+from xvm.op import Op
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+SHARED_OPS_LIMIT = 4096
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+# Skips text and complete strings up to the next bracket, the opening
+# quote of a string cut short, or the end of the buffer.
+_structure = re.compile(r'(?:[^"\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*([\[\]"]|\Z)')
+
+
+def op_from_json(op_dict, shared):
+    """The Op for one ``{"op": ..., "arg": ...}`` object.
+
+    Ops are immutable, so equal instructions share one object through
+    the ``shared`` dict.
+    """
+    arg = op_dict.get("arg")
+    try:
+        # 1, 1.0 and True are equal but must stay distinct.
+        key = (op_dict.get("op"), arg.__class__, arg)
+        op = shared.get(key)
+    except TypeError:
+        key = op = None
+    if op is None:
+        opcode = OpCode(op_dict.get("op"))
+        op = Op(opcode, arg) if arg is not None else Op(opcode)
+        if key is not None:
+            # Keep the table bounded in programs with many distinct constants.
+            if len(shared) >= SHARED_OPS_LIMIT:
+                shared.clear()
+            shared[key] = op
+    return op
+
+
+def ops_from_json(data_ops, shared) -> list[Op]:
+    return [op_from_json(op_dict, shared) for op_dict in data_ops]
+
+
+class _Reader:
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self):
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so only the current chunk is kept.
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """The next character after any whitespace, or "" at the end of the file."""
+        while True:
+            self.pos = _whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, char, message):
+        if self.peek() != char:
+            raise json.JSONDecodeError(message, self.buffer, self.pos)
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # The value may continue in the next chunk; an error well
+                # before the end of the buffer is a real one. (A cut number,
+                # literal or escape fails a few characters before the end.)
+                truncated = (
+                    e.msg.startswith("Unterminated string")
+                    or len(self.buffer) - e.pos <= max(self.chunk_size, 64)
+                )
+                if truncated and self._more():
+                    continue
+                raise
+            # A number at the end of the buffer may have more digits.
+            if end == len(self.buffer) and self._more():
+                continue
+            self.pos = end
+            return value
+
+
+def _read_ops(reader, shared):
+    """Decode a non-empty instruction list up to and including its "]"."""
+    ops = []
+    append = ops.append
+    skip = _whitespace.match
+    # Keep a chunk of lookahead so that, unless an instruction is bigger
+    # than that, a batch below is never cut short by the buffer's end.
+    lookahead = reader.chunk_size
+    buffer, pos = reader.buffer, reader.pos
+    while True:
+        if len(buffer) - pos < lookahead and not reader.eof:
+            reader.pos = pos
+            reader._more()
+            buffer, pos = reader.buffer, reader.pos
+        pos = skip(buffer, pos).end()
+
+        # Decode every instruction up to the last "}" before the list's
+        # "]" in one call. Should either character be inside a string,
+        # the batch is not valid JSON and one instruction is read instead.
+        close = buffer.find("]", pos)
+        end = buffer.rfind("}", pos, close if close != -1 else len(buffer))
+        values = None
+        if end != -1:
+            try:
+                values = _decoder.decode("[" + buffer[pos:end + 1] + "]")
+            except json.JSONDecodeError:
+                pass
+        if values:
+            for value in values:
+                append(op_from_json(value, shared))
+            pos = end + 1
+        else:
+            reader.pos = pos
+            append(op_from_json(reader.value(), shared))
+            buffer, pos = reader.buffer, reader.pos
+
+        pos = skip(buffer, pos).end()
+        char = buffer[pos:pos + 1]
+        if char == ",":
+            pos += 1
+        elif char == "]":
+            reader.pos = pos + 1
+            return ops
+        else:
+            reader.pos = pos
+            if reader.peek() == "]":
+                reader.pos += 1
+                return ops
+            reader.expect(",", "Expecting ',' delimiter")
+            buffer, pos = reader.buffer, reader.pos
+
+
+def _read_text(reader):
+    """The text of an instruction list whose "[" was just read, up to its "]"."""
+    start = reader.pos - 1
+    # Offset of the next character to scan, relative to ``start``.
+    scanned = 1
+    depth = 1
+    while True:
+        match = _structure.match(reader.buffer, start + scanned)
+        token = match.group(1)
+        if token == "[" or token == "]":
+            depth += 1 if token == "[" else -1
+            scanned = match.end() - start
+            if depth == 0:
+                reader.pos = match.end()
+                return reader.buffer[start:reader.pos]
+            continue
+        # The end of the buffer, or a string that goes on in the next
+        # chunk: keep the whole list in the buffer and read on.
+        scanned = match.start(1) - start
+        reader.pos = start
+        if not reader._more():
+            raise json.JSONDecodeError("Unterminated list of instructions", reader.buffer, start)
+        start = 0
+
+
+def _iter_top_level(reader, read_body):
+    reader.expect("{", "Expecting '{'")
+    if reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            if reader.peek() != '"':
+                raise json.JSONDecodeError(
+                    "Expecting property name enclosed in double quotes", reader.buffer, reader.pos
+                )
+            name = reader.value()
+            reader.expect(":", "Expecting ':' delimiter")
+            reader.expect("[", "Expecting a list of instructions")
+            yield name, read_body(reader)
+
+            if reader.peek() == "}":
+                reader.pos += 1
+                break
+            reader.expect(",", "Expecting ',' delimiter")
+
+    if reader.peek() != "":
+        raise json.JSONDecodeError("Extra data", reader.buffer, reader.pos)
+
+
+def iter_functions(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``(name, list[Op])`` for each function of a bytecode JSON text file.
+
+    Raises json.JSONDecodeError for malformed JSON, like ``json.load``.
+    """
+    shared = {}
+
+    def read_ops(reader):
+        if reader.peek() == "]":
+            reader.pos += 1
+            return []
+        return _read_ops(reader, shared)
+
+    return _iter_top_level(_Reader(file, chunk_size), read_ops)
+
+
+def iter_function_texts(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield ``(name, JSON text of its instruction list)`` without decoding the lists.
+
+    Only the brackets and strings are scanned, so malformed instructions
+    go unnoticed until the text is decoded (see decode_ops).
+    """
+    return _iter_top_level(_Reader(file, chunk_size), _read_text)
+
+
+def decode_ops(text, shared) -> list[Op]:
+    return ops_from_json(_decoder.decode(text), shared)
+
+
+def read_code(path, chunk_size=DEFAULT_CHUNK_SIZE) -> dict[str, list[Op]]:
+    with open(path, "r") as file:
+        return dict(iter_functions(file, chunk_size))
+
+
+def read_code_lazily(path, chunk_size=DEFAULT_CHUNK_SIZE) -> LazyCode:
+    """A LazyCode holding each function's JSON text until it is first looked up."""
+    with open(path, "r") as file:
+        texts = dict(iter_function_texts(file, chunk_size))
+    return LazyCode(texts, partial(decode_ops, shared={}))
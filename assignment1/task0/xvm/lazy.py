@@ -0,0 +1,36 @@
+from collections.abc import Mapping
+
+
+class LazyCode(Mapping):
+    """A read-only ``{name: list[Op]}`` whose functions are decoded on first lookup.
+
+    ``source`` maps every function name to its undecoded body and
+    ``decode`` turns one body into a list of Ops. A VM given a mapping
+    like this (or a BytecodeFile) verifies and links each function when
+    it is first entered, instead of the whole program up front.
+    """
+
+    def __init__(self, source, decode):
+        self._source = source
+        self._decode = decode
+        self._decoded = {}
+
+    def __getitem__(self, name):
+        ops = self._decoded.get(name)
+        if ops is None:
+            ops = self._decoded[name] = self._decode(self._source[name])
+        return ops
+
+    def __iter__(self):
+        return iter(self._source)
+
+    def __len__(self):
+        return len(self._source)
+
+    def __contains__(self, name):
+        return name in self._source
+
+    @property
+    def decoded(self):
+        """Names of the functions decoded so far."""
+        return list(self._decoded)
@@ -0,0 +1,112 @@
+from types import MappingProxyType
+
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+
+JUMP_OPCODES = (OpCode.JMP, OpCode.CJMP)
+VARIABLE_OPCODES = (OpCode.LOAD_VAR, OpCode.STORE_VAR)
+
+
+class LinkedFunction:
+    """A function body together with its linked program and label table.
+
+    ``ops`` is the source the function was linked from, ``program`` is the
+    same list with jump targets resolved and variable names replaced by slot
+    indices, ``labels`` is a read-only name -> PC table shared by every frame
+    running this function, ``slots``/``slot_names`` map variable names to
+    slot indices and back and ``tail_calls`` holds the PCs of CALLs in tail
+    position.
+    """
+
+    def __init__(self, name, ops, program, labels, slots=None, tail_calls=frozenset()):
+        self.name = name
+        self.ops = ops
+        self.program = program
+        self.labels = labels
+        self.slots = MappingProxyType(slots if slots is not None else {})
+        self.slot_names = tuple(self.slots)
+        self.tail_calls = tail_calls
+
+    def __reduce__(self):
+        # MappingProxyType cannot be pickled; rebuild it from plain dicts.
+        return (
+            _linked_function,
+            (self.name, self.ops, self.program, dict(self.labels), dict(self.slots), self.tail_calls),
+        )
+
+
+def _linked_function(name, ops, program, labels, slots, tail_calls):
+    return LinkedFunction(name, ops, program, MappingProxyType(labels), slots, tail_calls)
+
+
+def find_labels(ops: list[Op]) -> dict[str, int]:
+    labels = {}
+    for pc, op in enumerate(ops):
+        if op.opcode == OpCode.LABEL and op.args:
+            labels[op.args[0]] = pc
+    return labels
+
+
+def assign_slots(ops: list[Op]) -> dict[str, int]:
+    """Number the variables of a function in order of first use."""
+    slots = {}
+    for op in ops:
+        if op.opcode in VARIABLE_OPCODES:
+            slots.setdefault(op.args[0], len(slots))
+    return slots
+
+
+def find_tail_calls(ops: list[Op]) -> frozenset[int]:
+    """PCs of CALLs followed (past any LABELs) by RET or the end of the function."""
+    tail_calls = set()
+    for pc, op in enumerate(ops):
+        if op.opcode != OpCode.CALL:
+            continue
+        following = pc + 1
+        while following < len(ops) and ops[following].opcode == OpCode.LABEL:
+            following += 1
+        if following == len(ops) or ops[following].opcode == OpCode.RET:
+            tail_calls.add(pc)
+    return frozenset(tail_calls)
+
+
+def _linked_op(linked_ops, opcode, target):
+    op = linked_ops.get((opcode, target))
+    if op is None:
+        op = linked_ops[(opcode, target)] = Op(opcode, target)
+    return op
+
+
+def link_function(function_name: str, ops: list[Op]) -> LinkedFunction:
+    """Link ``ops``, resolving JMP/CJMP targets to label PCs.
+
+    LABEL ops stay in place as markers so PCs match the source listing;
+    a jump lands on the marker and execution continues after it. LOAD_VAR
+    and STORE_VAR get the variable's slot index instead of its name.
+    """
+    labels = find_labels(ops)
+    slots = assign_slots(ops)
+    program = []
+    # Equal linked instructions share one Op, like the source ones.
+    linked_ops = {}
+
+    for pc, op in enumerate(ops):
+        if op.opcode in JUMP_OPCODES and len(op.args) == 1:
+            label_name = op.args[0]
+            if label_name not in labels:
+                raise NameError(
+                    f"Label '{label_name}' is not defined "
+                    f"(function '{function_name}', PC {pc})"
+                )
+            op = _linked_op(linked_ops, op.opcode, labels[label_name])
+        elif op.opcode in VARIABLE_OPCODES:
+            op = _linked_op(linked_ops, op.opcode, slots[op.args[0]])
+        program.append(op)
+
+    return LinkedFunction(
+        function_name, ops, program, MappingProxyType(labels), slots, find_tail_calls(ops)
+    )
+
+
+def link(functions: dict[str, list[Op]]) -> dict[str, LinkedFunction]:
+    return {name: link_function(name, ops) for name, ops in functions.items()}
@@ -0,0 +1,58 @@
+import math
+from collections import OrderedDict
+
+
+class MemoCache:
+    """A bounded LRU cache of pure function results with hit/miss counters.
+
+    Keys are built by ``key`` from the function name and its arguments;
+    values are the tuples of results the call left on the stack.
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(function_name, args):
+        # 1, 1.0 and True are equal as dict keys but give different results,
+        # and so do 0.0 and -0.0.
+        signs = tuple(math.copysign(1.0, arg) for arg in args if type(arg) is float)
+        return function_name, tuple(map(type, args)), tuple(args), signs
+
+    def get(self, key):
+        """Return the cached results for ``key`` or None."""
+        try:
+            results = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return results
+
+    def put(self, key, results):
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
@@ -1,12 +1,45 @@
-from dataclasses import dataclass, field
-
 from xvm.enums.op_code import OpCode
 
-@dataclass
+
 class Op:
-    opcode: OpCode
-    args: tuple = field(default_factory=tuple)
-    
+    """A single immutable instruction.
+
+    ``opcode_id`` caches ``opcode.id`` so the interpreter can index its
+    handler table without touching the Enum member.
+    """
+
+    __slots__ = ("opcode", "args", "opcode_id")
+
     def __init__(self, opcode: OpCode, *args):
-        self.opcode = opcode
-        self.args = args
\ No newline at end of file
+        if not isinstance(opcode, OpCode):
+            raise ValueError(f"Unknown opcode: {opcode!r}")
+
+        _set_opcode(self, opcode)
+        _set_args(self, args)
+        _set_opcode_id(self, opcode.id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Op is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Op is immutable")
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.opcode is other.opcode and self.args == other.args
+
+    def __hash__(self):
+        return hash((self.opcode, self.args))
+
+    def __repr__(self):
+        return f"Op(opcode={self.opcode!r}, args={self.args!r})"
+
+    def __reduce__(self):
+        return (self.__class__, (self.opcode, *self.args))
+
+
+# Slot setters bypass the immutability guard in __setattr__.
+_set_opcode = Op.opcode.__set__
+_set_args = Op.args.__set__
+_set_opcode_id = Op.opcode_id.__set__
@@ -0,0 +1,71 @@
+import math
+import operator
+
+from xvm.enums.op_code import OpCode
+
+# Binary opcodes pop arg1 (the top of the stack) first and arg2 second and
+# push ``arg1 <op> arg2``. Comparisons push 1 or 0.
+BINARY_OPERATORS = {
+    OpCode.ADD: operator.add,
+    OpCode.SUB: operator.sub,
+    OpCode.MUL: operator.mul,
+    OpCode.DIV: operator.truediv,
+    OpCode.MOD: operator.mod,
+    OpCode.EQ: lambda a, b: 1 if a == b else 0,
+    OpCode.NEQ: lambda a, b: 1 if a != b else 0,
+    OpCode.GT: lambda a, b: 1 if a > b else 0,
+    OpCode.LT: lambda a, b: 1 if a < b else 0,
+    OpCode.GE: lambda a, b: 1 if a >= b else 0,
+    OpCode.LE: lambda a, b: 1 if a <= b else 0,
+}
+
+UNARY_OPERATORS = {
+    OpCode.EXP: math.exp,
+    OpCode.SQRT: math.sqrt,
+    OpCode.NEG: operator.neg,
+}
+
+COMPARISON_OPCODES = (
+    OpCode.EQ,
+    OpCode.NEQ,
+    OpCode.GT,
+    OpCode.LT,
+    OpCode.GE,
+    OpCode.LE,
+)
+
+
+def check_string(value):
+    """Check an INPUT_STRING value."""
+    assert isinstance(value, str), f"INPUT_STRING expected a string, got {type(value)}"
+    return value
+
+
+def parse_number(value):
+    """Convert an INPUT_NUMBER value; strings are parsed as int or float."""
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            if "." not in value and "e" not in value.lower():
+                value = int(value)
+            else:
+                value = float(value)
+        except ValueError:
+            raise ValueError(f"INPUT_NUMBER: '{value}' is not a valid number")
+
+    assert isinstance(
+        value, (int, float)
+    ), f"INPUT_NUMBER expected a number, got {type(value)}"
+    return value
+
+
+def number_reader(input_fn):
+    """Return a function that reads one INPUT_NUMBER value via ``input_fn``.
+
+    Input sources that parse numbers themselves (see xvm/sources.py)
+    provide a ``read_number`` method, which is used as is.
+    """
+    read_number = getattr(input_fn, "read_number", None)
+    if read_number is not None:
+        return read_number
+    return lambda: parse_number(input_fn())
@@ -0,0 +1,146 @@
+import math
+
+from xvm.enums.op_code import OpCode
+from xvm.linker import find_labels
+from xvm.op import Op
+from xvm.operators import BINARY_OPERATORS, UNARY_OPERATORS
+
+
+def _foldable(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _folded(function, *args):
+    """Evaluate a constant operation, or return None if it must stay at runtime."""
+    try:
+        result = function(*args)
+    except (ArithmeticError, ValueError, TypeError):
+        # Errors such as division by zero have to surface when the code runs.
+        return None
+    if isinstance(result, float) and not math.isfinite(result):
+        return None
+    return result
+
+
+def fold_constants(ops: list[Op]) -> list[Op]:
+    """Evaluate arithmetic and comparisons on constant operands.
+
+    Works like a stack machine over the emitted code: whenever an operator
+    follows enough LOAD_CONSTs it is replaced with the result, so chains
+    such as ``LOAD_CONST 1; LOAD_CONST 2; ADD; LOAD_CONST 3; MUL`` collapse
+    completely. A constant condition turns CJMP into JMP or removes it.
+    """
+    folded = []
+
+    for op in ops:
+        opcode = op.opcode
+        last = folded[-1] if folded else None
+        last_const = (
+            last is not None and last.opcode == OpCode.LOAD_CONST and _foldable(last.args[0])
+        )
+
+        if opcode in BINARY_OPERATORS and len(folded) >= 2 and last_const:
+            before = folded[-2]
+            if before.opcode == OpCode.LOAD_CONST and _foldable(before.args[0]):
+                # arg1 is the top of the stack, i.e. the last constant pushed.
+                result = _folded(BINARY_OPERATORS[opcode], last.args[0], before.args[0])
+                if result is not None:
+                    folded[-2:] = [Op(OpCode.LOAD_CONST, result)]
+                    continue
+
+        if opcode in UNARY_OPERATORS and last_const:
+            result = _folded(UNARY_OPERATORS[opcode], last.args[0])
+            if result is not None:
+                folded[-1] = Op(OpCode.LOAD_CONST, result)
+                continue
+
+        if opcode == OpCode.CJMP and last_const:
+            folded.pop()
+            if last.args[0] == 1:
+                folded.append(Op(OpCode.JMP, *op.args))
+            continue
+
+        folded.append(op)
+
+    return folded
+
+
+def _reachable(ops, labels):
+    reachable = set()
+    work = [0]
+    while work:
+        pc = work.pop()
+        if pc >= len(ops) or pc in reachable:
+            continue
+        reachable.add(pc)
+
+        op = ops[pc]
+        if op.opcode == OpCode.RET:
+            continue
+        if op.opcode in (OpCode.JMP, OpCode.CJMP):
+            work.append(labels[op.args[0]])
+            if op.opcode == OpCode.JMP:
+                continue
+        work.append(pc + 1)
+    return reachable
+
+
+def eliminate_dead_code(ops: list[Op]) -> list[Op]:
+    """Drop unreachable code, unused labels and jumps to the next instruction."""
+    while True:
+        reachable = _reachable(ops, find_labels(ops))
+        live = [op for pc, op in enumerate(ops) if pc in reachable]
+
+        used = {
+            op.args[0] for op in live if op.opcode in (OpCode.JMP, OpCode.CJMP)
+        }
+        live = [op for op in live if op.opcode != OpCode.LABEL or op.args[0] in used]
+
+        result = []
+        for pc, op in enumerate(live):
+            following = live[pc + 1] if pc + 1 < len(live) else None
+            if (
+                op.opcode == OpCode.JMP
+                and following is not None
+                and following.opcode == OpCode.LABEL
+                and following.args[0] == op.args[0]
+            ):
+                continue
+            result.append(op)
+
+        if len(result) == len(ops):
+            return result
+        ops = result
+
+
+def optimize_function(ops: list[Op]) -> list[Op]:
+    while True:
+        optimized = eliminate_dead_code(fold_constants(ops))
+        if len(optimized) == len(ops):
+            return optimized
+        ops = optimized
+
+
+def optimize(functions: dict[str, list[Op]]):
+    """Fold constants and remove dead code in every function.
+
+    The input must pass xvm.verifier.verify. Returns the optimized program
+    and a report mapping each function name to its instruction counts
+    before and after.
+    """
+    optimized = {}
+    report = {}
+    for name, ops in functions.items():
+        optimized[name] = optimize_function(ops)
+        report[name] = (len(ops), len(optimized[name]))
+    return optimized, report
+
+
+def format_report(report) -> str:
+    lines = []
+    for name, (before, after) in report.items():
+        lines.append(f"{name}: {before} -> {after} instructions ({after - before:+d})")
+    total_before = sum(before for before, _ in report.values())
+    total_after = sum(after for _, after in report.values())
+    lines.append(f"total: {total_before} -> {total_after} instructions ({total_after - total_before:+d})")
+    return "\n".join(lines)
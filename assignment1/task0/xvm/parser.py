@@ -1,48 +1,28 @@
-from typing import List, Union
+from typing import List
 
-from .enums.op_code import OpCode
+from .assembler import AssemblyError, parse_argument, parse_instruction, parse_opcode
 from .op import Op
 
-
-def parse_argument(arg: str) -> Union[str, int, float]:
-    if arg.startswith('"') and arg.endswith('"'):
-        return arg[1:-1]
-    try:
-        if '.' in arg:
-            return float(arg)
-        else:
-            return int(arg)
-    except ValueError:
-        return arg
-
-
-def parse_opcode(opcode_str: str) -> OpCode:
-    try:
-        return OpCode(opcode_str)
-    except ValueError:
-        raise ValueError(f"Unknown opcode: '{opcode_str}'")
+__all__ = ["parse_argument", "parse_opcode", "parse_string"]
 
 
 def parse_string(text: str) -> List[Op]:
+    """Parse the instructions of a single function.
+
+    Arguments follow the assembler's quoting and number rules. Lines
+    starting with "#" or "//" are comments.
+    """
     operations = []
 
-    for line in text.splitlines():
+    for line_number, line in enumerate(text.splitlines(), 1):
         line = line.strip()
 
-        if not line or line.startswith("#"):
+        if not line or line.startswith(("#", "//")):
             continue
 
         try:
-            parts = line.split()
-            if not parts:
-                continue
-                
-            opcode = parse_opcode(parts[0])
-            args = tuple(parse_argument(arg) for arg in parts[1:])
-            
-            operations.append(Op(opcode, *args))
-            
-        except ValueError:
-            raise ValueError(f"Error parsing line: '{line}'")
-
-    return operations
\ No newline at end of file
+            operations.append(parse_instruction(line))
+        except ValueError as e:
+            raise AssemblyError(f"Error parsing line: '{line}' ({e})", line_number) from None
+
+    return operations
@@ -0,0 +1,144 @@
+from xvm.enums.op_code import OpCode
+from xvm.enums.super_op_code import SuperOpCode
+from xvm.linker import link
+from xvm.op import Op
+from xvm.operators import BINARY_OPERATORS, COMPARISON_OPCODES
+
+
+class SuperOp:
+    """Several consecutive instructions executed by a single handler.
+
+    ``ops`` holds the linked instructions the SuperOp stands for. A fused
+    program keeps those instructions in the slots after the SuperOp, so PCs,
+    jump targets and single-stepping behave exactly as in the plain program.
+    """
+
+    __slots__ = ("opcode", "args", "opcode_id", "ops")
+
+    def __init__(self, opcode: SuperOpCode, ops, *args):
+        self.opcode = opcode
+        self.args = args
+        self.opcode_id = opcode.id
+        self.ops = tuple(ops)
+
+    def __repr__(self):
+        return f"SuperOp(opcode={self.opcode!r}, ops={list(self.ops)!r})"
+
+    def __reduce__(self):
+        # The operator arguments are lambdas; re-fuse the original ops instead.
+        return (_refuse, (self.ops,))
+
+
+def _refuse(ops):
+    return _match(list(ops), 0)
+
+
+def _arg(op):
+    return op.args[0]
+
+
+def _match(program, pc):
+    first = program[pc]
+    second = program[pc + 1] if pc + 1 < len(program) else None
+    third = program[pc + 2] if pc + 2 < len(program) else None
+    if second is None:
+        return None
+
+    a, b = first.opcode, second.opcode
+    c = third.opcode if third is not None else None
+
+    if c in BINARY_OPERATORS:
+        operator = BINARY_OPERATORS[c]
+        if a == OpCode.LOAD_VAR and b == OpCode.LOAD_VAR:
+            return SuperOp(
+                SuperOpCode.LOAD_VAR_LOAD_VAR_BINARY,
+                (first, second, third),
+                _arg(first),
+                _arg(second),
+                operator,
+            )
+        if a == OpCode.LOAD_VAR and b == OpCode.LOAD_CONST:
+            return SuperOp(
+                SuperOpCode.LOAD_VAR_LOAD_CONST_BINARY,
+                (first, second, third),
+                _arg(first),
+                _arg(second),
+                operator,
+            )
+        if a == OpCode.LOAD_CONST and b == OpCode.LOAD_VAR:
+            return SuperOp(
+                SuperOpCode.LOAD_CONST_LOAD_VAR_BINARY,
+                (first, second, third),
+                _arg(first),
+                _arg(second),
+                operator,
+            )
+
+    if a == OpCode.LOAD_CONST and b in COMPARISON_OPCODES and c == OpCode.CJMP:
+        return SuperOp(
+            SuperOpCode.LOAD_CONST_COMPARE_CJMP,
+            (first, second, third),
+            _arg(first),
+            BINARY_OPERATORS[b],
+            _arg(third),
+        )
+
+    if a in COMPARISON_OPCODES and b == OpCode.CJMP:
+        return SuperOp(
+            SuperOpCode.COMPARE_CJMP, (first, second), BINARY_OPERATORS[a], _arg(second)
+        )
+    if a in BINARY_OPERATORS and b == OpCode.STORE_VAR:
+        return SuperOp(
+            SuperOpCode.BINARY_STORE_VAR, (first, second), BINARY_OPERATORS[a], _arg(second)
+        )
+    if a == OpCode.LOAD_CONST and b == OpCode.STORE_VAR:
+        return SuperOp(
+            SuperOpCode.LOAD_CONST_STORE_VAR, (first, second), _arg(first), _arg(second)
+        )
+    if a == OpCode.STORE_VAR and b == OpCode.LOAD_VAR and _arg(first) == _arg(second):
+        return SuperOp(SuperOpCode.STORE_VAR_LOAD_VAR, (first, second), _arg(first))
+    if a == OpCode.LOAD_VAR and b == OpCode.LOAD_VAR:
+        return SuperOp(
+            SuperOpCode.LOAD_VAR_LOAD_VAR, (first, second), _arg(first), _arg(second)
+        )
+    if a == OpCode.LOAD_VAR and b == OpCode.LOAD_CONST:
+        return SuperOp(
+            SuperOpCode.LOAD_VAR_LOAD_CONST, (first, second), _arg(first), _arg(second)
+        )
+    if a == OpCode.LOAD_CONST and b == OpCode.LOAD_VAR:
+        return SuperOp(
+            SuperOpCode.LOAD_CONST_LOAD_VAR, (first, second), _arg(first), _arg(second)
+        )
+
+    return None
+
+
+def fuse(program: list[Op]) -> list:
+    """Replace common instruction sequences in a linked program with SuperOps.
+
+    The result has the same length as ``program``: a SuperOp takes the
+    place of the first instruction of its sequence and the remaining ones
+    are left untouched behind it. Fused sequences never contain LABEL or
+    CALL, so no jump or return can land inside one.
+    """
+    fused = list(program)
+    pc = 0
+    while pc < len(program):
+        super_op = _match(program, pc)
+        if super_op is None:
+            pc += 1
+        else:
+            fused[pc] = super_op
+            pc += len(super_op.ops)
+    return fused
+
+
+def unfuse(program: list) -> list[Op]:
+    return [op.ops[0] if isinstance(op, SuperOp) else op for op in program]
+
+
+def fuse_functions(functions: dict[str, list[Op]]) -> dict[str, list]:
+    """Link and fuse every function of a program."""
+    return {
+        name: fuse(linked.program) for name, linked in link(functions).items()
+    }
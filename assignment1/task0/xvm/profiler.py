@@ -0,0 +1,98 @@
+"""Instruction counts and times collected by VM.run_profiled.
+
+Only ``(function, pc)`` counters are updated while the program runs; the
+per-opcode and per-function numbers are summed from them afterwards.
+Times are in nanoseconds and cover the instruction's own handler, so a
+function's time is its self time, not including its callees.
+
+``max_depth`` counts the frames the VM held. Tail calls reuse their
+caller's frame, so a chain of them adds one to the depth however long it
+is, though each is counted in ``calls``.
+"""
+
+
+class Profile:
+    def __init__(self):
+        # (function, pc) -> [count, nanoseconds]
+        self.instructions = {}
+        # (function, pc) -> opcode name of the instruction that ran there
+        self.opcodes = {}
+        self.calls = {}
+        self.max_depth = 0
+        self.elapsed = 0
+
+    def record(self, function, pc, opcode, elapsed):
+        key = (function, pc)
+        counters = self.instructions.get(key)
+        if counters is None:
+            self.instructions[key] = [1, elapsed]
+            self.opcodes[key] = opcode.name
+        else:
+            counters[0] += 1
+            counters[1] += elapsed
+
+    @property
+    def total_instructions(self):
+        return sum(count for count, _ in self.instructions.values())
+
+    @property
+    def by_opcode(self):
+        """``{opcode name: (count, nanoseconds)}``, most time first."""
+        return self._grouped(lambda key: self.opcodes[key])
+
+    @property
+    def by_function(self):
+        """``{function: (count, nanoseconds)}``, most time first."""
+        return self._grouped(lambda key: key[0])
+
+    def _grouped(self, group_of):
+        totals = {}
+        for key, (count, elapsed) in self.instructions.items():
+            group = group_of(key)
+            total = totals.get(group, (0, 0))
+            totals[group] = (total[0] + count, total[1] + elapsed)
+        return dict(sorted(totals.items(), key=lambda item: -item[1][1]))
+
+    def hottest(self, limit=10):
+        """The ``limit`` instructions with the most time, as ``(function, pc, opcode, count, ns)``."""
+        ranked = sorted(self.instructions.items(), key=lambda item: -item[1][1])
+        return [
+            (function, pc, self.opcodes[(function, pc)], count, elapsed)
+            for (function, pc), (count, elapsed) in ranked[:limit]
+        ]
+
+    def report(self, limit=10):
+        total = self.total_instructions
+        spent = sum(elapsed for _, elapsed in self.instructions.values()) or 1
+        lines = [
+            f"{total} instructions in {self.elapsed / 1e6:.3f} ms, "
+            f"{sum(self.calls.values())} calls, max call depth {self.max_depth}",
+            "",
+            f"{'opcode':32} {'count':>10} {'ms':>10} {'%':>6} {'ns/op':>8}",
+        ]
+        for name, (count, elapsed) in self.by_opcode.items():
+            lines.append(
+                f"{name:32} {count:10d} {elapsed / 1e6:10.3f} "
+                f"{100 * elapsed / spent:6.1f} {elapsed / count:8.0f}"
+            )
+
+        lines += ["", f"{'function':32} {'count':>10} {'self ms':>10} {'%':>6} {'calls':>8}"]
+        for name, (count, elapsed) in self.by_function.items():
+            lines.append(
+                f"{name:32} {count:10d} {elapsed / 1e6:10.3f} "
+                f"{100 * elapsed / spent:6.1f} {self.calls.get(name, 0):8d}"
+            )
+
+        lines += ["", f"{'instruction':32} {'count':>10} {'ms':>10} {'%':>6} {'opcode':>8}"]
+        for function, pc, opcode, count, elapsed in self.hottest(limit):
+            lines.append(
+                f"{f'{function}:{pc}':32} {count:10d} {elapsed / 1e6:10.3f} "
+                f"{100 * elapsed / spent:6.1f}  {opcode}"
+            )
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return (
+            f"Profile(instructions={self.total_instructions}, "
+            f"calls={sum(self.calls.values())}, max_depth={self.max_depth})"
+        )
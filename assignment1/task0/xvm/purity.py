@@ -0,0 +1,132 @@
+from xvm.enums.op_code import OpCode
+from xvm.linker import find_labels
+from xvm.op import Op
+from xvm.verifier import ENTRYPOINT_KEY, STACK_EFFECTS, _callee, _successors
+
+# Instructions whose result depends on more than their stack operands.
+IMPURE_OPCODES = (
+    OpCode.PRINT,
+    OpCode.INPUT_STRING,
+    OpCode.INPUT_NUMBER,
+    OpCode.BREAKPOINT,
+)
+
+
+def _calls_only_known_functions(ops, functions):
+    for pc, op in enumerate(ops):
+        if op.opcode in IMPURE_OPCODES:
+            return False
+        if op.opcode == OpCode.CALL and _callee(ops, pc) not in functions:
+            return False
+    return True
+
+
+def stack_signature(ops: list[Op], signatures, partial=False):
+    """Infer ``(pops, pushes)`` for a function.
+
+    ``pops`` is how many caller values the function consumes and
+    ``pushes`` how many it leaves when it returns. Every instruction must be
+    reached at a single stack depth and every return must leave the same
+    depth, otherwise the function has no fixed signature and None is
+    returned. Calls use ``signatures`` for the callee; with ``partial`` a
+    path through a callee without a signature is dropped instead of making
+    the whole function unknown, which lets recursion be seeded from its
+    base cases.
+    """
+    labels = find_labels(ops)
+    depths = {0: 0}
+    work = [0]
+    lowest = 0
+    returned = None
+
+    while work:
+        pc = work.pop()
+        depth = depths[pc]
+        if pc >= len(ops):
+            if returned is not None and returned != depth:
+                return None
+            returned = depth
+            continue
+
+        op = ops[pc]
+        pops, pushes = STACK_EFFECTS[op.opcode]
+        depth -= pops
+        lowest = min(lowest, depth)
+        if op.opcode == OpCode.CALL:
+            signature = signatures.get(_callee(ops, pc))
+            if signature is None:
+                if partial:
+                    continue
+                return None
+            depth -= signature[0]
+            lowest = min(lowest, depth)
+            depth += signature[1]
+        depth += pushes
+
+        if op.opcode == OpCode.RET:
+            if returned is not None and returned != depth:
+                return None
+            returned = depth
+            continue
+
+        for successor in _successors(ops, pc, labels):
+            if successor not in depths:
+                depths[successor] = depth
+                work.append(successor)
+            elif depths[successor] != depth:
+                return None
+
+    if returned is None:
+        return None
+    return -lowest, returned - lowest
+
+
+def analyze(functions: dict[str, list[Op]]) -> dict[str, tuple[int, int]]:
+    """Find the pure functions of a program and their stack signatures.
+
+    A function is pure when it never does I/O or stops at a breakpoint,
+    only calls other pure functions by constant name and has a fixed
+    ``(pops, pushes)`` signature. Its results then depend only on the
+    ``pops`` values it takes from the stack, since every call starts with
+    fresh variables. Returns ``{name: (pops, pushes)}``; the entrypoint is
+    never included.
+    """
+    candidates = {name for name in functions if name != ENTRYPOINT_KEY}
+    changed = True
+    while changed:
+        changed = False
+        for name in list(candidates):
+            if not _calls_only_known_functions(functions[name], candidates):
+                candidates.discard(name)
+                changed = True
+
+    # Infer signatures callee-first; when only recursive functions are left,
+    # seed one of them from the paths that avoid still-unknown callees...
+    signatures = {}
+    pending = sorted(candidates)
+    while pending:
+        for partial in (False, True):
+            inferred = {}
+            for name in pending:
+                signature = stack_signature(functions[name], signatures, partial)
+                if signature is not None:
+                    inferred[name] = signature
+                    if partial:
+                        break
+            if inferred:
+                break
+        if not inferred:
+            break
+        signatures.update(inferred)
+        pending = [name for name in pending if name not in inferred]
+
+    # ...then keep only those every path agrees with.
+    changed = True
+    while changed:
+        changed = False
+        for name, signature in list(signatures.items()):
+            if stack_signature(functions[name], signatures) != signature:
+                del signatures[name]
+                changed = True
+
+    return signatures
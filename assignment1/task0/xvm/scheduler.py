@@ -0,0 +1,133 @@
+"""Run many VMs in one thread by interleaving them in time slices.
+
+Each task owns a VM with a loaded program. The scheduler walks the ready
+tasks round-robin and lets each run ``slice_size`` instructions (see
+VM.run_for) before moving on, so a long program cannot hold up short
+ones. Scheduling is cooperative: a blocking ``input_fn`` or ``print_fn``
+blocks every task.
+"""
+import time
+from collections import deque
+
+from xvm.vm import VM
+
+READY = "ready"
+DONE = "done"
+FAILED = "failed"
+BUDGET_EXCEEDED = "budget_exceeded"
+
+
+class Task:
+    """A scheduled program and the VM running it.
+
+    ``budget`` caps the instructions the task may run (None for no cap).
+    Once the task stops, ``status`` is DONE, FAILED (``error`` holds the
+    exception) or BUDGET_EXCEEDED.
+    """
+
+    def __init__(self, task_id, vm, budget=None):
+        self.id = task_id
+        self.vm = vm
+        self.budget = budget
+        self.status = READY
+        self.error = None
+        self.executed = 0
+        self.slices = 0
+
+    @property
+    def result(self):
+        return self.vm.stack, self.vm.variables
+
+    def __repr__(self):
+        return f"Task(id={self.id!r}, status={self.status!r}, executed={self.executed})"
+
+
+class SchedulerStats:
+    def __init__(self):
+        self.instructions = 0
+        self.slices = 0
+        self.done = 0
+        self.failed = 0
+        self.budget_exceeded = 0
+        self.elapsed = 0.0
+
+    @property
+    def instructions_per_second(self):
+        return self.instructions / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (
+            f"SchedulerStats(instructions={self.instructions}, slices={self.slices}, "
+            f"done={self.done}, failed={self.failed}, "
+            f"budget_exceeded={self.budget_exceeded}, elapsed={self.elapsed:.3f}s)"
+        )
+
+
+class Scheduler:
+    def __init__(self, slice_size=1000):
+        if slice_size < 1:
+            raise ValueError("slice_size must be at least 1")
+        self.slice_size = slice_size
+        self.tasks = []
+        self.stats = SchedulerStats()
+        self._ready = deque()
+
+    def add(self, code, input_fn=input, print_fn=print, budget=None, task_id=None, **vm_options):
+        """Load ``code`` on a new VM and queue it; returns the Task."""
+        vm = VM(input_fn=input_fn, print_fn=print_fn, **vm_options)
+        vm.load_code(code)
+        return self.add_vm(vm, budget, task_id)
+
+    def add_vm(self, vm, budget=None, task_id=None):
+        """Queue a VM that already has a program loaded."""
+        task = Task(len(self.tasks) if task_id is None else task_id, vm, budget)
+        self.tasks.append(task)
+        self._ready.append(task)
+        return task
+
+    def step(self):
+        """Give every ready task one slice; returns False when none are left."""
+        start = time.perf_counter()
+        for _ in range(len(self._ready)):
+            task = self._ready.popleft()
+            if self._run_slice(task):
+                self._ready.append(task)
+        self.stats.elapsed += time.perf_counter() - start
+        return bool(self._ready)
+
+    def run(self):
+        """Run until every task has stopped; returns the tasks in the order added."""
+        while self.step():
+            pass
+        return self.tasks
+
+    def _run_slice(self, task):
+        vm = task.vm
+        instructions = self.slice_size
+        if task.budget is not None:
+            instructions = min(instructions, task.budget - task.executed)
+
+        try:
+            executed = vm.run_for(instructions)
+        except Exception as error:
+            task.error = error
+            return self._stop(task, FAILED)
+        finally:
+            task.slices += 1
+            self.stats.slices += 1
+
+        task.executed += executed
+        self.stats.instructions += executed
+        # Breakpoints only matter to the debugger.
+        vm.clear_breakpoint()
+
+        if vm.finished:
+            return self._stop(task, DONE)
+        if task.budget is not None and task.executed >= task.budget:
+            return self._stop(task, BUDGET_EXCEEDED)
+        return True
+
+    def _stop(self, task, status):
+        task.status = status
+        setattr(self.stats, status, getattr(self.stats, status) + 1)
+        return False
@@ -0,0 +1,107 @@
+"""Output sinks for PRINT.
+
+A sink is used as a VM's ``print_fn``. Instead of one ``print`` call per
+value it collects the formatted lines and writes them in one go once
+``buffer_size`` characters are pending, on ``flush()`` and when the sink
+is closed. Reading input should flush first so prompts appear before the
+program waits: wrap ``input_fn`` with ``sink.flushing(input_fn)``.
+"""
+import json
+import sys
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+_encode_json = json.JSONEncoder().encode
+
+
+def _json_value(value):
+    # Integers are by far the most common output; skip the encoder for them.
+    if type(value) is int:
+        return str(value)
+    return _encode_json(value)
+
+
+class OutputSink:
+    """Writes each value on its own line, formatted like ``print`` does.
+
+    ``buffer_size=0`` writes every value as soon as it is printed. With
+    ``close_file`` the file is closed along with the sink.
+    """
+
+    def __init__(self, file=None, buffer_size=DEFAULT_BUFFER_SIZE, close_file=False):
+        if buffer_size < 0:
+            raise ValueError("buffer_size must not be negative")
+        self.file = sys.stdout if file is None else file
+        self.buffer_size = buffer_size
+        self.close_file = close_file
+        self._pending = []
+        self._pending_size = 0
+
+    format = staticmethod(str)
+
+    def __call__(self, value):
+        line = self.format(value)
+        self._pending.append(line)
+        self._pending_size += len(line) + 1
+        if self._pending_size >= self.buffer_size:
+            self._write()
+
+    def _write(self):
+        if self._pending:
+            self._pending.append("")
+            self.file.write("\n".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+
+    def flush(self):
+        self._write()
+        self.file.flush()
+
+    def flushing(self, input_fn):
+        """Wrap ``input_fn`` so pending output is written before each read."""
+
+        def flushed_input():
+            self.flush()
+            return input_fn()
+
+        read_number = getattr(input_fn, "read_number", None)
+        if read_number is not None:
+
+            def flushed_read_number():
+                self.flush()
+                return read_number()
+
+            flushed_input.read_number = flushed_read_number
+        return flushed_input
+
+    def close(self):
+        self.flush()
+        if self.close_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonLinesSink(OutputSink):
+    """Writes each value as one JSON document per line.
+
+    Unlike the text format this keeps types apart: ``"1"`` and ``1`` print
+    differently.
+    """
+
+    format = staticmethod(_json_value)
+
+
+SINKS = {"text": OutputSink, "jsonl": JsonLinesSink}
+
+
+def open_sink(path=None, output_format="text", buffer_size=DEFAULT_BUFFER_SIZE):
+    """Create a sink writing to ``path``, or to stdout if it is None."""
+    sink_class = SINKS[output_format]
+    if path is None:
+        return sink_class(buffer_size=buffer_size)
+    return sink_class(open(path, "w"), buffer_size, close_file=True)
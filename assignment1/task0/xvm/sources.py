@@ -0,0 +1,117 @@
+"""Input sources for INPUT_STRING and INPUT_NUMBER.
+
+An InputSource is used as a VM's ``input_fn``. It reads its file in large
+chunks and splits them into tokens lazily, one chunk at a time. Each
+chunk's tokens are also parsed as integers in one go, so INPUT_NUMBER
+gets ready-made numbers through ``read_number`` instead of reparsing a
+string per value (see operators.number_reader).
+"""
+import mmap
+import sys
+
+from xvm.operators import parse_number
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# How the input is split into the values INPUT_* read: "lines" matches the
+# builtin input(), "whitespace" also splits lines into words.
+SPLIT_MODES = ("lines", "whitespace")
+
+
+class InputSource:
+    """Reads values from a binary file (or stdin) chunk by chunk.
+
+    Raises EOFError, like ``input()``, once the input is used up. With
+    ``use_mmap`` a regular file is memory-mapped instead of read.
+    """
+
+    def __init__(self, file=None, split="lines", chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
+        if split not in SPLIT_MODES:
+            raise ValueError(f"split must be one of {', '.join(SPLIT_MODES)}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.file = sys.stdin.buffer if file is None else file
+        self.split = split
+        self.chunk_size = chunk_size
+        self._map = None
+        if use_mmap:
+            try:
+                self._map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped; there is nothing to read anyway.
+                pass
+        reader = self._map if self._map is not None else self.file
+        # read1 returns what a pipe has instead of waiting for a full chunk.
+        self._read = getattr(reader, "read1", reader.read)
+        self._tokens = []
+        self._numbers = None
+        self._index = 0
+        self._carry = b""
+        self._eof = False
+
+    def _fill(self):
+        lines = self.split == "lines"
+        while self._index >= len(self._tokens):
+            if self._eof:
+                raise EOFError("EOF when reading a line")
+            chunk = self._read(self.chunk_size)
+            if chunk:
+                data = self._carry + chunk
+                # The last token may continue in the next chunk.
+                if lines:
+                    tokens = data.split(b"\n")
+                    self._carry = tokens.pop()
+                else:
+                    tokens = data.split()
+                    self._carry = b"" if data[-1:].isspace() or not tokens else tokens.pop()
+            else:
+                self._eof = True
+                tokens = [self._carry] if self._carry else []
+                self._carry = b""
+            if lines:
+                tokens = [token[:-1] if token.endswith(b"\r") else token for token in tokens]
+
+            self._tokens = tokens
+            self._index = 0
+            try:
+                self._numbers = list(map(int, tokens))
+            except ValueError:
+                self._numbers = None
+
+    def __call__(self):
+        self._fill()
+        token = self._tokens[self._index]
+        self._index += 1
+        return token.decode()
+
+    def read_number(self):
+        self._fill()
+        index = self._index
+        self._index += 1
+        if self._numbers is not None:
+            return self._numbers[index]
+        token = self._tokens[index]
+        try:
+            return int(token)
+        except ValueError:
+            return parse_number(token.decode())
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self.file is not sys.stdin.buffer:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_source(path=None, split="lines", chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
+    """Create a source reading ``path``, or stdin if it is None or ``-``."""
+    if path is None or path == "-":
+        return InputSource(split=split, chunk_size=chunk_size)
+    return InputSource(open(path, "rb"), split, chunk_size, use_mmap)
@@ -2,16 +2,151 @@ import argparse
 import json
 import os
 import sys
+from xvm.assembler import AssembledCode, AssemblyError
+from xvm.batch import run_batch
+from xvm.bytecode import BytecodeError
+from xvm.cache import CodeCache
+from xvm.sinks import DEFAULT_BUFFER_SIZE, SINKS, open_sink
+from xvm.sources import SPLIT_MODES, open_source
+from xvm.verifier import VerifyError
 from xvm.vm import VM
 
+
+def read_input_vectors(batch_path):
+    with open(batch_path) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def run_batch_file(code_path, batch_path, args):
+    """Run the program once per line of a JSON-lines file of input vectors.
+
+    Writes one JSON object per input vector to stdout; exits with status 1
+    if any of them failed.
+    """
+    code = VM().parse_code_from_file(code_path)
+    results = run_batch(
+        code,
+        read_input_vectors(batch_path),
+        workers=args.workers,
+        ordered=not args.unordered,
+        checked=args.checked,
+        optimize=args.optimize,
+        jit=args.jit,
+    )
+    failed = False
+    for result in results:
+        failed = failed or not result.ok
+        print(json.dumps(result.to_dict()))
+    if failed:
+        sys.exit(1)
+
+
+def source_location(code_path, functions, function_name, pc):
+    """Where an instruction of a program assembled from a .txt source came from."""
+    if not isinstance(functions, AssembledCode):
+        return ""
+    line = functions.line(function_name, pc)
+    return f" ({code_path}:{line})" if line is not None else ""
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Execute XVM bytecode from a JSON file.")
+    parser = argparse.ArgumentParser(description="Execute XVM bytecode from a JSON, binary .xvmc or .txt source file.")
     parser.add_argument(
         "code_file_path",
         type=str,
-        help="Path to the JSON file containing the XVM bytecode."
+        help="Path to the JSON, .xvmc or .txt file containing the XVM program. "
+        ".txt sources are assembled directly, without building JSON first."
+    )
+    parser.add_argument(
+        "--checked",
+        action="store_true",
+        help="Validate every instruction while it runs (slower, for debugging)."
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Fuse common instruction sequences into superinstructions."
+    )
+    parser.add_argument(
+        "--jit",
+        action="store_true",
+        help="Compile the program to Python functions before running it."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="INPUTS_JSONL",
+        help="Run the program once per line of this file (a JSON array of inputs) "
+        "and print one JSON result per line."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for --batch (default: CPU count, 0: run in this process)."
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="With --batch, print results as they complete instead of in input order."
+    )
+
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="Write PRINT output to this file instead of stdout."
     )
-    
+    parser.add_argument(
+        "--output-format",
+        choices=sorted(SINKS),
+        default="text",
+        help="text: one value per line, like print; jsonl: one JSON value per line."
+    )
+    parser.add_argument(
+        "--buffer-size",
+        type=int,
+        default=DEFAULT_BUFFER_SIZE,
+        help="Characters of output to collect before writing (0: write every value). "
+        "Output is also written before each INPUT and when the program stops."
+    )
+    parser.add_argument(
+        "--input",
+        metavar="FILE",
+        help="Read INPUT_* values from this file ('-' for stdin) in large chunks "
+        "instead of one input() call per value."
+    )
+    parser.add_argument(
+        "--input-split",
+        choices=SPLIT_MODES,
+        default="lines",
+        help="With --input, read one value per line (like input()) or per "
+        "whitespace-separated word."
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="With --input FILE, memory-map the file instead of reading it."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Count and time every instruction and print a report to stderr "
+        "(runs the interpreter, not the JIT)."
+    )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Decode, verify and link each function on its first CALL instead of "
+        "the whole program up front (does not use the cache)."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the compiled-code cache "
+        "($XVM_CACHE_DIR, default ~/.cache/xvm)."
+    )
+
     args = parser.parse_args()
     code_path = args.code_file_path
 
@@ -19,20 +154,69 @@ def main():
         print(f"Error: File not found at '{code_path}'", file=sys.stderr)
         sys.exit(1)
 
-    vm = VM(input_fn=input, print_fn=print)
-    
+    if args.batch:
+        try:
+            run_batch_file(code_path, args.batch, args)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"\nError: {e}", file=sys.stderr)
+            sys.exit(1)
+        except (BytecodeError, AssemblyError) as e:
+            print(f"\nError: {e}", file=sys.stderr)
+            sys.exit(1)
+        except VerifyError as e:
+            print(f"\nVM Verification Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    source = None
+    try:
+        if args.input:
+            source = open_source(args.input, args.input_split, use_mmap=args.mmap)
+        sink = open_sink(args.output, args.output_format, args.buffer_size)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    vm = VM(
+        # Prompts must be visible before an interactive read.
+        input_fn=source if source is not None else sink.flushing(input),
+        print_fn=sink,
+        checked=args.checked,
+        optimize=args.optimize,
+        jit=args.jit,
+        cache=None if args.no_cache else CodeCache(),
+    )
+
     try:
-        vm.run_code_from_json(code_path)
+        with sink:
+            if args.profile:
+                vm.load_code_from_file(code_path, lazy=args.lazy)
+                profile = vm.run_profiled(vm.code, load_code=False)
+            else:
+                vm.run_code_from_file(code_path, lazy=args.lazy)
+        if args.profile:
+            print(profile.report(), file=sys.stderr)
     except json.JSONDecodeError:
         print(f"\nError: Failed to parse JSON file at '{code_path}'. Ensure it is correctly formatted.", file=sys.stderr)
         sys.exit(1)
+    except (BytecodeError, AssemblyError) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        sys.exit(1)
+    except VerifyError as e:
+        location = source_location(code_path, vm.functions, e.function_name, e.pc)
+        print(f"\nVM Verification Error: {e}{location}", file=sys.stderr)
+        sys.exit(1)
     except NameError as e:
         print(f"\nVM Runtime Error (Name): {e}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
         print(f"\nVM Runtime Error: {e}", file=sys.stderr)
-        print(f"PC: {vm.pc}, Function: {vm.current_function}", file=sys.stderr)
+        location = source_location(code_path, vm.functions, vm.current_function, vm.pc)
+        print(f"PC: {vm.pc}, Function: {vm.current_function}{location}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if source is not None:
+            source.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
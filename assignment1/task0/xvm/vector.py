@@ -0,0 +1,455 @@
+"""Run one program over many input vectors at once with NumPy.
+
+Every lane is one run of the entrypoint on its own input vector. Lanes at
+the same instruction move together as a group, whose stack and variables
+are NumPy arrays with one row per lane, so ``ADD`` adds whole arrays. A
+CJMP the lanes disagree on splits the group by a mask; groups meet again
+when they reach the same instruction with the same stack depth. The group
+with the lowest pc always runs next, so lanes that leave a loop early wait
+for the others after it.
+
+Values are kept as float64 plus a kind per lane (int, float or a string
+constant). Any lane that would leave what that represents exactly (an
+integer reaching 2**53), or that would raise (division by zero, a missing
+variable, running out of input, ...), is set aside and rerun on the scalar
+VM, so results always equal VM.run_code's.
+"""
+import heapq
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from xvm.batch import BatchResult, run_one
+from xvm.enums.op_code import OpCode
+from xvm.linker import find_labels
+from xvm.operators import parse_number
+from xvm.verifier import ENTRYPOINT_KEY
+from xvm.vm import VM
+
+# float64 holds every integer of smaller magnitude exactly.
+EXACT_INT_LIMIT = 2**53
+
+INT, FLOAT, STRING = 0, 1, 2
+
+UNSUPPORTED_OPCODES = {
+    OpCode.CALL: "lanes run the entrypoint only, calls are not supported",
+    OpCode.INPUT_STRING: "lanes only take numbers as input",
+    OpCode.BREAKPOINT: "lanes cannot stop at a breakpoint",
+}
+
+_ARITHMETIC = (OpCode.ADD, OpCode.SUB, OpCode.MUL, OpCode.DIV, OpCode.MOD)
+_ORDERING = (OpCode.GT, OpCode.LT, OpCode.GE, OpCode.LE)
+
+
+class VectorError(Exception):
+    """The program cannot run on vector lanes."""
+
+
+class _Group:
+    """Lanes at the same pc with the same stack depth.
+
+    ``lanes`` are lane indices, ``stack`` a list of ``(values, kinds)``
+    columns and ``variables`` maps names to ``(values, kinds, is_set)``,
+    where ``is_set`` is None when the variable is set in every lane.
+    """
+
+    __slots__ = ("pc", "lanes", "stack", "variables", "inputs_read")
+
+    def __init__(self, pc, lanes, stack, variables, inputs_read):
+        self.pc = pc
+        self.lanes = lanes
+        self.stack = stack
+        self.variables = variables
+        self.inputs_read = inputs_read
+
+    def take(self, keep):
+        """The lanes selected by the boolean mask ``keep``, as a new group."""
+        return _Group(
+            self.pc,
+            self.lanes[keep],
+            [(values[keep], kinds[keep]) for values, kinds in self.stack],
+            {
+                name: (values[keep], kinds[keep], None if is_set is None else is_set[keep])
+                for name, (values, kinds, is_set) in self.variables.items()
+            },
+            self.inputs_read[keep],
+        )
+
+
+def _merge(groups):
+    if len(groups) == 1:
+        return groups[0]
+
+    def concatenate(arrays):
+        return np.concatenate(arrays)
+
+    stack = [
+        (concatenate([group.stack[level][0] for group in groups]),
+         concatenate([group.stack[level][1] for group in groups]))
+        for level in range(len(groups[0].stack))
+    ]
+    names = dict.fromkeys(name for group in groups for name in group.variables)
+    variables = {}
+    for name in names:
+        values, kinds, is_set = [], [], []
+        for group in groups:
+            size = len(group.lanes)
+            if name in group.variables:
+                value, kind, set_mask = group.variables[name]
+                values.append(value)
+                kinds.append(kind)
+                is_set.append(np.ones(size, dtype=bool) if set_mask is None else set_mask)
+            else:
+                values.append(np.zeros(size))
+                kinds.append(np.zeros(size, dtype=np.int8))
+                is_set.append(np.zeros(size, dtype=bool))
+        is_set = concatenate(is_set)
+        variables[name] = (concatenate(values), concatenate(kinds), None if is_set.all() else is_set)
+
+    return _Group(
+        groups[0].pc,
+        concatenate([group.lanes for group in groups]),
+        stack,
+        variables,
+        concatenate([group.inputs_read for group in groups]),
+    )
+
+
+class VectorProgram:
+    """A program checked for vector execution; see ``vectorize``."""
+
+    def __init__(self, code):
+        if np is None:
+            raise ImportError("The vector engine needs NumPy: pip install 'xvm[vector]'")
+
+        # Loading reports the same errors as the scalar VM would.
+        self._vm = VM()
+        self._vm.load_code(code)
+        self.code = code
+        self.ops = self._vm.functions[ENTRYPOINT_KEY]
+        self.labels = find_labels(self.ops)
+
+        strings = set()
+        for pc, op in enumerate(self.ops):
+            reason = UNSUPPORTED_OPCODES.get(op.opcode)
+            if op.opcode == OpCode.LOAD_CONST:
+                value = op.args[0]
+                if type(value) is str:
+                    strings.add(value)
+                elif type(value) not in (int, float):
+                    reason = f"constants must be numbers or strings, got {type(value).__name__}"
+                elif type(value) is int and abs(value) >= EXACT_INT_LIMIT:
+                    reason = f"integer constant {value} is too large for exact float64 lanes"
+            if reason is not None:
+                raise VectorError(f"Function '{ENTRYPOINT_KEY}', PC {pc}: {op.opcode.name}: {reason}")
+
+        # Strings are numbered in sorted order so their ids compare like them.
+        self.strings = sorted(strings)
+        self._string_ids = {string: index for index, string in enumerate(self.strings)}
+        self.deferred = []
+
+    def run(self, inputs):
+        """Run every input vector; returns a BatchResult per vector, in order.
+
+        ``inputs`` is a list of input vectors (values INPUT_NUMBER reads in
+        order) or a 2-D NumPy array with one row per lane. Afterwards
+        ``deferred`` lists the lanes that were rerun on the scalar VM.
+        """
+        vectors = inputs if isinstance(inputs, np.ndarray) else list(inputs)
+        input_values, input_kinds, input_counts, valid = self._load_inputs(vectors)
+        size = len(input_counts)
+
+        self._input_values = input_values
+        self._input_kinds = input_kinds
+        self._input_counts = input_counts
+        self._deferred = [np.flatnonzero(~valid)]
+        self._printed = []
+        finished = []
+
+        lanes = np.flatnonzero(valid)
+        pending = {}
+        order = []
+        if len(lanes):
+            start = _Group(0, lanes, [], {}, np.zeros(len(lanes), dtype=np.int64))
+            pending[(0, 0)] = [start]
+            order.append((0, 0))
+
+        while order:
+            key = heapq.heappop(order)
+            group = _merge(pending.pop(key))
+            while True:
+                if group.pc >= len(self.ops):
+                    finished.append(group)
+                    break
+                groups = self._step(group)
+                if len(groups) == 1 and (not order or (groups[0].pc, len(groups[0].stack)) < order[0]):
+                    group = groups[0]
+                    continue
+                for group in groups:
+                    key = (group.pc, len(group.stack))
+                    if key not in pending:
+                        pending[key] = []
+                        heapq.heappush(order, key)
+                    pending[key].append(group)
+                break
+
+        deferred = np.concatenate(self._deferred)
+        self.deferred = sorted(deferred.tolist())
+        return self._results(vectors, size, finished)
+
+    def _load_inputs(self, vectors):
+        if isinstance(vectors, np.ndarray):
+            if vectors.ndim != 2:
+                raise ValueError("inputs must be a 2-D array with one row per lane")
+            values = vectors.astype(np.float64)
+            if np.issubdtype(vectors.dtype, np.integer):
+                kinds = np.full(vectors.shape, INT, dtype=np.int8)
+                valid = (np.abs(values) < EXACT_INT_LIMIT).all(axis=1)
+            elif np.issubdtype(vectors.dtype, np.floating):
+                kinds = np.full(vectors.shape, FLOAT, dtype=np.int8)
+                valid = np.ones(len(vectors), dtype=bool)
+            else:
+                raise ValueError(f"inputs must be a numeric array, got {vectors.dtype}")
+            counts = np.full(len(vectors), vectors.shape[1], dtype=np.int64)
+            return values, kinds, counts, valid
+
+        width = max((len(vector) for vector in vectors), default=0)
+        values = np.zeros((len(vectors), max(width, 1)))
+        kinds = np.zeros((len(vectors), max(width, 1)), dtype=np.int8)
+        counts = np.zeros(len(vectors), dtype=np.int64)
+        valid = np.ones(len(vectors), dtype=bool)
+        for lane, vector in enumerate(vectors):
+            counts[lane] = len(vector)
+            for index, value in enumerate(vector):
+                try:
+                    value = parse_number(value)
+                except (ValueError, AssertionError):
+                    valid[lane] = False
+                    break
+                if type(value) is int and abs(value) < EXACT_INT_LIMIT:
+                    kinds[lane, index] = INT
+                elif type(value) is float:
+                    kinds[lane, index] = FLOAT
+                else:
+                    valid[lane] = False
+                    break
+                values[lane, index] = value
+        return values, kinds, counts, valid
+
+    def _defer(self, group, bad):
+        """Set aside the lanes in mask ``bad``; returns the rest (or None)."""
+        if not bad.any():
+            return group
+        self._deferred.append(group.lanes[bad])
+        if bad.all():
+            return None
+        return group.take(~bad)
+
+    def _step(self, group):
+        op = self.ops[group.pc]
+        opcode = op.opcode
+        stack = group.stack
+
+        if opcode == OpCode.LOAD_CONST:
+            value = op.args[0]
+            size = len(group.lanes)
+            if type(value) is str:
+                stack.append((np.full(size, float(self._string_ids[value])), np.full(size, STRING, dtype=np.int8)))
+            else:
+                kind = INT if type(value) is int else FLOAT
+                stack.append((np.full(size, float(value)), np.full(size, kind, dtype=np.int8)))
+        elif opcode == OpCode.STORE_VAR:
+            if not stack:
+                return self._underflow(group)
+            values, kinds = stack.pop()
+            group.variables[op.args[0]] = (values, kinds, None)
+        elif opcode == OpCode.LOAD_VAR:
+            variable = group.variables.get(op.args[0])
+            if variable is None:
+                self._defer(group, np.ones(len(group.lanes), dtype=bool))
+                return []
+            if variable[2] is not None:
+                group = self._defer(group, ~variable[2])
+                if group is None:
+                    return []
+                variable = group.variables[op.args[0]]
+            group.stack.append((variable[0], variable[1]))
+        elif opcode == OpCode.INPUT_NUMBER:
+            group = self._defer(group, group.inputs_read >= self._input_counts[group.lanes])
+            if group is None:
+                return []
+            group.stack.append((
+                self._input_values[group.lanes, group.inputs_read],
+                self._input_kinds[group.lanes, group.inputs_read],
+            ))
+            group.inputs_read = group.inputs_read + 1
+        elif opcode == OpCode.PRINT:
+            if not stack:
+                return self._underflow(group)
+            values, kinds = stack.pop()
+            self._printed.append((group.lanes, values, kinds))
+        elif opcode in _ARITHMETIC or opcode in _ORDERING or opcode in (OpCode.EQ, OpCode.NEQ):
+            if len(stack) < 2:
+                return self._underflow(group)
+            group = self._binary(group, opcode)
+            if group is None:
+                return []
+        elif opcode in (OpCode.EXP, OpCode.SQRT, OpCode.NEG):
+            if not stack:
+                return self._underflow(group)
+            group = self._unary(group, opcode)
+            if group is None:
+                return []
+        elif opcode == OpCode.JMP:
+            group.pc = self.labels[op.args[0]]
+        elif opcode == OpCode.CJMP:
+            if not stack:
+                return self._underflow(group)
+            values, kinds = stack.pop()
+            jump = (values == 1) & (kinds != STRING)
+            if jump.all():
+                group.pc = self.labels[op.args[0]]
+            elif jump.any():
+                taken = group.take(jump)
+                taken.pc = self.labels[op.args[0]] + 1
+                rest = group.take(~jump)
+                rest.pc += 1
+                return [taken, rest]
+        elif opcode == OpCode.RET:
+            group.pc = len(self.ops)
+            return [group]
+
+        group.pc += 1
+        return [group]
+
+    def _underflow(self, group):
+        self._defer(group, np.ones(len(group.lanes), dtype=bool))
+        return []
+
+    def _binary(self, group, opcode):
+        # arg1 is the top of the stack; the result is ``arg1 <op> arg2``.
+        values1, kinds1 = group.stack.pop()
+        values2, kinds2 = group.stack.pop()
+        strings1 = kinds1 == STRING
+        strings2 = kinds2 == STRING
+
+        if opcode in (OpCode.EQ, OpCode.NEQ):
+            result = (values1 == values2) & (strings1 == strings2)
+            if opcode == OpCode.NEQ:
+                result = ~result
+            group.stack.append((result.astype(np.float64), np.zeros(len(result), dtype=np.int8)))
+            return group
+
+        if opcode in _ORDERING:
+            # Strings only order against strings.
+            bad = strings1 != strings2
+        else:
+            bad = strings1 | strings2
+            if opcode in (OpCode.DIV, OpCode.MOD):
+                bad |= values2 == 0
+
+        with np.errstate(all="ignore"):
+            if opcode == OpCode.ADD:
+                result = values1 + values2
+            elif opcode == OpCode.SUB:
+                result = values1 - values2
+            elif opcode == OpCode.MUL:
+                result = values1 * values2
+            elif opcode == OpCode.DIV:
+                result = values1 / values2
+            elif opcode == OpCode.MOD:
+                result = np.mod(values1, values2)
+            elif opcode == OpCode.GT:
+                result = (values1 > values2).astype(np.float64)
+            elif opcode == OpCode.LT:
+                result = (values1 < values2).astype(np.float64)
+            elif opcode == OpCode.GE:
+                result = (values1 >= values2).astype(np.float64)
+            else:
+                result = (values1 <= values2).astype(np.float64)
+
+        if opcode in _ORDERING:
+            kinds = np.zeros(len(result), dtype=np.int8)
+        elif opcode == OpCode.DIV:
+            kinds = np.full(len(result), FLOAT, dtype=np.int8)
+        else:
+            kinds = np.maximum(kinds1, kinds2)
+            ints = kinds == INT
+            bad |= ints & (np.abs(result) >= EXACT_INT_LIMIT)
+            # Python ints have no negative zero (``1 % -1``, ``0 * -1``).
+            result[ints] += 0.0
+
+        group.stack.append((result, kinds))
+        return self._defer(group, bad)
+
+    def _unary(self, group, opcode):
+        values, kinds = group.stack.pop()
+        bad = kinds == STRING
+
+        if opcode == OpCode.NEG:
+            result = -values
+            result[kinds == INT] += 0.0
+            group.stack.append((result, kinds))
+            return self._defer(group, bad)
+
+        result = np.empty(len(values))
+        if opcode == OpCode.SQRT:
+            with np.errstate(invalid="ignore"):
+                result = np.sqrt(values)
+            bad |= values < 0
+        else:
+            # math.exp rather than np.exp: the latter may differ in the
+            # last bit, and math.exp raises on overflow.
+            for index, value in enumerate(values.tolist()):
+                try:
+                    result[index] = math.exp(value)
+                except OverflowError:
+                    bad[index] = True
+        group.stack.append((result, np.full(len(result), FLOAT, dtype=np.int8)))
+        return self._defer(group, bad)
+
+    def _value(self, value, kind):
+        if kind == INT:
+            return int(value)
+        if kind == FLOAT:
+            return value
+        return self.strings[int(value)]
+
+    def _results(self, vectors, size, finished):
+        outputs = [[] for _ in range(size)]
+        for lanes, values, kinds in self._printed:
+            for lane, value, kind in zip(lanes.tolist(), values.tolist(), kinds.tolist()):
+                outputs[lane].append(self._value(value, kind))
+
+        results = [None] * size
+        for group in finished:
+            lanes = group.lanes.tolist()
+            stacks = [[] for _ in lanes]
+            for values, kinds in group.stack:
+                for stack, value, kind in zip(stacks, values.tolist(), kinds.tolist()):
+                    stack.append(self._value(value, kind))
+            variables = [{} for _ in lanes]
+            for name, (values, kinds, is_set) in group.variables.items():
+                is_set = [True] * len(lanes) if is_set is None else is_set.tolist()
+                for lane_variables, value, kind, set_ in zip(variables, values.tolist(), kinds.tolist(), is_set):
+                    if set_:
+                        lane_variables[name] = self._value(value, kind)
+            for lane, stack, lane_variables in zip(lanes, stacks, variables):
+                results[lane] = BatchResult(lane, self._inputs_of(vectors, lane), outputs[lane], stack, lane_variables)
+
+        for lane in self.deferred:
+            results[lane] = run_one(self._vm, lane, self._inputs_of(vectors, lane))
+        return results
+
+    @staticmethod
+    def _inputs_of(vectors, lane):
+        vector = vectors[lane]
+        return vector.tolist() if isinstance(vector, np.ndarray) else vector
+
+
+def vectorize(code):
+    """Check ``code`` for vector execution; raises VectorError if it cannot run on lanes."""
+    return VectorProgram(code)
@@ -0,0 +1,220 @@
+import math
+
+from xvm.enums.op_code import OpCode
+from xvm.op import Op
+
+ENTRYPOINT_KEY = "$entrypoint$"
+
+CONST_TYPES = (int, float, str)
+
+# opcode -> (number of arguments, allowed argument types)
+SIGNATURES = {
+    OpCode.LOAD_CONST: (1, CONST_TYPES),
+    OpCode.LOAD_VAR: (1, str),
+    OpCode.STORE_VAR: (1, str),
+    OpCode.LABEL: (1, CONST_TYPES),
+    OpCode.JMP: (1, CONST_TYPES),
+    OpCode.CJMP: (1, CONST_TYPES),
+}
+
+# opcode -> (values popped, values pushed); CALL additionally pops the
+# callee's arguments and pushes its results, which are not tracked here.
+STACK_EFFECTS = {
+    OpCode.LOAD_CONST: (0, 1),
+    OpCode.LOAD_VAR: (0, 1),
+    OpCode.STORE_VAR: (1, 0),
+    OpCode.INPUT_STRING: (0, 1),
+    OpCode.INPUT_NUMBER: (0, 1),
+    OpCode.PRINT: (1, 0),
+    OpCode.ADD: (2, 1),
+    OpCode.SUB: (2, 1),
+    OpCode.MUL: (2, 1),
+    OpCode.DIV: (2, 1),
+    OpCode.MOD: (2, 1),
+    OpCode.EXP: (1, 1),
+    OpCode.SQRT: (1, 1),
+    OpCode.NEG: (1, 1),
+    OpCode.EQ: (2, 1),
+    OpCode.NEQ: (2, 1),
+    OpCode.GT: (2, 1),
+    OpCode.LT: (2, 1),
+    OpCode.GE: (2, 1),
+    OpCode.LE: (2, 1),
+    OpCode.BREAKPOINT: (0, 0),
+    OpCode.LABEL: (0, 0),
+    OpCode.JMP: (0, 0),
+    OpCode.CJMP: (1, 0),
+    OpCode.CALL: (1, 0),
+    OpCode.RET: (0, 0),
+}
+
+# The same tables indexed by OpCode.id, so the passes below do not hash
+# Enum members for every instruction.
+_ARITY = [SIGNATURES[opcode][0] if opcode in SIGNATURES else 0 for opcode in OpCode]
+_ARG_TYPES = [SIGNATURES[opcode][1] if opcode in SIGNATURES else () for opcode in OpCode]
+_EFFECTS = [STACK_EFFECTS[opcode] for opcode in OpCode]
+
+
+class VerifyError(ValueError):
+    def __init__(self, function_name, pc, message):
+        super().__init__(f"Function '{function_name}', PC {pc}: {message}")
+        self.function_name = function_name
+        self.pc = pc
+
+
+def check_op(op: Op, function_name=None, pc=None):
+    expected = _ARITY[op.opcode_id]
+    if len(op.args) != expected:
+        raise VerifyError(
+            function_name,
+            pc,
+            f"{op.opcode.name} expects {expected} argument(s), got {len(op.args)}",
+        )
+
+    if expected and not isinstance(op.args[0], _ARG_TYPES[op.opcode_id]):
+        raise VerifyError(
+            function_name,
+            pc,
+            f"{op.opcode.name} got an argument of unsupported type "
+            f"{type(op.args[0]).__name__}",
+        )
+
+
+def _successors(ops, pc, labels):
+    op = ops[pc]
+    if op.opcode == OpCode.RET:
+        return ()
+    if op.opcode == OpCode.JMP:
+        return (labels[op.args[0]],)
+    if op.opcode == OpCode.CJMP:
+        return (pc + 1, labels[op.args[0]])
+    return (pc + 1,)
+
+
+def _callee(ops, pc):
+    if pc > 0:
+        previous = ops[pc - 1]
+        if previous.opcode == OpCode.LOAD_CONST and isinstance(previous.args[0], str):
+            return previous.args[0]
+    return None
+
+
+def _max_depths(ops: list[Op], labels, start_depth) -> dict[int, float]:
+    """The most stack values any path can hold on reaching each instruction.
+
+    A value below what an instruction pops means it underflows on every
+    path; paths that differ (a loop popping values pushed before it) are
+    left to the run time checks. Paths stop at a CALL, whose net stack
+    effect is unknown.
+    """
+    limit = start_depth + len(ops) * max(pushes for _, pushes in _EFFECTS)
+    depths = {0: start_depth}
+    work = [0]
+
+    while work:
+        pc = work.pop()
+        if pc >= len(ops):
+            continue
+        op = ops[pc]
+        if op.opcode == OpCode.CALL:
+            continue
+        pops, pushes = _EFFECTS[op.opcode_id]
+        depth = depths[pc] - pops + pushes
+        if depth > limit:
+            # A loop that keeps pushing.
+            depth = math.inf
+
+        for successor in _successors(ops, pc, labels):
+            if successor not in depths or depth > depths[successor]:
+                depths[successor] = depth
+                work.append(successor)
+
+    return depths
+
+
+def stack_requirement(ops: list[Op], labels) -> int:
+    """Number of stack values the function pops on every path before its first CALL."""
+    required = 0
+    for pc, depth in _max_depths(ops, labels, 0).items():
+        if pc < len(ops):
+            required = max(required, _EFFECTS[ops[pc].opcode_id][0] - depth)
+    return required
+
+
+def verify_function(function_name: str, ops: list[Op]):
+    labels = {}
+    for pc, op in enumerate(ops):
+        check_op(op, function_name, pc)
+        if op.opcode == OpCode.LABEL:
+            labels[op.args[0]] = pc
+
+    for pc, op in enumerate(ops):
+        if op.opcode in (OpCode.JMP, OpCode.CJMP) and op.args[0] not in labels:
+            raise VerifyError(
+                function_name, pc, f"Label '{op.args[0]}' is not defined"
+            )
+
+    return labels
+
+
+def _check_underflow(function_name, ops, labels, start_depth, requirements):
+    for pc, depth in sorted(_max_depths(ops, labels, start_depth).items()):
+        if pc >= len(ops):
+            continue
+
+        op = ops[pc]
+        pops = _EFFECTS[op.opcode_id][0]
+        if depth < pops:
+            raise VerifyError(
+                function_name,
+                pc,
+                f"{op.opcode.name} needs {pops} stack value(s), "
+                f"at most {depth} available",
+            )
+
+        if op.opcode == OpCode.CALL:
+            callee = _callee(ops, pc)
+            needed = requirements.get(callee, 0)
+            if depth - pops < needed:
+                raise VerifyError(
+                    function_name,
+                    pc,
+                    f"call to '{callee}' needs {needed} argument(s) on the stack, "
+                    f"at most {depth - pops} available",
+                )
+
+
+def verify(functions: dict[str, list[Op]], stack_depth: int = 0):
+    """Check a whole program before it runs.
+
+    Validates opcode arity, argument types and label references in every
+    function, then rejects entrypoint instructions that pop more values
+    than the stack (of ``stack_depth`` initial values) holds on every path
+    to them, including the arguments taken by constant-name CALLs. An
+    underflow on only some paths is caught when it happens (see
+    ``checked``).
+    """
+    labels = {name: verify_function(name, ops) for name, ops in functions.items()}
+    requirements = {
+        name: stack_requirement(ops, labels[name])
+        for name, ops in functions.items()
+    }
+
+    if ENTRYPOINT_KEY in functions:
+        _check_underflow(
+            ENTRYPOINT_KEY,
+            functions[ENTRYPOINT_KEY],
+            labels[ENTRYPOINT_KEY],
+            stack_depth,
+            requirements,
+        )
+
+
+def verify_entrypoint(ops: list[Op], stack_depth: int = 0):
+    """Check the entrypoint of a program whose other functions are not loaded yet.
+
+    Like ``verify`` for the entrypoint alone; calls are assumed to find
+    the arguments they need, since the callees' requirements are unknown.
+    """
+    labels = verify_function(ENTRYPOINT_KEY, ops)
+    _check_underflow(ENTRYPOINT_KEY, ops, labels, stack_depth, {})
@@ -1,252 +1,686 @@
+import asyncio
+import inspect
 import math
-import json
 import pickle
+import time
+from collections import deque
+from collections.abc import Mapping
 
+from xvm.assembler import assemble_file, is_text_source
+from xvm.bytecode import BytecodeFile, is_bytecode, read_bytecode
+from xvm.enums.event import Event
 from xvm.enums.op_code import OpCode
+from xvm.enums.super_op_code import SuperOpCode
 from xvm.op import Op
 from xvm.parser import parse_string
-from xvm.frame import Frame
+from xvm.frame import UNSET, Frame
+from xvm.hooks import Hook
+from xvm.jit import JitError, JitRecursionError, compile_program
+from xvm.json_stream import (
+    read_code as read_json_code,
+    read_code_lazily as read_json_code_lazily,
+)
+from xvm.linker import JUMP_OPCODES, VARIABLE_OPCODES, link_function
+from xvm.memo import MemoCache
+from xvm.operators import check_string, number_reader, parse_number
+from xvm.peephole import SuperOp, fuse
+from xvm.profiler import Profile
+from xvm.purity import analyze
+from xvm.verifier import STACK_EFFECTS, VerifyError, _callee, check_op, verify, verify_entrypoint, verify_function
 
 __all__ = ["parse_string", "VM"]
 
 ENTRYPOINT_KEY = "$entrypoint$"
 
+# Instructions run_code_async awaits instead of dispatching.
+_IO_OPCODES = (OpCode.INPUT_STRING, OpCode.INPUT_NUMBER, OpCode.PRINT)
+
+
+class _Variables(dict):
+    """A snapshot of VM.variables that writes changes back to the VM."""
+
+    __slots__ = ("_vm",)
+
+    def __init__(self, vm, variables):
+        super().__init__(variables)
+        self._vm = vm
+
+    def __setitem__(self, name, value):
+        super().__setitem__(name, value)
+        self._vm._set_variable(name, value)
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        self._vm._delete_variable(name)
+
+    def update(self, *args, **kwargs):
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def pop(self, name, *default):
+        if name in self:
+            value = self[name]
+            del self[name]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(name)
+
+    def popitem(self):
+        name, value = super().popitem()
+        self._vm._delete_variable(name)
+        return name, value
+
+    def clear(self):
+        for name in list(self):
+            del self[name]
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        # Pickles (and copies) as a plain dict, without the VM.
+        return (dict, (dict(self),))
+
+
+class _ReplayInput:
+    """An input function that returns ``values`` before reading more."""
+
+    def __init__(self, values, input_fn):
+        self._values = deque(values)
+        self._input_fn = input_fn
+        self._read_number = number_reader(input_fn)
+
+    def __call__(self):
+        return self._values.popleft() if self._values else self._input_fn()
+
+    def read_number(self):
+        return self._values.popleft() if self._values else self._read_number()
+
+
+class _SkipOutput:
+    """A print function that drops the first ``count`` values."""
+
+    def __init__(self, count, print_fn):
+        self._count = count
+        self._print_fn = print_fn
+
+    def __call__(self, value):
+        if self._count:
+            self._count -= 1
+        else:
+            self._print_fn(value)
+
+
+def _no_op(op):
+    pass
+
 
 class VM:
-    def __init__(self, input_fn=input, print_fn=print):
+    def __init__(
+        self,
+        input_fn=input,
+        print_fn=print,
+        checked=False,
+        optimize=False,
+        jit=False,
+        memo_size=0,
+        cache=None,
+    ):
         self.stack = []
-        self.variables = {}
+        # Variables live in per-frame slot lists; ``variables`` materializes
+        # them as a dict. Names the current function never uses (e.g. loaded
+        # with load_memory) are kept in ``_extra_variables``.
+        self._slots = []
+        self._slot_names = ()
+        self._extra_variables = None
         self.input_fn = input_fn
         self.print_fn = print_fn
         self.pc = 0
         self.code = []
         self.labels = {}
+        self._program = []
         self.breakpoint_hit = False
 
         self.call_stack = []
-        self.functions = {}
+        # Tail calls reuse the current frame; this counts the frames the
+        # current activation stands for beyond itself.
+        self.elided_frames = 0
+        self._tail_calls = frozenset()
+        self._frame_pool = []
+        self._functions = {}
+        self._linked = {}
         self.current_function = ENTRYPOINT_KEY
 
+        self.checked = checked
+        # Superinstructions have no checked variant, so checked mode runs
+        # the plain program.
+        self.optimize = optimize and not checked
+        self.jit = jit and not checked
+        self._compiled = None
+        # With memo_size > 0, results of pure functions (see xvm/purity.py)
+        # are cached per argument values in an LRU of that many entries.
+        self.memo = MemoCache(memo_size) if memo_size else None
+        self._memo_signatures = {}
+        self._memo_program = None
+        # For a lazily loaded program, the functions analyzed so far;
+        # None when the whole program was analyzed up front.
+        self._memo_analyzed = None
+        # A CodeCache consulted by load_code_from_json/load_code_from_file.
+        self.cache = cache
+        # Registered hooks, and the enabled ones by event; run_code only
+        # switches to the instrumented loop while the latter is non-empty.
+        self._hooks = []
+        self._active_hooks = {}
+        self._dispatch = [
+            getattr(self, f"_op_{opcode.name.lower()}", None)
+            for opcode in (*OpCode, *SuperOpCode)
+        ]
+        if checked:
+            self._dispatch = [
+                self._checked_handler(opcode, handler)
+                for opcode, handler in zip(OpCode, self._dispatch)
+            ]
+
+    @property
+    def variables(self):
+        """The current frame's variables.
+
+        A dict snapshot; setting or deleting names in it also changes them
+        in the VM.
+        """
+        variables = dict(self._extra_variables) if self._extra_variables else {}
+        for name, value in zip(self._slot_names, self._slots):
+            if value is not UNSET:
+                variables[name] = value
+        return _Variables(self, variables)
+
+    @variables.setter
+    def variables(self, variables):
+        slot_map = self._slot_map()
+        slots = [UNSET] * len(slot_map)
+        extras = {}
+        for name, value in variables.items():
+            index = slot_map.get(name)
+            if index is None:
+                extras[name] = value
+            else:
+                slots[index] = value
+        self._slots = slots
+        self._extra_variables = extras or None
+
+    @property
+    def input_fn(self):
+        return self._input_fn
+
+    @input_fn.setter
+    def input_fn(self, input_fn):
+        self._input_fn = input_fn
+        self._read_number = number_reader(input_fn)
+
+    @property
+    def functions(self):
+        return self._functions
+
+    @functions.setter
+    def functions(self, functions):
+        self._functions = functions
+        self._linked = {}
+
+    def _set_variable(self, name, value):
+        index = self._slot_map().get(name)
+        if index is not None:
+            self._slots[index] = value
+        else:
+            if self._extra_variables is None:
+                self._extra_variables = {}
+            self._extra_variables[name] = value
+
+    def _delete_variable(self, name):
+        index = self._slot_map().get(name)
+        if index is not None:
+            self._slots[index] = UNSET
+        elif self._extra_variables:
+            self._extra_variables.pop(name, None)
+
+    def _checked_handler(self, opcode, handler):
+        pops = STACK_EFFECTS[opcode][0]
+
+        def checked(op):
+            check_op(self.code[self.pc], self.current_function, self.pc)
+            if len(self.stack) < pops:
+                raise VerifyError(
+                    self.current_function,
+                    self.pc,
+                    f"{opcode.name} needs {pops} stack value(s), got {len(self.stack)}",
+                )
+            handler(op)
+
+        return checked
+
     def run_op(self, op: Op):
-        if op.opcode == OpCode.LOAD_CONST:
-            assert (
-                len(op.args) == 1
-            ), f"LOAD_CONST expects exactly one argument, got {len(op.args)}"
-            self.stack.append(op.args[0])
-
-        elif op.opcode == OpCode.STORE_VAR:
-            assert (
-                len(op.args) == 1
-            ), f"STORE_VAR expects exactly one argument, got {len(op.args)}"
-            var_name = op.args[0]
-            value = self.stack.pop()
-            self.variables[var_name] = value
-
-        elif op.opcode == OpCode.LOAD_VAR:
-            assert (
-                len(op.args) == 1
-            ), f"LOAD_VAR expects exactly one argument, got {len(op.args)}"
-            var_name = op.args[0]
-            assert var_name in self.variables, f"Variable '{var_name}' not found."
-            self.stack.append(self.variables[var_name])
-
-        elif op.opcode == OpCode.INPUT_STRING:
-            assert (
-                len(op.args) == 0
-            ), f"INPUT_STRING expects no arguments, got {len(op.args)}"
-            value = self.input_fn()
-            assert isinstance(
-                value, str
-            ), f"INPUT_STRING expected a string, got {type(value)}"
-            self.stack.append(value)
-
-        elif op.opcode == OpCode.INPUT_NUMBER:
-            assert (
-                len(op.args) == 0
-            ), f"INPUT_NUMBER expects no arguments, got {len(op.args)}"
-            value = self.input_fn()
-
-            if isinstance(value, str):
-                value = value.strip()
-                try:
-                    if "." not in value and "e" not in value.lower():
-                        value = int(value)
-                    else:
-                        value = float(value)
-                except ValueError:
-                    raise ValueError(f"INPUT_NUMBER: '{value}' is not a valid number")
-
-            assert isinstance(
-                value, (int, float)
-            ), f"INPUT_NUMBER expected a number, got {type(value)}"
-            self.stack.append(value)
-
-        elif op.opcode == OpCode.PRINT:
-            assert len(op.args) == 0, f"PRINT expects no arguments, got {len(op.args)}"
-            value = self.stack.pop()
-            self.print_fn(value)
-
-        elif op.opcode == OpCode.ADD:
-            assert len(op.args) == 0, f"ADD expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            arg2 = self.stack.pop()
-            self.stack.append(arg1 + arg2)
-
-        elif op.opcode == OpCode.SUB:
-            assert len(op.args) == 0, f"SUB expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            arg2 = self.stack.pop()
-            self.stack.append(arg1 - arg2)
-
-        elif op.opcode == OpCode.MUL:
-            assert len(op.args) == 0, f"MUL expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            arg2 = self.stack.pop()
-            self.stack.append(arg1 * arg2)
-
-        elif op.opcode == OpCode.DIV:
-            assert len(op.args) == 0, f"DIV expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            arg2 = self.stack.pop()
-            self.stack.append(arg1 / arg2)
-
-        elif op.opcode == OpCode.EXP:
-            assert len(op.args) == 0, f"EXP expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            self.stack.append(math.exp(arg1))
-
-        elif op.opcode == OpCode.SQRT:
-            assert len(op.args) == 0, f"SQRT expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            self.stack.append(math.sqrt(arg1))
-
-        elif op.opcode == OpCode.NEG:
-            assert len(op.args) == 0, f"NEG expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            self.stack.append(-arg1)
-
-        elif op.opcode == OpCode.MOD:
-            assert len(op.args) == 0, f"MOD expects no arguments, got {len(op.args)}"
-            arg1 = self.stack.pop()
-            arg2 = self.stack.pop()
-            self.stack.append(arg1 % arg2)
-
-        elif op.opcode == OpCode.EQ:
-            a = self.stack.pop()
-            b = self.stack.pop()
-            self.stack.append(1 if a == b else 0)
-
-        elif op.opcode == OpCode.NEQ:
-            a = self.stack.pop()
-            b = self.stack.pop()
-            self.stack.append(1 if a != b else 0)
-
-        elif op.opcode == OpCode.GT:
-            a = self.stack.pop()
-            b = self.stack.pop()
-            self.stack.append(1 if a > b else 0)
-
-        elif op.opcode == OpCode.LT:
-            a = self.stack.pop()
-            b = self.stack.pop()
-            self.stack.append(1 if a < b else 0)
-
-        elif op.opcode == OpCode.GE:
-            a = self.stack.pop()
-            b = self.stack.pop()
-            self.stack.append(1 if a >= b else 0)
-
-        elif op.opcode == OpCode.LE:
-            a = self.stack.pop()
-            b = self.stack.pop()
-            self.stack.append(1 if a <= b else 0)
-
-        elif op.opcode == OpCode.LABEL:
-            assert len(op.args) == 1, f"LABEL expects 1 argument, got {len(op.args)}"
-            label_name = op.args[0]
-            if label_name not in self.labels:
-                self.labels[label_name] = self.pc
+        check_op(op, self.current_function, self.pc)
 
-        elif op.opcode == OpCode.JMP:
-            assert len(op.args) == 1, f"JMP expects 1 argument, got {len(op.args)}"
+        if op.opcode in JUMP_OPCODES and op.args and isinstance(op.args[0], str):
             label_name = op.args[0]
             if label_name not in self.labels:
                 raise NameError(f"Label '{label_name}' is not defined")
-            self.pc = self.labels[label_name]
-
-        elif op.opcode == OpCode.CJMP:
-            assert len(op.args) == 1, f"CJMP expects 1 argument, got {len(op.args)}"
-            label_name = op.args[0]
-            condition = self.stack.pop()
-            if condition == 1:
-                if label_name not in self.labels:
-                    raise NameError(f"Label '{label_name}' is not defined")
-                self.pc = self.labels[label_name]
-
-        elif op.opcode == OpCode.BREAKPOINT:
-            self.breakpoint_hit = True
-
-        elif op.opcode == OpCode.CALL:
-            assert len(op.args) == 0, f"CALL expects no arguments, got {len(op.args)}"
-            function_name = self.stack.pop()
-
-            if function_name not in self.functions:
-                raise NameError(f"Function '{function_name}' is not defined")
-
-            frame = Frame(
-                self.current_function,
-                self.pc,
-                self.variables.copy(),
-                self.labels.copy(),
-            )
-            self.call_stack.append(frame)
-
-            self.current_function = function_name
-            self.code = self.functions[function_name]
-            self.variables = {}
-            self._preprocess_labels()
-            self.pc = -1
-
-            if self.breakpoint_hit:
-                self.pc += 1
+            op = Op(op.opcode, self.labels[label_name])
+        elif op.opcode in VARIABLE_OPCODES:
+            index = self._slot_map().get(op.args[0])
+            if index is None:
+                self._run_unslotted(op)
+                return
+            op = Op(op.opcode, index)
 
-        elif op.opcode == OpCode.RET:
-            assert len(op.args) == 0, f"RET expects no arguments, got {len(op.args)}"
+        handler = self._dispatch[op.opcode_id]
+        if handler is None:
+            raise NotImplementedError(f"Opcode {op.opcode} not implemented yet.")
+        handler(op)
+
+    def _run_unslotted(self, op: Op):
+        # A variable op for a name the current function's code never uses.
+        var_name = op.args[0]
+        if op.opcode == OpCode.STORE_VAR:
+            if self._extra_variables is None:
+                self._extra_variables = {}
+            self._extra_variables[var_name] = self.stack.pop()
+        elif self._extra_variables and var_name in self._extra_variables:
+            self.stack.append(self._extra_variables[var_name])
+        else:
+            raise NameError(f"Variable '{var_name}' not found.")
+
+    def _variable_not_found(self, index):
+        raise NameError(f"Variable '{self._slot_names[index]}' not found.")
+
+    def _op_load_const(self, op: Op):
+        self.stack.append(op.args[0])
+
+    def _op_store_var(self, op: Op):
+        self._slots[op.args[0]] = self.stack.pop()
 
-            if not self.call_stack:
-                self.pc = len(self.code)
+    def _op_load_var(self, op: Op):
+        value = self._slots[op.args[0]]
+        if value is UNSET:
+            self._variable_not_found(op.args[0])
+        self.stack.append(value)
+
+    def _op_input_string(self, op: Op):
+        self.stack.append(check_string(self.input_fn()))
+
+    def _op_input_number(self, op: Op):
+        self.stack.append(self._read_number())
+
+    def _op_print(self, op: Op):
+        value = self.stack.pop()
+        self.print_fn(value)
+
+    def _op_add(self, op: Op):
+        arg1 = self.stack.pop()
+        arg2 = self.stack.pop()
+        self.stack.append(arg1 + arg2)
+
+    def _op_sub(self, op: Op):
+        arg1 = self.stack.pop()
+        arg2 = self.stack.pop()
+        self.stack.append(arg1 - arg2)
+
+    def _op_mul(self, op: Op):
+        arg1 = self.stack.pop()
+        arg2 = self.stack.pop()
+        self.stack.append(arg1 * arg2)
+
+    def _op_div(self, op: Op):
+        arg1 = self.stack.pop()
+        arg2 = self.stack.pop()
+        self.stack.append(arg1 / arg2)
+
+    def _op_exp(self, op: Op):
+        arg1 = self.stack.pop()
+        self.stack.append(math.exp(arg1))
+
+    def _op_sqrt(self, op: Op):
+        arg1 = self.stack.pop()
+        self.stack.append(math.sqrt(arg1))
+
+    def _op_neg(self, op: Op):
+        arg1 = self.stack.pop()
+        self.stack.append(-arg1)
+
+    def _op_mod(self, op: Op):
+        arg1 = self.stack.pop()
+        arg2 = self.stack.pop()
+        self.stack.append(arg1 % arg2)
+
+    def _op_eq(self, op: Op):
+        a = self.stack.pop()
+        b = self.stack.pop()
+        self.stack.append(1 if a == b else 0)
+
+    def _op_neq(self, op: Op):
+        a = self.stack.pop()
+        b = self.stack.pop()
+        self.stack.append(1 if a != b else 0)
+
+    def _op_gt(self, op: Op):
+        a = self.stack.pop()
+        b = self.stack.pop()
+        self.stack.append(1 if a > b else 0)
+
+    def _op_lt(self, op: Op):
+        a = self.stack.pop()
+        b = self.stack.pop()
+        self.stack.append(1 if a < b else 0)
+
+    def _op_ge(self, op: Op):
+        a = self.stack.pop()
+        b = self.stack.pop()
+        self.stack.append(1 if a >= b else 0)
+
+    def _op_le(self, op: Op):
+        a = self.stack.pop()
+        b = self.stack.pop()
+        self.stack.append(1 if a <= b else 0)
+
+    def _op_label(self, op: Op):
+        pass
+
+    def _op_jmp(self, op: Op):
+        self.pc = op.args[0]
+
+    def _op_cjmp(self, op: Op):
+        condition = self.stack.pop()
+        if condition == 1:
+            self.pc = op.args[0]
+
+    def _op_breakpoint(self, op: Op):
+        self.breakpoint_hit = True
+
+    def _op_call(self, op: Op):
+        function_name = self.stack.pop()
+
+        if function_name not in self._functions:
+            raise NameError(f"Function '{function_name}' is not defined")
+
+        memo_key = None
+        signature = self._memo_signatures.get(function_name)
+        if signature is None and self._memo_analyzed is not None and function_name not in self._memo_analyzed:
+            signature = self._analyze_lazily(function_name)
+        if signature is not None and len(self.stack) >= signature[0]:
+            base = len(self.stack) - signature[0]
+            memo_key = MemoCache.key(function_name, self.stack[base:])
+            results = self.memo.get(memo_key)
+            if results is not None:
+                del self.stack[base:]
+                self.stack.extend(results)
                 return
 
-            frame = self.call_stack.pop()
-            self.current_function = frame.function_name
-            self.code = self.functions[frame.function_name]
-            self.variables = frame.variables
-            self.labels = frame.labels
-            self.pc = frame.return_pc
-
+        if self.call_stack and self.pc in self._tail_calls:
+            # Nothing runs in this frame after the call returns, so the
+            # callee takes it over and returns straight to our caller.
+            self.elided_frames += 1
         else:
-            raise NotImplementedError(f"Opcode {op.opcode} not implemented yet.")
+            if self._frame_pool:
+                frame = self._frame_pool.pop()
+                frame.reset(
+                    self.current_function,
+                    self.pc,
+                    self._slots,
+                    self.labels,
+                    self._extra_variables,
+                    self.elided_frames,
+                )
+            else:
+                frame = Frame(
+                    self.current_function,
+                    self.pc,
+                    self._slots,
+                    self.labels,
+                    self._extra_variables,
+                    self.elided_frames,
+                )
+            frame.memo_key = memo_key
+            self.call_stack.append(frame)
+            self.elided_frames = 0
+
+        self._enter_function(function_name)
+        self._slots = [UNSET] * len(self._slot_names)
+        self._extra_variables = None
+        self.pc = -1
+
+    def _op_ret(self, op: Op):
+        if not self.call_stack:
+            self.pc = len(self.code)
+            return
+
+        self._return_from_call()
+
+    # --- Superinstructions (see xvm/peephole.py) ---
+    # Each handler runs the whole fused sequence and moves the pc past it.
+
+    def _op_load_var_load_var(self, op):
+        first, second = op.args
+        slots = self._slots
+        arg2 = slots[first]
+        arg1 = slots[second]
+        if arg2 is UNSET:
+            self._variable_not_found(first)
+        if arg1 is UNSET:
+            self._variable_not_found(second)
+        self.stack.extend((arg2, arg1))
+        self.pc += 1
+
+    def _op_load_var_load_const(self, op):
+        slot, value = op.args
+        arg2 = self._slots[slot]
+        if arg2 is UNSET:
+            self._variable_not_found(slot)
+        self.stack.extend((arg2, value))
+        self.pc += 1
+
+    def _op_load_const_load_var(self, op):
+        value, slot = op.args
+        arg1 = self._slots[slot]
+        if arg1 is UNSET:
+            self._variable_not_found(slot)
+        self.stack.extend((value, arg1))
+        self.pc += 1
+
+    def _op_load_var_load_var_binary(self, op):
+        first, second, operator = op.args
+        slots = self._slots
+        arg2 = slots[first]
+        arg1 = slots[second]
+        if arg2 is UNSET:
+            self._variable_not_found(first)
+        if arg1 is UNSET:
+            self._variable_not_found(second)
+        self.stack.append(operator(arg1, arg2))
+        self.pc += 2
+
+    def _op_load_var_load_const_binary(self, op):
+        slot, value, operator = op.args
+        arg2 = self._slots[slot]
+        if arg2 is UNSET:
+            self._variable_not_found(slot)
+        self.stack.append(operator(value, arg2))
+        self.pc += 2
+
+    def _op_load_const_load_var_binary(self, op):
+        value, slot, operator = op.args
+        arg1 = self._slots[slot]
+        if arg1 is UNSET:
+            self._variable_not_found(slot)
+        self.stack.append(operator(arg1, value))
+        self.pc += 2
+
+    def _op_binary_store_var(self, op):
+        operator, slot = op.args
+        arg1 = self.stack.pop()
+        arg2 = self.stack.pop()
+        self._slots[slot] = operator(arg1, arg2)
+        self.pc += 1
+
+    def _op_load_const_compare_cjmp(self, op):
+        value, compare, target = op.args
+        if compare(value, self.stack.pop()) == 1:
+            self.pc = target
+        else:
+            self.pc += 2
+
+    def _op_compare_cjmp(self, op):
+        compare, target = op.args
+        arg1 = self.stack.pop()
+        arg2 = self.stack.pop()
+        if compare(arg1, arg2) == 1:
+            self.pc = target
+        else:
+            self.pc += 1
 
-    def _preprocess_labels(self):
-        self.labels = {}
-        for i, op in enumerate(self.code):
-            if op.opcode == OpCode.LABEL:
-                label_name = op.args[0]
-                self.labels[label_name] = i
+    def _op_load_const_store_var(self, op):
+        value, slot = op.args
+        self._slots[slot] = value
+        self.pc += 1
+
+    def _op_store_var_load_var(self, op):
+        self._slots[op.args[0]] = self.stack[-1]
+        self.pc += 1
+
+    def _return_from_call(self):
+        frame = self.call_stack.pop()
+        if frame.memo_key is not None:
+            self._memoize(frame.memo_key)
+            frame.memo_key = None
+        self._enter_function(frame.function_name)
+
+        self._slots = frame.slots
+        self._extra_variables = frame.extras
+        self.elided_frames = frame.elided_frames
+        self.pc = frame.return_pc
+
+        frame.slots = None
+        frame.extras = None
+        frame.labels = None
+        self._frame_pool.append(frame)
+
+    def _analyze_lazily(self, function_name):
+        """The memo signature of a lazily loaded function, on its first call.
+
+        Only the functions it can reach by constant name are decoded and
+        analyzed. One that fails to decode or verify is left out, which
+        makes its callers impure; its error surfaces if it is ever called.
+        """
+        functions = {}
+        seen = set()
+        pending = [function_name]
+        while pending:
+            name = pending.pop()
+            if name in seen or name not in self._functions:
+                continue
+            seen.add(name)
+            try:
+                ops = self._functions[name]
+                verify_function(name, ops)
+            except ValueError:
+                continue
+            functions[name] = ops
+            pending.extend(_callee(ops, pc) for pc, op in enumerate(ops) if op.opcode == OpCode.CALL)
+
+        self._memo_signatures.update(analyze(functions))
+        self._memo_analyzed.update(functions)
+        return self._memo_signatures.get(function_name)
+
+    def _memoize(self, memo_key):
+        pushes = self._memo_signatures[memo_key[0]][1]
+        self.memo.put(memo_key, tuple(self.stack[len(self.stack) - pushes :]))
+
+    def _enter_function(self, function_name):
+        linked = self._link(function_name)
+        self.current_function = function_name
+        self.code = linked.ops
+        self._program = linked.program
+        self.labels = linked.labels
+        self._slot_names = linked.slot_names
+        self._tail_calls = linked.tail_calls
+
+    def _slot_map(self):
+        linked = self._linked.get(self.current_function)
+        return linked.slots if linked is not None else {}
+
+    def _link(self, function_name):
+        ops = self._functions[function_name]
+        linked = self._linked.get(function_name)
+        if linked is None or linked.ops is not ops:
+            verify_function(function_name, ops)
+            linked = self._link_function(function_name, ops)
+            self._linked[function_name] = linked
+        return linked
+
+    def _link_all(self):
+        verify(self._functions, len(self.stack))
+        self._linked = {
+            name: self._link_function(name, ops)
+            for name, ops in self._functions.items()
+        }
+
+    def _link_function(self, function_name, ops):
+        linked = link_function(function_name, ops)
+        if self.optimize:
+            linked.program = fuse(linked.program)
+        return linked
+
+    def _load_entrypoint(self, linked=None):
+        variables = self.variables
+        if linked is not None:
+            self._linked = linked
+        elif isinstance(self._functions, dict):
+            self._link_all()
+        else:
+            # Lazily loaded code (LazyCode, BytecodeFile): each function is
+            # decoded, verified and linked when it is first entered.
+            self._linked = {}
+            verify_entrypoint(self._functions[ENTRYPOINT_KEY], len(self.stack))
+        # Lazy mappings are compared by identity: comparing their contents
+        # would decode every function.
+        program = self._memo_program
+        if self.memo is not None and program is not self._functions and not (
+            isinstance(program, dict) and isinstance(self._functions, dict) and program == self._functions
+        ):
+            if isinstance(self._functions, dict):
+                self._memo_signatures = analyze(self._functions)
+                self._memo_analyzed = None
+            else:
+                # Analyzed a function at a time, on first call (see _op_call).
+                self._memo_signatures = {}
+                self._memo_analyzed = set()
+            self._memo_program = self._functions
+            self.memo.clear()
+        self._enter_function(ENTRYPOINT_KEY)
+        # Re-seed the variables into the entrypoint's slots.
+        self.variables = variables
+        self.pc = 0
+        self.call_stack = []
+        self.elided_frames = 0
 
-    def run_code(self, code, load_code=True):
-        if isinstance(code, dict):
-            self.functions = code.copy()
+    def _set_code(self, code, load_code):
+        if isinstance(code, Mapping):
+            # Read-only mappings of lazily decoded functions are used as is.
+            self.functions = code.copy() if isinstance(code, dict) else code
 
             if ENTRYPOINT_KEY not in self.functions:
                 raise ValueError(f"Code dictionary must contain '{ENTRYPOINT_KEY}' key")
 
             if load_code:
-                self.code = self.functions[ENTRYPOINT_KEY]
-                self.current_function = ENTRYPOINT_KEY
-                self._preprocess_labels()
-                self.pc = 0
-                self.call_stack = []
+                self._load_entrypoint()
 
         elif isinstance(code, list):
             if not all(isinstance(op, Op) for op in code):
@@ -254,80 +688,436 @@ class VM:
 
             if load_code:
                 self.functions = {ENTRYPOINT_KEY: code}
-                self.code = code
-                self.current_function = ENTRYPOINT_KEY
-                self._preprocess_labels()
-                self.pc = 0
-                self.call_stack = []
+                self._load_entrypoint()
         else:
             raise TypeError(
                 f"Expected list[Op] or dict[str, list[Op]], got {type(code).__name__}"
             )
 
+    def load_code(self, code):
+        """Load and link ``code`` without running it (see run_for)."""
+        self._set_code(code, load_code=True)
+        self.breakpoint_hit = False
+
+    def restart(self):
+        """Rewind the loaded program with an empty stack and no variables."""
+        self.stack = []
+        self._enter_function(ENTRYPOINT_KEY)
+        self.variables = {}
+        self.pc = 0
+        self.call_stack = []
+        self.elided_frames = 0
+        self.breakpoint_hit = False
+
+    def run_code(self, code, load_code=True):
+        self._set_code(code, load_code)
+
         self.breakpoint_hit = False
+        if self._active_hooks:
+            self._run_instrumented()
+            return self.stack, self.variables
+        if self.jit and self._at_start() and self._run_compiled():
+            return self.stack, self.variables
+
+        self._interpret()
+        return self.stack, self.variables
+
+    def _interpret(self):
+        dispatch = self._dispatch
 
         while True:
-            if self.pc >= len(self.code):
+            if self.pc >= len(self._program):
+                if self.call_stack:
+                    self._return_from_call()
+                    self.pc += 1
+                    continue
+                else:
+                    break
+
+            operation = self._program[self.pc]
+            dispatch[operation.opcode_id](operation)
+            self.pc += 1
+
+            if self.breakpoint_hit:
+                break
+
+    @property
+    def finished(self):
+        return self.pc >= len(self._program) and not self.call_stack
+
+    def run_for(self, instructions):
+        """Run at most ``instructions`` instructions of the loaded program.
+
+        Stops early at the end of the program or at a breakpoint and
+        returns how many instructions ran; call again to continue. A
+        superinstruction counts as one instruction.
+        """
+        if self._active_hooks:
+            return self._run_instrumented(instructions)
+
+        dispatch = self._dispatch
+        executed = 0
+
+        while executed < instructions:
+            if self.pc >= len(self._program):
+                if self.call_stack:
+                    self._return_from_call()
+                    self.pc += 1
+                    continue
+                else:
+                    break
+
+            operation = self._program[self.pc]
+            dispatch[operation.opcode_id](operation)
+            self.pc += 1
+            executed += 1
+
+            if self.breakpoint_hit:
+                break
+
+        return executed
+
+    def add_hook(self, event: Event, callback, functions=None) -> Hook:
+        """Call ``callback(vm, function, pc, arg)`` on every ``event``.
+
+        See Event for what each event passes. ``functions`` limits the hook
+        to those functions. Hooks fire in run_code, run_loaded_code and
+        run_for, which use a slower instrumented loop while any hook is
+        enabled.
+        """
+        hook = Hook(event, callback, functions, self._update_hooks)
+        self._hooks.append(hook)
+        self._update_hooks()
+        return hook
+
+    def remove_hook(self, hook: Hook):
+        self._hooks.remove(hook)
+        hook._on_change = None
+        self._update_hooks()
+
+    def _update_hooks(self):
+        active = {}
+        for hook in self._hooks:
+            if hook.enabled:
+                active.setdefault(hook.event, []).append(hook)
+        self._active_hooks = active
+
+    def _emit(self, event, function, pc, arg):
+        for hook in self._active_hooks.get(event, ()):
+            if hook.wants(function):
+                hook.callback(self, function, pc, arg)
+
+    def _run_instrumented(self, instructions=None):
+        """The run loop used while hooks are enabled; returns the instructions run.
+
+        Superinstructions are run one original instruction at a time, so
+        hooks see the program as written.
+        """
+        dispatch = self._dispatch
+        emit = self._emit
+        executed = 0
+        active = None
+        # Enum attribute lookups are slow; compare against locals.
+        call, ret, print_ = OpCode.CALL, OpCode.RET, OpCode.PRINT
+        inputs = (OpCode.INPUT_NUMBER, OpCode.INPUT_STRING)
+
+        while instructions is None or executed < instructions:
+            if active is not self._active_hooks:
+                # Hooks may be added, removed or toggled by a hook.
+                active = self._active_hooks
+                instruction_hooks = active.get(Event.INSTRUCTION, ())
+                on_call = Event.CALL in active
+                on_return = Event.RETURN in active
+                on_input = Event.INPUT in active
+                on_output = Event.OUTPUT in active
+
+            if self.pc >= len(self._program):
                 if self.call_stack:
-                    frame = self.call_stack.pop()
-                    self.current_function = frame.function_name
-                    self.code = self.functions[self.current_function]
-                    self.variables = frame.variables
-                    self.labels = frame.labels
-                    self.pc = frame.return_pc + 1
+                    function, pc = self.current_function, self.pc
+                    self._return_from_call()
+                    if on_return:
+                        emit(Event.RETURN, function, pc, self.current_function)
+                    self.pc += 1
                     continue
                 else:
                     break
 
+            function, pc = self.current_function, self.pc
+            operation = self._program[pc]
+            if isinstance(operation, SuperOp):
+                operation = operation.ops[0]
+            opcode = operation.opcode
+
+            for hook in instruction_hooks:
+                if hook.wants(function):
+                    hook.callback(self, function, pc, self.code[pc])
+            if on_output and opcode is print_ and self.stack:
+                emit(Event.OUTPUT, function, pc, self.stack[-1])
+
+            depth = len(self.call_stack)
+            dispatch[operation.opcode_id](operation)
+
+            if opcode is call:
+                if on_call and self.pc == -1:
+                    emit(Event.CALL, self.current_function, pc, function)
+            elif opcode is ret:
+                if on_return and len(self.call_stack) < depth:
+                    emit(Event.RETURN, function, pc, self.current_function)
+            elif on_input and opcode in inputs:
+                emit(Event.INPUT, function, pc, self.stack[-1])
+
+            self.pc += 1
+            executed += 1
+
             if self.breakpoint_hit:
                 break
 
-            operation = self.code[self.pc]
-            self.run_op(operation)
+        return executed
 
-            if not self.breakpoint_hit:
+    def run_profiled(self, code, load_code=True, profile=None):
+        """Like run_code, counting and timing every instruction.
+
+        Returns a Profile (pass one in to add to it). This is a separate
+        loop, so run_code pays nothing for profiling. The JIT is not used.
+        """
+        self._set_code(code, load_code)
+        self.breakpoint_hit = False
+        if profile is None:
+            profile = Profile()
+
+        dispatch = self._dispatch
+        clock = time.perf_counter_ns
+        record = profile.record
+        calls = profile.calls
+        started = clock()
+
+        try:
+            while True:
+                if self.pc >= len(self._program):
+                    if self.call_stack:
+                        self._return_from_call()
+                        self.pc += 1
+                        continue
+                    else:
+                        break
+
+                function, pc = self.current_function, self.pc
+                operation = self._program[pc]
+                before = clock()
+                dispatch[operation.opcode_id](operation)
+                record(function, pc, operation.opcode, clock() - before)
+
+                if self.pc == -1:
+                    # CALL entered a function (rather than hitting the memo).
+                    calls[self.current_function] = calls.get(self.current_function, 0) + 1
+                    if len(self.call_stack) > profile.max_depth:
+                        profile.max_depth = len(self.call_stack)
                 self.pc += 1
 
+                if self.breakpoint_hit:
+                    break
+        finally:
+            profile.elapsed += clock() - started
+
+        return profile
+
+    async def run_code_async(self, code, load_code=True, yield_every=1000):
+        """Like run_code, for use inside an asyncio event loop.
+
+        ``input_fn`` and ``print_fn`` may be coroutine functions (or return
+        awaitables); INPUT_* and PRINT await them. Between I/O the program
+        yields to the loop every ``yield_every`` instructions so other tasks
+        keep running. The JIT is not used here.
+        """
+        if yield_every < 1:
+            raise ValueError("yield_every must be at least 1")
+        self._set_code(code, load_code)
+        self.breakpoint_hit = False
+
+        dispatch = list(self._dispatch)
+        io_checks = {}
+        for opcode in _IO_OPCODES:
+            if self.checked:
+                io_checks[opcode.id] = self._checked_handler(opcode, _no_op)
+            dispatch[opcode.id] = None
+        executed = 0
+
+        while True:
+            if self.pc >= len(self._program):
+                if self.call_stack:
+                    self._return_from_call()
+                    self.pc += 1
+                    continue
+                else:
+                    break
+
+            operation = self._program[self.pc]
+            handler = dispatch[operation.opcode_id]
+            if handler is None:
+                check = io_checks.get(operation.opcode_id)
+                if check is not None:
+                    check(operation)
+                await self._run_io_async(operation)
+            else:
+                handler(operation)
+            self.pc += 1
+
+            if self.breakpoint_hit:
+                break
+
+            executed += 1
+            if executed == yield_every:
+                executed = 0
+                await asyncio.sleep(0)
+
         return self.stack, self.variables
 
+    async def _run_io_async(self, op: Op):
+        if op.opcode == OpCode.PRINT:
+            result = self.print_fn(self.stack.pop())
+            if inspect.isawaitable(result):
+                await result
+            return
+
+        if op.opcode == OpCode.INPUT_NUMBER and hasattr(self.input_fn, "read_number"):
+            self.stack.append(self._read_number())
+            return
+
+        value = self.input_fn()
+        if inspect.isawaitable(value):
+            value = await value
+        if op.opcode == OpCode.INPUT_NUMBER:
+            self.stack.append(parse_number(value))
+        else:
+            self.stack.append(check_string(value))
+
+    def _at_start(self):
+        # The compiled program runs whole, from the top of the entrypoint.
+        # Lazily loaded code is left to the interpreter, which only
+        # decodes the functions that are called.
+        return (
+            self.pc == 0
+            and not self.call_stack
+            and self.current_function == ENTRYPOINT_KEY
+            and isinstance(self._functions, dict)
+        )
+
+    def _run_compiled(self):
+        """Run the loaded program with the JIT; False if it cannot be compiled."""
+        functions = self._functions
+        if self._compiled is None or self._compiled[0] != functions:
+            try:
+                self._compiled = (functions, compile_program(functions))
+            except JitError:
+                self._compiled = (functions, None)
+
+        program = self._compiled[1]
+        if program is None:
+            return False
+
+        stack, variables = list(self.stack), self.variables
+        try:
+            self.variables = program.run(self.stack, self.variables, self.input_fn, self.print_fn)
+        except JitRecursionError as error:
+            self._replay(stack, variables, error)
+            return True
+        self.pc = len(self.code)
+        return True
+
+    def _replay(self, stack, variables, error):
+        """Rerun on the interpreter a program the JIT could not finish.
+
+        The inputs the JIT read are fed again and the values it printed are
+        not printed twice.
+        """
+        input_fn, print_fn = self.input_fn, self.print_fn
+        self.stack = stack
+        self._enter_function(ENTRYPOINT_KEY)
+        self.variables = variables
+        self.pc = 0
+        self.call_stack = []
+        self.elided_frames = 0
+        self.input_fn = _ReplayInput(error.inputs, input_fn)
+        self.print_fn = _SkipOutput(error.printed, print_fn)
+        try:
+            self._interpret()
+        finally:
+            self.input_fn, self.print_fn = input_fn, print_fn
+
     def run_loaded_code(self):
         if not self.code:
             raise RuntimeError("No code loaded. Use load_code_from_json() first.")
 
         return self.run_code(self.code, load_code=False)
 
-    def parse_code_from_json(self, json_path: str) -> dict[str, list[Op]]:
-        with open(json_path, "r") as file:
-            data = json.load(file)
-
-        all_code = {}
-        for func_name, data_ops in data.items():
-            ops = []
-            for op_dict in data_ops:
-                opcode = OpCode(op_dict.get("op"))
-                arg = op_dict.get("arg")
-                if arg is not None:
-                    ops.append(Op(opcode, arg))
-                else:
-                    ops.append(Op(opcode))
-            all_code[func_name] = ops
+    def parse_code_from_json(self, json_path: str, lazy=False) -> dict[str, list[Op]]:
+        """Read a program from a JSON file.
+
+        With ``lazy``, returns a LazyCode that turns each function into Ops
+        the first time it is looked up.
+        """
+        # Streamed, so the JSON document is never held in memory as a whole.
+        if lazy:
+            return read_json_code_lazily(json_path)
+        return read_json_code(json_path)
+
+    def parse_code_from_file(self, path: str, lazy=False) -> dict[str, list[Op]]:
+        """Read a program from a JSON file, a binary .xvmc file or a .txt source.
+
+        With ``lazy``, functions are decoded on first lookup; a lazily read
+        .xvmc file stays memory-mapped while the result is in use. A .txt
+        source is assembled whole, into an AssembledCode.
+        """
+        if is_text_source(path):
+            return assemble_file(path)
+        if is_bytecode(path):
+            return BytecodeFile(path) if lazy else read_bytecode(path)
+        return self.parse_code_from_json(path, lazy)
+
+    def load_code_from_json(self, json_path: str, lazy=False):
+        return self._load_from(json_path, "JSON", lazy)
+
+    def load_code_from_file(self, path: str, lazy=False):
+        return self._load_from(path, "Code file", lazy)
+
+    def _load_from(self, path, kind, lazy=False):
+        # Verification depends on the stack the program starts with, so
+        # cached entries are only built and used for an empty one. Entries
+        # hold the whole linked program, so lazy loads do not use them.
+        if self.cache is None or self.stack or lazy:
+            return self._load_parsed(self._parse_file(path, kind, lazy), kind)
+
+        key = self.cache.key(path, self.optimize)
+        entry = self.cache.get(key)
+        if entry is not None:
+            code_dict, linked = entry
+            self.functions = code_dict
+            self._load_entrypoint(linked)
+            return code_dict
+
+        code_dict = self._load_parsed(self._parse_file(path, kind), kind)
+        self.cache.put(key, (code_dict, self._linked))
+        return code_dict
 
-        return all_code
+    def _parse_file(self, path, kind, lazy=False):
+        if kind == "JSON":
+            return self.parse_code_from_json(path, lazy)
+        return self.parse_code_from_file(path, lazy)
 
-    def load_code_from_json(self, json_path: str):
-        code_dict = self.parse_code_from_json(json_path)
+    def _load_parsed(self, code_dict, kind):
         if ENTRYPOINT_KEY not in code_dict:
-            raise ValueError(f"JSON must contain '{ENTRYPOINT_KEY}' key")
+            raise ValueError(f"{kind} must contain '{ENTRYPOINT_KEY}' key")
 
         self.functions = code_dict
-        self.code = self.functions[ENTRYPOINT_KEY]
-        self.current_function = ENTRYPOINT_KEY
-        self._preprocess_labels()
-        self.pc = 0
+        self._load_entrypoint()
         return code_dict
 
-    def run_code_from_json(self, json_path: str):
-        self.load_code_from_json(json_path)
+    def run_code_from_json(self, json_path: str, lazy=False):
+        self.load_code_from_json(json_path, lazy)
+        return self.run_loaded_code()
+
+    def run_code_from_file(self, path: str, lazy=False):
+        self.load_code_from_file(path, lazy)
         return self.run_loaded_code()
 
     def step(self):
@@ -338,11 +1128,16 @@ class VM:
             raise RuntimeError("Program execution finished.")
 
         operation = self.code[self.pc]
-        old_pc = self.pc
-
-        self.run_op(operation)
-
-        if self.pc == old_pc:
+        executable = self._program[self.pc]
+        if isinstance(executable, SuperOp):
+            # Step through fused sequences one original instruction at a time.
+            executable = executable.ops[0]
+        check_op(operation, self.current_function, self.pc)
+        self._dispatch[executable.opcode_id](executable)
+        self.pc += 1
+
+        if self.pc >= len(self.code) and self.call_stack:
+            self._return_from_call()
             self.pc += 1
 
         return operation
@@ -358,6 +1153,9 @@ class VM:
 
         if operation.opcode == OpCode.CALL:
             call_depth = len(self.call_stack)
+            if self.call_stack and self.pc in self._tail_calls:
+                # The callee replaces the current frame and returns to our caller.
+                call_depth -= 1
             self.step()
 
             while self.pc < len(self.code) and len(self.call_stack) > call_depth: